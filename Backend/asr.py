@@ -0,0 +1,154 @@
+"""Speech recognition engines behind one interface.
+
+All three audio scanners call engine.transcribe(audio), where audio is a file
+path or a 16 kHz float32 array, and get back a Whisper-style result:
+{"text": ..., "segments": [{"id", "start", "end", "text", "avg_logprob",
+"no_speech_prob"}, ...]}.
+
+ASR_BACKEND picks the engine:
+
+* "whisper" (default) - openai-whisper. ASR_COMPUTE_TYPE=int8 applies torch
+  dynamic int8 quantization to its Linear layers (CPU only).
+* "faster-whisper" - CTranslate2 Whisper, int8 on CPU by default. Falls back
+  to openai-whisper if the package is not installed.
+
+The fallback is decided once, at import (RESOLVED_BACKEND), so engine_tag()
+always names the engine that load_engine() builds.
+
+ASR_COMPUTE_TYPE is "auto" (fp16 on a GPU, otherwise fp32 for whisper and
+int8 for faster-whisper), "float32", "float16" or "int8".
+"""
+import importlib.util
+import os
+import sys
+
+BACKEND = os.environ.get("ASR_BACKEND", "whisper").lower()
+COMPUTE_TYPE = os.environ.get("ASR_COMPUTE_TYPE", "auto").lower()
+
+
+def resolve_backend(backend):
+    """The engine backend will actually load: faster-whisper only if installed, else whisper"""
+    if backend == "faster-whisper" and importlib.util.find_spec("faster_whisper") is not None:
+        return backend
+    return "whisper"
+
+
+# Only located here - faster_whisper is imported when the engine loads (fast start)
+RESOLVED_BACKEND = resolve_backend(BACKEND)
+
+# OPTIMIZATION: Use faster settings for speed
+DECODE_OPTIONS = {
+    "condition_on_previous_text": False,
+    "beam_size": 1,  # Greedy decoding (faster than beam search)
+    "best_of": 1,  # Don't try multiple decodings
+}
+
+# Segment fields worth keeping - tokens etc. are dropped to keep results small
+SEGMENT_FIELDS = ("id", "start", "end", "text", "avg_logprob", "no_speech_prob")
+
+# What a loaded engine's transcribe() raises on bad or unreadable audio (torch
+# and CTranslate2 runtime errors, ffmpeg decode failures). Anything else - a
+# missing package, a model that won't load - is not caught by the scanners.
+TRANSCRIBE_ERRORS = (RuntimeError, ValueError, OSError)
+
+
+def _has_cuda():
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+class WhisperEngine:
+    """openai-whisper, optionally with int8 dynamic quantization on CPU"""
+
+    def __init__(self, model_name, compute_type):
+        import whisper
+        import model_store
+        # A stored checkpoint path loads without whisper re-hashing the download
+        checkpoint = model_store.resolve(f"whisper:{model_name}", fallback=model_name)
+        cuda = _has_cuda()
+        if compute_type == "int8" and cuda:
+            print("⚠️ int8 Whisper is CPU-only, using float16 on the GPU", file=sys.stderr)
+            compute_type = "float16"
+        if compute_type == "auto":
+            compute_type = "float16" if cuda else "float32"
+        if compute_type == "float16" and not cuda:
+            # Whisper would fall back to fp32 with a warning on every call anyway
+            compute_type = "float32"
+
+        if compute_type == "int8":
+            import torch
+            model = whisper.load_model(checkpoint, device="cpu")
+            # OPTIMIZATION: int8 weights for every Linear layer (the bulk of the decoder's work)
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            model = whisper.load_model(checkpoint)
+
+        self.model = model
+        self.compute_type = compute_type
+        self.name = f"whisper:{model_name}:{compute_type}"
+        self._options = dict(DECODE_OPTIONS, fp16=compute_type == "float16")
+
+    def transcribe(self, audio):
+        result = self.model.transcribe(audio, **self._options)
+        return {
+            "text": result["text"],
+            "segments": [
+                {field: segment.get(field) for field in SEGMENT_FIELDS}
+                for segment in result.get("segments", [])
+            ],
+        }
+
+
+class FasterWhisperEngine:
+    """CTranslate2 Whisper (faster-whisper), int8 on CPU by default"""
+
+    def __init__(self, model_name, compute_type):
+        from faster_whisper import WhisperModel
+        import model_store
+        device = "cuda" if _has_cuda() else "cpu"
+        if compute_type == "auto":
+            compute_type = "float16" if device == "cuda" else "int8"
+        # A stored model directory skips the hub lookup
+        source = model_store.resolve(f"faster-whisper:{model_name}", fallback=model_name)
+        self.model = WhisperModel(source, device=device, compute_type=compute_type)
+        self.compute_type = compute_type
+        self.name = f"faster-whisper:{model_name}:{compute_type}"
+
+    def transcribe(self, audio):
+        segments, _info = self.model.transcribe(audio, **DECODE_OPTIONS)
+        # Segments are produced lazily while iterating
+        segments = [
+            {
+                "id": segment.id,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+            }
+            for segment in segments
+        ]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+
+def load_engine(model_name="tiny", backend=BACKEND, compute_type=COMPUTE_TYPE):
+    """Build the configured engine, falling back to openai-whisper"""
+    resolved = resolve_backend(backend)
+    if backend == "faster-whisper" and resolved != backend:
+        print("⚠️ faster-whisper not installed, using openai-whisper", file=sys.stderr)
+    elif backend not in ("whisper", "faster-whisper"):
+        print(f"⚠️ Unknown ASR_BACKEND '{backend}', using openai-whisper", file=sys.stderr)
+    if resolved == "faster-whisper":
+        return FasterWhisperEngine(model_name, compute_type)
+    return WhisperEngine(model_name, compute_type)
+
+
+def engine_tag(model_name="tiny"):
+    """Identifies transcripts by the engine that loads, without loading it (for the cache keys)"""
+    if RESOLVED_BACKEND == "whisper" and COMPUTE_TYPE == "auto":
+        # Same key as before engines were configurable, so existing transcripts stay valid
+        return model_name
+    return f"{model_name}-{RESOLVED_BACKEND}-{COMPUTE_TYPE}"
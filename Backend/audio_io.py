@@ -0,0 +1,132 @@
+"""In-process WAV reading for the Whisper scanners.
+
+tmp/audio.wav is a plain PCM WAV written by yt-dlp/ffmpeg, so it can be read
+with the stdlib wave module (header-aware, seekable) one window at a time.
+Windows are downmixed to mono and resampled to the 16 kHz float32 array that
+whisper's transcribe() accepts directly, so memory stays bounded by the window
+size no matter how long the audio is.
+
+The streaming settings both Whisper scanners read are parsed here, once.
+"""
+import enum
+import os
+import sys
+import wave
+
+import numpy as np
+
+# Whisper's expected input rate
+SAMPLE_RATE = 16000
+
+
+class Streaming(enum.Enum):
+    """AUDIO_STREAMING: which scans transcribe window by window and stop once flagged"""
+    OFF = "0"  # every scan transcribes its whole audio first
+    QUICK = "quick"  # the quick scan only (default)
+    ALL = "all"  # the quick scan, and Phase 3 when no shared transcript exists yet
+
+
+def _streaming_mode(value):
+    try:
+        return Streaming(value.strip().lower())
+    except ValueError:
+        print(f"⚠️ Unknown AUDIO_STREAMING '{value}' (0, quick or all), using quick", file=sys.stderr)
+        return Streaming.QUICK
+
+
+STREAMING = _streaming_mode(os.environ.get("AUDIO_STREAMING") or Streaming.QUICK.value)
+STREAM_WINDOW_SECONDS = float(os.environ.get("AUDIO_STREAM_WINDOW", "30"))
+
+
+def pcm_to_float(raw, sample_width, channels):
+    """Decode little-endian PCM bytes to mono float32 in [-1, 1]"""
+    if sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    elif sample_width == 3:
+        # 24-bit: widen each 3-byte sample to int32 (sign comes from the top byte)
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        widened = (bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)) << 8
+        samples = widened.astype(np.float32) / 2147483648.0
+    elif sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    else:
+        raise ValueError(f"unsupported WAV sample width: {sample_width}")
+
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels]
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def resample(samples, orig_rate, target_rate=SAMPLE_RATE):
+    """FFT resampling (band-limited, so no aliasing when downsampling)"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if orig_rate == target_rate or len(samples) == 0:
+        return samples
+
+    out_len = int(round(len(samples) * target_rate / orig_rate))
+    if out_len == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    spectrum = np.fft.rfft(samples)
+    keep = out_len // 2 + 1
+    if keep <= len(spectrum):
+        spectrum = spectrum[:keep]
+    else:
+        spectrum = np.concatenate([spectrum, np.zeros(keep - len(spectrum), dtype=spectrum.dtype)])
+    resampled = np.fft.irfft(spectrum, out_len) * (out_len / len(samples))
+    return resampled.astype(np.float32)
+
+
+# What reading a file that isn't a PCM WAV we can decode raises
+WAV_ERRORS = (wave.Error, EOFError, ValueError)
+
+
+class UnreadableWav(Exception):
+    """A WAV read failed mid-scan - kept apart from the transcription errors (also ValueErrors)"""
+
+
+def checked_windows(windows):
+    """iter_wav_windows() output, with read errors raised as UnreadableWav"""
+    try:
+        yield from windows
+    except WAV_ERRORS as e:
+        raise UnreadableWav(str(e)) from e
+
+
+def wav_duration(path):
+    """Duration of a WAV file in seconds (reads the header only)"""
+    with wave.open(path, "rb") as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def iter_wav_windows(path, window_seconds=30.0, limit_seconds=None):
+    """Yield (start_seconds, samples) windows of 16 kHz mono float32 audio"""
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+
+        total_frames = wav.getnframes()
+        if limit_seconds is not None:
+            total_frames = min(total_frames, int(limit_seconds * rate))
+
+        frames_per_window = max(1, int(window_seconds * rate))
+        position = 0
+        while position < total_frames:
+            count = min(frames_per_window, total_frames - position)
+            raw = wav.readframes(count)
+            if not raw:
+                break
+            yield position / float(rate), resample(pcm_to_float(raw, sample_width, channels), rate)
+            position += count
+
+
+def load_wav(path, limit_seconds=None):
+    """Whole file (or its first limit_seconds) as one 16 kHz mono float32 array"""
+    windows = [samples for _, samples in iter_wav_windows(path, 60.0, limit_seconds)]
+    if not windows:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(windows)
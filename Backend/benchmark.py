@@ -0,0 +1,410 @@
+"""Reproducible benchmark for every scanner stage.
+
+Builds a synthetic local corpus (speech-like/tone/noise WAV, a rendered
+preview.mp4 with scene cuts plus extracted-style frames, and thumbnails served
+by a local HTTP server), then runs each stage in its own Python process:
+
+* cold start - import of the scanner module plus the first scan (model load)
+* warm latency - the next N scans in the same process
+* throughput - audio seconds / frame budget / thumbnails processed per second, warm
+* peak RSS of the stage process
+
+Caches are cleared before every run so each run does the full work. Results
+are printed as JSON (and written to --output) so they can be compared across
+commits:
+
+    python benchmark.py --runs 5 --output bench.json
+    python benchmark.py --stages image thumbnail_batch
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_RATE = 16000
+VIDEO_FPS = 10
+VIDEO_SIZE = (640, 360)
+
+# stage -> (module, how to call it, unit counted for throughput)
+STAGES = {
+    "whisper_quick": ("whisper_scan", "job", "audio_seconds"),
+    "whisper_full": ("whisper_scan_full", "job", "audio_seconds"),
+    "transcription": ("transcription_analyzer", "job", "audio_seconds"),
+    "image": ("image_scan", "job", "frame_budget"),
+    "thumbnail": ("thumbnail_scan", "thumbnail", "thumbnails"),
+    "thumbnail_batch": ("thumbnail_scan", "thumbnail_batch", "thumbnails"),
+    # Model-free: frame selection alone, and the full decode ffmpeg's fps filter does for "uniform"
+    "frame_sampler": ("frame_sampler", "sampler", "video_seconds"),
+    "frame_decode": ("frame_sampler", "decode", "video_seconds"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def _speech_like(rng, seconds):
+    """Voiced, syllable-rate modulated harmonics - passes the VAD like speech does"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = rng.uniform(110, 220) * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    # Formant-ish weighting of the first harmonics
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3, 5) * t)) ** 2
+    return 0.3 * voice * syllables / 3
+
+
+def write_audio(path, seconds, seed=0):
+    """Alternating speech-like, tone, noise and silence segments, 16 kHz mono PCM"""
+    rng = np.random.default_rng(seed)
+    segments = []
+    kinds = ["speech", "speech", "tone", "silence", "noise"]
+    total = 0.0
+    while total < seconds:
+        length = min(rng.uniform(2, 6), seconds - total)
+        kind = kinds[int(rng.integers(len(kinds)))]
+        n = int(length * SAMPLE_RATE)
+        if kind == "speech":
+            segment = _speech_like(rng, length)
+        elif kind == "tone":
+            segment = 0.2 * np.sin(2 * np.pi * 440 * np.arange(n) / SAMPLE_RATE)
+        elif kind == "noise":
+            segment = 0.05 * rng.standard_normal(n)
+        else:
+            segment = np.zeros(n)
+        segments.append(segment[:n])
+        total += length
+    samples = np.clip(np.concatenate(segments), -1, 1)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((samples * 32767).astype(np.int16).tobytes())
+
+
+def _render_scene(rng, size):
+    """Colour background with a few shapes"""
+    import cv2
+    width, height = size
+    img = np.zeros((height, width, 3), np.uint8)
+    img[:] = rng.integers(0, 256, 3)
+    for _ in range(int(rng.integers(2, 6))):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        if rng.random() < 0.5:
+            cv2.circle(img, center, int(rng.integers(10, height // 3)), color, -1)
+        else:
+            corner = (center[0] + int(rng.integers(20, width // 3)), center[1] + int(rng.integers(20, height // 3)))
+            cv2.rectangle(img, center, corner, color, -1)
+    return img
+
+
+def write_video(job_dir, seconds, seed=0):
+    """preview.mp4 with a scene cut every few seconds, plus 1 frame every 15s as frame_NNN.jpg"""
+    import cv2
+    rng = np.random.default_rng(seed)
+    # mp4v puts a keyframe every 12 frames and at most cuts, as web encoders do with longer intervals
+    writer = cv2.VideoWriter(os.path.join(job_dir, "preview.mp4"), cv2.VideoWriter_fourcc(*"mp4v"), VIDEO_FPS, VIDEO_SIZE)
+    scene = _render_scene(rng, VIDEO_SIZE)
+    next_cut = rng.uniform(3, 10)
+    for i in range(int(seconds * VIDEO_FPS)):
+        t = i / VIDEO_FPS
+        if t >= next_cut:
+            scene = _render_scene(rng, VIDEO_SIZE)
+            next_cut = t + rng.uniform(3, 10)
+        # Slow pan so consecutive frames are similar but not identical
+        frame = np.roll(scene, i % VIDEO_SIZE[0], axis=1)
+        writer.write(frame)
+        if i % (15 * VIDEO_FPS) == 0:
+            cv2.imwrite(os.path.join(job_dir, f"frame_{i // (15 * VIDEO_FPS) + 1:03d}.jpg"), frame)
+    writer.release()
+
+
+def write_thumbnails(thumb_dir, count, seed=0):
+    import cv2
+    rng = np.random.default_rng(seed)
+    os.makedirs(thumb_dir, exist_ok=True)
+    names = []
+    for i in range(count):
+        name = f"thumb_{i:03d}.jpg"
+        cv2.imwrite(os.path.join(thumb_dir, name), _render_scene(rng, (480, 360)))
+        names.append(name)
+    return names
+
+
+def build_corpus(corpus_dir, audio_seconds, video_seconds, thumbnails):
+    job_dir = os.path.join(corpus_dir, "job")
+    os.makedirs(job_dir, exist_ok=True)
+    print(f"🔄 Building corpus in {corpus_dir}...", file=sys.stderr)
+    write_audio(os.path.join(job_dir, "audio.wav"), audio_seconds)
+    write_video(job_dir, video_seconds)
+    names = write_thumbnails(os.path.join(corpus_dir, "thumbnails"), thumbnails)
+    return {
+        "job_dir": job_dir,
+        "thumbnails": names,
+        "audio_seconds": audio_seconds,
+        "video_seconds": video_seconds,
+    }
+
+
+def serve_thumbnails(thumb_dir):
+    """Local stand-in for the thumbnail CDN; returns (base URL, server)"""
+    import functools
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=thumb_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
+
+
+# ---------------------------------------------------------------------------
+# Stage process
+# ---------------------------------------------------------------------------
+
+def missing_dependency(stage):
+    """Model package a stage needs but can't import, else None.
+
+    The scanners swallow errors and return [] - without this check a stage
+    with no models installed would be "benchmarked" doing nothing.
+    """
+    import importlib.util
+    if STAGES[stage][2] == "video_seconds":
+        package = "cv2"
+    elif STAGES[stage][2] == "audio_seconds":
+        import asr
+        package = "faster_whisper" if asr.RESOLVED_BACKEND == "faster-whisper" else "whisper"
+    else:
+        package = "ultralytics"
+    return None if importlib.util.find_spec(package) else package
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _summary(latencies):
+    ordered = sorted(latencies)
+    return {
+        "runs": len(ordered),
+        "mean_s": round(statistics.mean(ordered), 4),
+        "median_s": round(statistics.median(ordered), 4),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 4),
+        "min_s": round(ordered[0], 4),
+    }
+
+
+def decode_all(video_path):
+    """Decode every frame of video_path; returns the frame count"""
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    count = 0
+    while cap.grab():
+        count += 1
+    cap.release()
+    return count
+
+
+def run_stage(stage, corpus, base_url, runs, cache_dir):
+    """Runs inside the stage process: cold start, then warm runs. Returns the stage report."""
+    import importlib
+    module_name, call, unit = STAGES[stage]
+    missing = missing_dependency(stage)
+    if missing:
+        return {"error": f"missing dependency: {missing}"}
+
+    def clear_caches():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    urls = [f"{base_url}/{name}" for name in corpus["thumbnails"]]
+    video = os.path.join(corpus["job_dir"], "preview.mp4")
+    if call == "thumbnail":
+        units = 1
+    elif call == "thumbnail_batch":
+        units = len(urls)
+    elif unit == "video_seconds":
+        units = corpus["video_seconds"]
+    elif unit == "audio_seconds":
+        # The quick scan only looks at the first 2 minutes
+        units = min(corpus["audio_seconds"], 120) if stage == "whisper_quick" else corpus["audio_seconds"]
+    else:
+        from frame_sampler import FRAME_BUDGET
+        units = FRAME_BUDGET
+
+    def run_once(module, i):
+        clear_caches()
+        if call == "job":
+            return module.scan(corpus["job_dir"])
+        if call == "thumbnail":
+            return module.scan(urls[i % len(urls)], corpus["job_dir"])
+        if call == "sampler":
+            return list(module.sample_frames(video))
+        if call == "decode":
+            return decode_all(video)
+        return module.scan_batch(urls)
+
+    clear_caches()
+    cold_start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_time = time.perf_counter() - cold_start
+    flags = run_once(module, 0)
+    cold = time.perf_counter() - cold_start
+
+    latencies = []
+    for i in range(1, runs + 1):
+        start = time.perf_counter()
+        run_once(module, i)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "cold_start_s": round(cold, 4),
+        "import_s": round(import_time, 4),
+        "warm": _summary(latencies) if latencies else None,
+        "unit": unit,
+        "units_per_run": units,
+        "throughput_per_s": round(units / statistics.median(latencies), 2) if latencies else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        # Flags raised (frames returned for frame_sampler)
+        "flags": len(flags) if isinstance(flags, list) else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _tuning_env():
+    """Environment knobs that change scanner behaviour, recorded with the results"""
+    prefixes = ("ASR_", "VISION_", "IMAGE_", "FRAME_", "AUDIO_", "THUMBNAIL_", "SCAN_")
+    return {key: value for key, value in sorted(os.environ.items()) if key.startswith(prefixes)}
+
+
+def run_stage_process(stage, corpus_file, base_url, runs, verbose, timeout):
+    cache_dir = tempfile.mkdtemp(prefix=f"bench-cache-{stage}-")
+    env = dict(
+        os.environ,
+        # Scan in the stage process itself, never through a running worker
+        SCAN_WORKER="0",
+        THUMBNAIL_CACHE="0",
+        TRANSCRIPT_CACHE_DIR=os.path.join(cache_dir, "transcripts"),
+        CLIP_TEXT_CACHE_DIR=os.environ.get("CLIP_TEXT_CACHE_DIR", os.path.join(BASE_DIR, "cache", "clip_text")),
+    )
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-stage", stage,
+           "--corpus-file", corpus_file, "--base-url", base_url, "--runs", str(runs),
+           "--cache-dir", os.path.join(cache_dir, "transcripts")]
+    try:
+        proc = subprocess.run(
+            cmd, cwd=BASE_DIR, env=env, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout}s"}
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if verbose:
+        sys.stderr.write(proc.stderr)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["no output"]
+        return {"error": tail[0][:300]}
+    return json.loads(lines[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scanner stages on a synthetic corpus")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--runs", type=int, default=3, help="warm runs per stage (after the cold run)")
+    parser.add_argument("--audio-seconds", type=float, default=180)
+    parser.add_argument("--video-seconds", type=float, default=120)
+    parser.add_argument("--thumbnails", type=int, default=16)
+    parser.add_argument("--corpus", help="corpus directory (default: a temporary directory)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--timeout", type=int, default=1800, help="seconds per stage")
+    parser.add_argument("--verbose", action="store_true", help="show the scanners' stderr")
+    # Internal: run one stage in this process
+    parser.add_argument("--run-stage", choices=list(STAGES), help=argparse.SUPPRESS)
+    parser.add_argument("--corpus-file", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_stage:
+        os.chdir(BASE_DIR)
+        sys.path.insert(0, BASE_DIR)
+        with open(args.corpus_file, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+        # Scanner output stays on stderr; stdout carries only the report
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        report = run_stage(args.run_stage, corpus, args.base_url, args.runs, args.cache_dir)
+        stdout.write(json.dumps(report) + "\n")
+        return 0
+
+    corpus_dir = args.corpus or tempfile.mkdtemp(prefix="bench-corpus-")
+    corpus = build_corpus(corpus_dir, args.audio_seconds, args.video_seconds, args.thumbnails)
+    corpus_file = os.path.join(corpus_dir, "corpus.json")
+    with open(corpus_file, "w", encoding="utf-8") as f:
+        json.dump(corpus, f)
+    base_url, server = serve_thumbnails(os.path.join(corpus_dir, "thumbnails"))
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_cores": os.cpu_count(),
+        "env": _tuning_env(),
+        "corpus": {k: corpus[k] for k in ("audio_seconds", "video_seconds")} | {"thumbnails": len(corpus["thumbnails"])},
+        "stages": {},
+    }
+    try:
+        for stage in args.stages:
+            print(f"⏱️ Benchmarking {stage}...", file=sys.stderr)
+            report = run_stage_process(stage, corpus_file, base_url, args.runs, args.verbose, args.timeout)
+            results["stages"][stage] = report
+            if "error" in report:
+                print(f"⚠️ {stage} failed: {report['error']}", file=sys.stderr)
+            else:
+                warm = report["warm"]["median_s"] if report["warm"] else None
+                print(f"✅ {stage}: cold {report['cold_start_s']}s, warm median {warm}s, peak RSS {report['peak_rss_mb']} MB", file=sys.stderr)
+    finally:
+        server.shutdown()
+        if not args.corpus:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Compute-once CLIP text embeddings for the fixed zero-shot prompts.
+
+The CLIP fallback in thumbnail_scan.py compares every image with the same
+prompt list, so running the text tower per scan is wasted work. Normalised
+prompt embeddings are computed once, kept in memory for the life of the
+process and stored under cache/clip_text/ keyed by a hash of the model name
+and the prompt list - changing either simply produces a new entry. A scan then
+only runs the image tower and a dot product.
+"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("CLIP_TEXT_CACHE_DIR", os.path.join(BASE_DIR, "cache", "clip_text"))
+
+_embeddings = {}
+
+
+def _entry_key(model_name, prompts):
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    for prompt in prompts:
+        digest.update(b"\0" + prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_entry(entry_path, prompt_count):
+    try:
+        embeddings = np.load(entry_path)
+    except (OSError, ValueError):
+        return None
+    # A truncated or foreign file is recomputed rather than trusted
+    return embeddings if embeddings.ndim == 2 and embeddings.shape[0] == prompt_count else None
+
+
+def _write_entry(entry_path, embeddings):
+    # Write to a temp file and rename so readers never see a partial entry
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, embeddings)
+    os.replace(tmp_path, entry_path)
+
+
+def _encode(model, processor, prompts):
+    import torch
+    inputs = processor(text=list(prompts), return_tensors="pt", padding=True)
+    with torch.no_grad():
+        features = model.get_text_features(**inputs)
+    features = features / features.norm(dim=-1, keepdim=True)
+    return features.cpu().numpy().astype(np.float32)
+
+
+def get_text_embeddings(model, processor, model_name, prompts):
+    """L2-normalised text embeddings for prompts, shape (len(prompts), dim)"""
+    key = _entry_key(model_name, prompts)
+    if key in _embeddings:
+        return _embeddings[key]
+
+    entry_path = os.path.join(CACHE_DIR, f"{key}.npy")
+    embeddings = _read_entry(entry_path, len(prompts))
+    if embeddings is None:
+        print(f"🔄 Encoding {len(prompts)} CLIP prompts (cached for later scans)...", file=sys.stderr)
+        embeddings = _encode(model, processor, prompts)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _write_entry(entry_path, embeddings)
+        except OSError as e:
+            print(f"⚠️ Could not store CLIP prompt embeddings: {e}", file=sys.stderr)
+
+    _embeddings[key] = embeddings
+    return embeddings
@@ -1,6 +1,7 @@
 /* eslint-env node */
 
 const fs = require("fs-extra");
+const os = require("os");
 const path = require("path");
 
 // Determine Python command (use venv if available, otherwise system python)
@@ -11,8 +12,37 @@ const pythonCmd = fs.existsSync(path.join(__dirname, "venv", "bin", "python"))
 // Paths
 const TMP_DIR = path.join(__dirname, "tmp");
 const DB_PATH = path.join(__dirname, "videos.db");
-const AUDIO_PATH = path.join(__dirname, "tmp", "audio.wav");
-const VIDEO_PATH = path.join(__dirname, "tmp", "preview.mp4");
+
+// Per-job workspace: every scan works in tmp/<videoId>/ so concurrent scans
+// never overwrite each other's audio, video, frames or thumbnail
+const jobPaths = (videoId) => {
+	const dir = path.join(TMP_DIR, videoId);
+	return {
+		dir,
+		audio: path.join(dir, "audio.wav"),
+		video: path.join(dir, "preview.mp4"),
+		frames: path.join(dir, "frame_%03d.jpg"),
+	};
+};
+
+// Concurrency: how many videos may be scanned at once (the oldest scan is
+// interrupted beyond this), and how many Python scanner processes may run at
+// once across all scans (the core budget)
+const MAX_CONCURRENT_SCANS = Math.max(1, parseInt(process.env.MAX_CONCURRENT_SCANS || "1", 10) || 1);
+const SCAN_CORE_BUDGET = Math.max(
+	1,
+	parseInt(process.env.SCAN_CORE_BUDGET || String(os.cpus().length), 10) || 1
+);
+
+// Persistent scan worker (keeps models loaded between scans). Set SCAN_WORKER=0 to disable.
+const SCAN_WORKER_ENABLED = process.env.SCAN_WORKER !== "0";
+const SCAN_WORKER_SOCKET =
+	process.env.SCAN_WORKER_SOCKET || path.join(__dirname, "scan_worker.sock");
+// Worker processes (each holds its own models): one per concurrent scan by default
+const SCAN_WORKER_PROCESSES = Math.min(
+	SCAN_CORE_BUDGET,
+	Math.max(1, parseInt(process.env.SCAN_WORKER_PROCESSES || String(MAX_CONCURRENT_SCANS), 10) || 1)
+);
 
 // Timeouts (in milliseconds)
 const TIMEOUTS = {
@@ -23,32 +53,46 @@ const TIMEOUTS = {
 	IMAGE_SCAN: 120000, // 2 minutes
 	FULL_AUDIO_SCAN: 600000, // 10 minutes
 	TRANSCRIPTION_ANALYSIS: 600000, // 10 minutes
+	THUMBNAIL_BATCH_SCAN: 120000, // 2 minutes
 };
 
-// YouTube download commands (fallback strategies)
-const AUDIO_DOWNLOAD_COMMANDS = (videoId) => [
-	`yt-dlp -x --audio-format wav -o tmp/audio.wav --no-warnings --extractor-args "youtube:player_client=android" https://www.youtube.com/watch?v=${videoId}`,
-	`yt-dlp -x --audio-format wav -o tmp/audio.wav --no-warnings --extractor-args "youtube:player_client=ios" https://www.youtube.com/watch?v=${videoId}`,
-	`yt-dlp -x --audio-format wav -o tmp/audio.wav --no-warnings --extractor-args "youtube:player_client=web" https://www.youtube.com/watch?v=${videoId}`,
-	`yt-dlp -x --audio-format wav -o tmp/audio.wav --no-warnings https://www.youtube.com/watch?v=${videoId}`,
+// Most thumbnails accepted by one POST /analyze-thumbnails request
+const THUMBNAIL_BATCH_LIMIT = 60;
+
+// Frame selection: "scene" lets image_scan.py sample preview.mp4 at scene
+// changes (no ffmpeg extraction), "uniform" extracts 1 frame every 15s with ffmpeg
+const FRAME_SAMPLER = process.env.FRAME_SAMPLER === "uniform" ? "uniform" : "scene";
+
+// YouTube download commands (fallback strategies); outputPath comes from jobPaths(videoId)
+const AUDIO_DOWNLOAD_COMMANDS = (videoId, outputPath) => [
+	`yt-dlp -x --audio-format wav -o "${outputPath}" --no-warnings --extractor-args "youtube:player_client=android" https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -x --audio-format wav -o "${outputPath}" --no-warnings --extractor-args "youtube:player_client=ios" https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -x --audio-format wav -o "${outputPath}" --no-warnings --extractor-args "youtube:player_client=web" https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -x --audio-format wav -o "${outputPath}" --no-warnings https://www.youtube.com/watch?v=${videoId}`,
 ];
 
-const VIDEO_DOWNLOAD_COMMANDS = (videoId) => [
+const VIDEO_DOWNLOAD_COMMANDS = (videoId, outputPath) => [
 	// Ensure we get video+audio or video-only (not audio-only)
 	// Format codes: bv = best video, ba = best audio, b = best (video+audio)
-	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o tmp/preview.mp4 --no-warnings --extractor-args "youtube:player_client=android" https://www.youtube.com/watch?v=${videoId}`,
-	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o tmp/preview.mp4 --no-warnings --extractor-args "youtube:player_client=ios" https://www.youtube.com/watch?v=${videoId}`,
-	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o tmp/preview.mp4 --no-warnings --extractor-args "youtube:player_client=web" https://www.youtube.com/watch?v=${videoId}`,
-	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o tmp/preview.mp4 --no-warnings https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o "${outputPath}" --no-warnings --extractor-args "youtube:player_client=android" https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o "${outputPath}" --no-warnings --extractor-args "youtube:player_client=ios" https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o "${outputPath}" --no-warnings --extractor-args "youtube:player_client=web" https://www.youtube.com/watch?v=${videoId}`,
+	`yt-dlp -f "bv*[height<=360]+ba/bv*[height<=360]/best[height<=360][ext=mp4]/worst[ext=mp4]" -o "${outputPath}" --no-warnings https://www.youtube.com/watch?v=${videoId}`,
 ];
 
 module.exports = {
 	pythonCmd,
 	TMP_DIR,
 	DB_PATH,
-	AUDIO_PATH,
-	VIDEO_PATH,
+	jobPaths,
+	MAX_CONCURRENT_SCANS,
+	SCAN_CORE_BUDGET,
+	SCAN_WORKER_ENABLED,
+	SCAN_WORKER_SOCKET,
+	SCAN_WORKER_PROCESSES,
 	TIMEOUTS,
+	THUMBNAIL_BATCH_LIMIT,
+	FRAME_SAMPLER,
 	AUDIO_DOWNLOAD_COMMANDS,
 	VIDEO_DOWNLOAD_COMMANDS,
 };
@@ -1,20 +1,26 @@
 /* eslint-env node */
 
-const { execSync } = require("child_process");
+const { exec } = require("child_process");
+const { promisify } = require("util");
 const fs = require("fs-extra");
-const { AUDIO_DOWNLOAD_COMMANDS, VIDEO_DOWNLOAD_COMMANDS, TIMEOUTS, AUDIO_PATH, VIDEO_PATH } = require("./config");
+const { AUDIO_DOWNLOAD_COMMANDS, VIDEO_DOWNLOAD_COMMANDS, TIMEOUTS, FRAME_SAMPLER, jobPaths } = require("./config");
+
+// Async so a download for one video doesn't block the server (and every other
+// scan) while yt-dlp/ffmpeg run. Each job downloads into its own tmp/<videoId>/.
+const execAsync = promisify(exec);
 
 // Download audio from YouTube
 async function downloadAudio(videoId) {
 	console.log("✅ Downloading audio...");
 	let audioDownloaded = false;
-	const commands = AUDIO_DOWNLOAD_COMMANDS(videoId);
+	const AUDIO_PATH = jobPaths(videoId).audio;
+	const commands = AUDIO_DOWNLOAD_COMMANDS(videoId, AUDIO_PATH);
 
 	for (const cmd of commands) {
 		try {
-			execSync(cmd, {
-				stdio: "inherit",
+			await execAsync(cmd, {
 				timeout: TIMEOUTS.AUDIO_DOWNLOAD,
+				maxBuffer: 10 * 1024 * 1024,
 			});
 			if (fs.existsSync(AUDIO_PATH)) {
 				audioDownloaded = true;
@@ -44,13 +50,14 @@ async function downloadAudio(videoId) {
 async function downloadVideo(videoId) {
 	console.log("✅ Downloading lowest quality video...");
 	let videoDownloaded = false;
-	const commands = VIDEO_DOWNLOAD_COMMANDS(videoId);
+	const VIDEO_PATH = jobPaths(videoId).video;
+	const commands = VIDEO_DOWNLOAD_COMMANDS(videoId, VIDEO_PATH);
 
 	for (const cmd of commands) {
 		try {
-			execSync(cmd, {
-				stdio: "inherit",
+			await execAsync(cmd, {
 				timeout: TIMEOUTS.VIDEO_DOWNLOAD,
+				maxBuffer: 10 * 1024 * 1024,
 			});
 			if (fs.existsSync(VIDEO_PATH)) {
 				videoDownloaded = true;
@@ -80,11 +87,11 @@ async function downloadVideo(videoId) {
 	
 	// Validate video file with ffprobe to ensure it's not corrupted
 	try {
-		const { execSync } = require("child_process");
-		const probeOutput = execSync(
+		const { stdout } = await execAsync(
 			`ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "${VIDEO_PATH}"`,
-			{ timeout: 10000, stdio: "pipe" }
-		).toString().trim();
+			{ timeout: 10000 }
+		);
+		const probeOutput = stdout.toString().trim();
 		
 		const duration = parseFloat(probeOutput);
 		if (!duration || duration <= 0 || isNaN(duration)) {
@@ -108,13 +115,10 @@ async function downloadVideo(videoId) {
 	return true;
 }
 
-// Extract frames from video
-function extractFrames() {
-	console.log("✅ Extracting frames (optimized: max 30 frames, every 15s)...");
-	
+// Extract frames from the job's video into its workspace
+async function extractFrames(videoId) {
 	// Verify video file exists and is not empty
-	const fs = require("fs-extra");
-	const { VIDEO_PATH } = require("./config");
+	const { dir: jobDir, video: VIDEO_PATH, frames: FRAME_PATTERN } = jobPaths(videoId);
 	
 	if (!fs.existsSync(VIDEO_PATH)) {
 		throw new Error("Video file does not exist");
@@ -129,34 +133,42 @@ function extractFrames() {
 		// Less than 1KB is suspicious
 		throw new Error(`Video file appears corrupted (only ${stats.size} bytes)`);
 	}
+
+	// OPTIMIZATION: image_scan.py samples frames at scene changes straight from
+	// the video, so there is nothing to extract (and no full ffmpeg decode)
+	if (FRAME_SAMPLER === "scene") {
+		console.log("✅ Frames will be sampled at scene changes by the image scan");
+		return;
+	}
+
+	console.log("✅ Extracting frames (optimized: max 30 frames, every 15s)...");
 	
 	try {
 		// OPTIMIZATION: Extract 1 frame every 15 seconds, max 30 frames (was 10s/50 frames)
 		// This is 3x faster while still providing good coverage
 		// Use -err_detect ignore_err and -fflags +genpts to handle partial/corrupted files better
-		execSync(
-			"ffmpeg -err_detect ignore_err -fflags +genpts+discardcorrupt -i tmp/preview.mp4 -vf \"fps=1/15\" -frames:v 30 tmp/frame_%03d.jpg -y",
+		await execAsync(
+			`ffmpeg -err_detect ignore_err -fflags +genpts+discardcorrupt -i "${VIDEO_PATH}" -vf "fps=1/15" -frames:v 30 "${FRAME_PATTERN}" -y`,
 			{
-				stdio: "inherit",
 				timeout: TIMEOUTS.FRAME_EXTRACTION,
+				maxBuffer: 10 * 1024 * 1024,
 			}
 		);
 		
 		// Verify at least one frame was extracted
-		const tmpDir = require("./config").TMP_DIR;
-		const frameFiles = fs.readdirSync(tmpDir).filter(f => f.startsWith("frame_") && f.endsWith(".jpg"));
+		const frameFiles = fs.readdirSync(jobDir).filter(f => f.startsWith("frame_") && f.endsWith(".jpg"));
 		if (frameFiles.length === 0) {
 			// Try alternative extraction method for corrupted files
 			console.warn("⚠️ No frames extracted with standard method, trying alternative...");
 			try {
-				execSync(
-					"ffmpeg -err_detect ignore_err -fflags +genpts+discardcorrupt -analyzeduration 10000000 -probesize 10000000 -i tmp/preview.mp4 -vf \"fps=1/15\" -frames:v 30 tmp/frame_%03d.jpg -y",
+				await execAsync(
+					`ffmpeg -err_detect ignore_err -fflags +genpts+discardcorrupt -analyzeduration 10000000 -probesize 10000000 -i "${VIDEO_PATH}" -vf "fps=1/15" -frames:v 30 "${FRAME_PATTERN}" -y`,
 					{
-						stdio: "inherit",
 						timeout: TIMEOUTS.FRAME_EXTRACTION,
+						maxBuffer: 10 * 1024 * 1024,
 					}
 				);
-				const retryFrames = fs.readdirSync(tmpDir).filter(f => f.startsWith("frame_") && f.endsWith(".jpg"));
+				const retryFrames = fs.readdirSync(jobDir).filter(f => f.startsWith("frame_") && f.endsWith(".jpg"));
 				if (retryFrames.length === 0) {
 					throw new Error("No frames could be extracted - video file is too corrupted");
 				}
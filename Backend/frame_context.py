@@ -0,0 +1,124 @@
+"""Decode-once frame context shared by the image detectors.
+
+A FrameContext holds one decoded BGR image and computes the derivatives the
+detectors need (grayscale, HSV, red masks, Laplacian, RGB/PIL) on first use,
+so running several detectors on the same image never decodes or converts it
+twice. It also carries the YOLO detections for the image, so detectors that
+care about people or animals reuse one inference instead of running their own.
+"""
+import cv2
+import numpy as np
+
+
+def hamming_distance(hash_a, hash_b):
+    """Number of differing bits between two 64-bit perceptual hashes"""
+    return bin((hash_a ^ hash_b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+class FrameContext:
+    """One decoded image plus lazily memoized derivatives and YOLO detections"""
+
+    def __init__(self, image):
+        self.image = image  # BGR, as returned by cv2
+        self.detections = []  # (name, confidence, (x1, y1, x2, y2))
+        self._cache = {}
+
+    @classmethod
+    def from_path(cls, path):
+        """Decode an image file; returns None if it can't be read"""
+        image = cv2.imread(path)
+        return cls(image) if image is not None else None
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode an in-memory encoded image (JPEG/PNG/WebP); None if invalid"""
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        if buffer.size == 0:
+            return None
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        return cls(image) if image is not None else None
+
+    @property
+    def height(self):
+        return self.image.shape[0]
+
+    @property
+    def width(self):
+        return self.image.shape[1]
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def gray(self):
+        return self._memo("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self):
+        return self._memo("hsv", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV))
+
+    @property
+    def rgb(self):
+        return self._memo("rgb", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB))
+
+    @property
+    def pil_image(self):
+        """RGB PIL image for the transformers classifiers"""
+        def compute():
+            from PIL import Image
+            return Image.fromarray(self.rgb)
+        return self._memo("pil", compute)
+
+    @property
+    def brightness(self):
+        """Mean grayscale brightness (0-255)"""
+        return self._memo("brightness", lambda: float(np.mean(self.gray)))
+
+    @property
+    def laplacian(self):
+        """Full-frame Laplacian of the grayscale image; slice it for ROIs"""
+        return self._memo("laplacian", lambda: cv2.Laplacian(self.gray, cv2.CV_64F))
+
+    @property
+    def phash(self):
+        """64-bit DCT perceptual hash; re-encoded or resized copies stay within a few bits"""
+        def compute():
+            small = cv2.resize(self.gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+            # Lowest 8x8 frequencies, thresholded at their median (DC term excluded)
+            low = cv2.dct(small)[:8, :8].flatten()
+            bits = low > np.median(low[1:])
+            return int("".join("1" if bit else "0" for bit in bits), 2)
+        return self._memo("phash", compute)
+
+    def red_mask(self, min_saturation, min_value, max_value=255):
+        """Mask of red pixels (both ends of the hue circle) for the given S/V bounds"""
+        def compute():
+            low = cv2.inRange(self.hsv, np.array([0, min_saturation, min_value]), np.array([10, 255, max_value]))
+            high = cv2.inRange(self.hsv, np.array([170, min_saturation, min_value]), np.array([180, 255, max_value]))
+            return cv2.bitwise_or(low, high)
+        return self._memo(("red_mask", min_saturation, min_value, max_value), compute)
+
+    def detect_objects(self, model, conf=0.6):
+        """Run YOLO once on this image and keep the detections on the context"""
+        self._store_detections(model, model(self.image, verbose=False, conf=conf))
+        return self.detections
+
+    @staticmethod
+    def detect_objects_batch(model, contexts, conf=0.6):
+        """Run YOLO once over several contexts; results map back in order"""
+        if not contexts:
+            return
+        results = model([ctx.image for ctx in contexts], verbose=False, conf=conf)
+        for ctx, result in zip(contexts, results):
+            ctx._store_detections(model, [result])
+
+    def _store_detections(self, model, results):
+        self.detections = []
+        for r in results:
+            for i, cls in enumerate(r.boxes.cls):
+                name = model.names[int(cls)].lower()
+                confidence = float(r.boxes.conf[i])
+                box = tuple(float(v) for v in r.boxes.xyxy[i].cpu().numpy())
+                self.detections.append((name, confidence, box))
@@ -0,0 +1,229 @@
+"""Scene-change-aware frame sampling straight from the job's preview.mp4.
+
+Uniform sampling (ffmpeg fps=1/15, max 30 frames) gives long videos sparse
+coverage and short ones redundant frames, and ffmpeg decodes the whole video
+to produce them. Instead we:
+
+1. read the video's packets without decoding them (OpenCV's raw stream mode,
+   a few percent of the cost of a decode) and find the scene changes from
+   their sizes alone. Encoders start a new keyframe at a cut (x264's
+   scenecut), and a cut between keyframes makes a delta frame several times
+   larger than the ones around it, so keyframes off the regular keyframe
+   cadence and oversized delta frames are cuts. A cut that falls on a
+   scheduled keyframe leaves no trace - the gap filling below still covers
+   its scene;
+2. spend the inference budget on the strongest scene changes first, then fill
+   the largest remaining gaps in coverage (probe timestamps every
+   PROBE_INTERVAL) - but never closer together than MIN_GAP_SECONDS, so short
+   or static videos use fewer frames;
+3. decode only the chosen frames, in time order: each is reached by grab()
+   steps from the previous one or by a seek, whichever decodes fewer frames
+   (the packet pass knows where the keyframes a seek restarts from are).
+
+So only about FRAME_BUDGET frames (and the keyframe runs before them) are
+ever decoded, where the uniform sampler decodes all of them.
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+
+# "scene" (default) samples preview.mp4 here; "uniform" uses the frames ffmpeg extracted
+SAMPLER = os.environ.get("FRAME_SAMPLER", "scene")
+
+# Inference budget: at most this many frames go to the image models
+FRAME_BUDGET = max(1, int(os.environ.get("FRAME_SAMPLE_BUDGET", "30")))
+
+# Gap-filling candidates every PROBE_INTERVAL seconds, widening the interval
+# for long videos so there are never more than MAX_PROBES of them (nor more
+# than MAX_PROBES scene changes considered)
+PROBE_INTERVAL = 2.0
+MAX_PROBES = 300
+
+# OpenCV seeks to the last keyframe at least this many frames before the
+# target and decodes forward from there. With the keyframe positions known,
+# each chosen frame is reached by whichever decodes fewer frames: grab()s
+# from the current position, or a seek
+SEEK_BACKOFF_FRAMES = 16
+
+# A delta frame this many times the median size of the delta frames on
+# either side of it (SIZE_WINDOW_FRAMES each, the larger median) is a cut.
+# Taking the larger side keeps a cut into a busier scene from making every
+# frame after it look like one.
+SCENE_THRESHOLD = 3.0
+SIZE_WINDOW_FRAMES = 48
+# Rows per median batch - keeps the window buffer small for hour-long video
+CHUNK_FRAMES = 4096
+
+# Gap-filling frames are never closer than this to an already chosen frame
+MIN_GAP_SECONDS = 10.0
+
+
+def read_packets(video_path):
+    """(packet sizes, keyframe flags) of every frame, without decoding; None if unavailable"""
+    cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    try:
+        if not cap.isOpened():
+            return None
+        sizes = []
+        keys = []
+        while True:
+            ok, packet = cap.read()
+            if not ok:
+                break
+            sizes.append(packet.size)
+            keys.append(bool(cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+    finally:
+        cap.release()
+    if not sizes:
+        return None
+    return np.array(sizes, dtype=np.float64), np.array(keys)
+
+
+def _window_medians(values, width):
+    """Medians of the width values before and after each value (edge-padded), larger of the two"""
+    padded = np.concatenate([np.full(width, values[0]), values, np.full(width, values[-1])])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width)
+    medians = np.empty(len(values))
+    for start in range(0, len(values), CHUNK_FRAMES):
+        end = min(start + CHUNK_FRAMES, len(values))
+        before = np.median(windows[start:end], axis=1)
+        after = np.median(windows[start + width + 1:end + width + 1], axis=1)
+        medians[start:end] = np.maximum(before, after)
+    return medians
+
+
+def scene_scores(sizes, keys):
+    """Per-frame cut score (0 for frames that are not cuts) from packet sizes and keyframe flags"""
+    scores = np.zeros(len(sizes))
+    delta = np.flatnonzero(~keys)
+    if len(delta) == 0:
+        # Every frame a keyframe (intra-only video): sizes tell nothing
+        return scores
+
+    # Oversized delta frames
+    delta_sizes = sizes[delta]
+    ratio = delta_sizes / np.maximum(_window_medians(delta_sizes, SIZE_WINDOW_FRAMES), 1.0)
+    cuts = ratio >= SCENE_THRESHOLD
+    scores[delta[cuts]] = ratio[cuts]
+
+    # Keyframes closer to the previous one than the usual keyframe interval
+    # were inserted by the encoder at a cut; scored against a typical delta frame
+    key_frames = np.flatnonzero(keys)
+    if len(key_frames) > 2:
+        intervals = np.diff(key_frames)
+        values, counts = np.unique(intervals, return_counts=True)
+        inserted = key_frames[1:][intervals < values[np.argmax(counts)]]
+        scores[inserted] = np.maximum(sizes[inserted] / max(float(np.median(delta_sizes)), 1.0), SCENE_THRESHOLD)
+    return scores
+
+
+def probe_scores(scores, fps):
+    """(timestamp, score) candidates: the strongest cuts plus evenly spaced gap fillers"""
+    duration = len(scores) / fps
+    interval = max(PROBE_INTERVAL, duration / MAX_PROBES)
+    step = max(1, int(round(interval * fps)))
+    # The first frame has nothing to differ from; treat it as a cut so it is always kept
+    probes = {0: float("inf")}
+    for frame in range(step, len(scores), step):
+        probes[frame] = 0.0
+    # Strongest cuts first; a weaker one within the same interval is the same scene change
+    cuts = np.flatnonzero(scores)
+    kept = []
+    for frame in cuts[np.argsort(scores[cuts], kind="stable")[::-1]]:
+        if len(kept) == MAX_PROBES:
+            break
+        if all(abs(frame - other) >= step for other in kept):
+            kept.append(frame)
+            probes[int(frame)] = float(scores[frame])
+    return [(frame / fps, score) for frame, score in sorted(probes.items())]
+
+
+def select_timestamps(probes, budget=FRAME_BUDGET, threshold=SCENE_THRESHOLD, min_gap=MIN_GAP_SECONDS):
+    """Pick up to budget probe timestamps: scene changes first, then coverage gaps"""
+    # 1. Scene changes, strongest first
+    cuts = sorted((p for p in probes if p[1] >= threshold), key=lambda p: p[1], reverse=True)
+    chosen = [t for t, _ in cuts[:budget]]
+
+    # 2. Fill the largest gaps until the budget is spent or every probe is
+    #    within min_gap of a chosen frame
+    remaining = [t for t, _ in probes if t not in chosen]
+    while len(chosen) < budget and remaining:
+        t, gap = max(
+            ((t, min(abs(t - c) for c in chosen) if chosen else float("inf")) for t in remaining),
+            key=lambda item: item[1],
+        )
+        if gap < min_gap:
+            break
+        chosen.append(t)
+        remaining.remove(t)
+
+    return sorted(chosen)
+
+
+def _seek_cost(frame, key_frames):
+    """Frames a seek to frame decodes: from the keyframe OpenCV restarts at"""
+    target = max(0, frame - SEEK_BACKOFF_FRAMES)
+    if key_frames is None or len(key_frames) == 0:
+        # Unknown keyframes: at least the backoff
+        return frame - target
+    restart = key_frames[max(0, np.searchsorted(key_frames, target, side="right") - 1)]
+    return frame - min(restart, target)
+
+
+def _read_frame(cap, frame, key_frames=None):
+    """Decode frame number frame (None if unreadable), by grab() or seek"""
+    ahead = frame - int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if 0 <= ahead <= _seek_cost(frame, key_frames):
+        for _ in range(ahead):
+            if not cap.grab():
+                return None
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+    ok, image = cap.read()
+    return image if ok else None
+
+
+def sample_frames(video_path, budget=FRAME_BUDGET):
+    """Yield up to budget BGR frames from video_path, in time order.
+
+    Yields nothing if the video cannot be opened or its frame rate is unknown.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            print(f"⚠️ Could not open {video_path} for frame sampling", file=sys.stderr)
+            return
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0
+        if fps <= 0:
+            print(f"⚠️ Unknown frame rate for {video_path}, skipping frame sampling", file=sys.stderr)
+            return
+
+        packets = read_packets(video_path)
+        if packets is None:
+            # No packet access (another capture backend): even coverage only
+            print(f"⚠️ Could not read packets of {video_path}, sampling without scene changes", file=sys.stderr)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+            if frame_count <= 0:
+                return
+            scores = np.zeros(frame_count)
+            key_frames = None
+        else:
+            scores = scene_scores(*packets)
+            key_frames = np.flatnonzero(packets[1])
+
+        probes = probe_scores(scores, fps)
+        timestamps = select_timestamps(probes, budget)
+        print(
+            f"🎞️ Frame sampler: {len(timestamps)}/{budget} frames from {len(probes)} candidates "
+            f"({np.count_nonzero(scores)} scene changes, {len(scores) / fps:.0f}s video)",
+            file=sys.stderr,
+        )
+
+        for t in timestamps:
+            frame = _read_frame(cap, int(round(t * fps)), key_frames)
+            if frame is not None:
+                yield frame
+    finally:
+        cap.release()
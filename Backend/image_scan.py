@@ -1,30 +1,29 @@
-from ultralytics import YOLO
-import cv2
-import os
 import json
 import sys
-import numpy as np
-import signal
 
-# Handle graceful shutdown
-def signal_handler(sig, frame):
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
+from scan_worker import forward_to_worker
+
+# Thin-client fast path: hand the job to the long-lived worker if it is running
+if __name__ == "__main__":
+    forward_to_worker("image", sys.argv[1:])
 
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+# Imported first so the "import" timing span covers everything below
+from timing import timed_run, span, timed_iter
+
+import cv2
+import os
+import numpy as np
+import signal
 
 # Suppress YOLO verbose output - redirect to stderr so JSON goes to stdout
 import warnings
 warnings.filterwarnings("ignore")
 
-# Suppress YOLO progress messages
-os.environ["YOLO_VERBOSE"] = "False"
-
-model = YOLO("yolov8n.pt", verbose=False)
-
-flags = []
+from scan_models import get_yolo_model
+from frame_context import FrameContext, hamming_distance
+from frame_sampler import SAMPLER, FRAME_BUDGET, sample_frames
+from workspace import DEFAULT_JOB_DIR, job_dir_arg, job_path
+from thread_governor import governed, rebalance
 
 # Expanded list of dangerous objects to detect (weapons)
 dangerous_objects = [
@@ -38,22 +37,33 @@ scary_objects = [
     "person"  # Will check if person looks scary/distorted
 ]
 
-# OPTIMIZATION: Process max 30 frames (was 50) for faster scanning
-frame_files = sorted([f for f in os.listdir("tmp") if f.endswith(".jpg")])[:30]
+# OPTIMIZATION: frames go through YOLO in batches instead of one call per frame
+# (override with IMAGE_SCAN_BATCH_SIZE)
+BATCH_SIZE = max(1, int(os.environ.get("IMAGE_SCAN_BATCH_SIZE", "8")))
+
+# OPTIMIZATION: skip frames that are near-duplicates of one already scanned
+# (static intros, slides, talking heads). IMAGE_DEDUP=0 scans every frame.
+DEDUP_ENABLED = os.environ.get("IMAGE_DEDUP", "1") != "0"
+# Frames whose 64-bit perceptual hashes differ in at most this many bits count as the same shot
+DEDUP_MAX_DISTANCE = int(os.environ.get("IMAGE_DEDUP_DISTANCE", "5"))
 
 # Removed simple color-based heuristics - relying on AI (YOLO) instead
 
-def detect_scary_face(img_path):
+_face_cascade = None
+
+def get_face_cascade():
+    """Load OpenCV's Haar Cascade face detector once per process"""
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _face_cascade
+
+def detect_scary_face(img):
     """Use AI/ML to detect if faces look scary, distorted, or monster-like"""
     try:
-        img = cv2.imread(img_path)
-        if img is None:
-            return False
-        
         # Use OpenCV's face detector (Haar Cascade) to find faces
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        faces = get_face_cascade().detectMultiScale(gray, 1.1, 4)
         
         if len(faces) == 0:
             return False
@@ -82,74 +92,190 @@ def detect_scary_face(img_path):
     except Exception as e:
         return False
 
-for file in frame_files:
-    img_path = f"tmp/{file}"
-    
-    # AI-based detection using YOLO (no simple color heuristics)
-    try:
-        # Use higher confidence threshold for more accurate detection
-        results = model(img_path, verbose=False, conf=0.6)  # Require 60% confidence
-        
-        detected_objects = []
-        weapon_detected = False
-        person_detected = False
-        
-        for r in results:
-            for i, cls in enumerate(r.boxes.cls):
-                confidence = float(r.boxes.conf[i])
-                name = model.names[int(cls)].lower()
-                detected_objects.append((name, confidence))
-                
-                # Check for weapons with high confidence
-                if confidence >= 0.7 and any(danger in name for danger in dangerous_objects):
-                    weapon_detected = True
-                    flags.append(f"weapon detected: {name} (confidence: {confidence:.2f})")
-                
-                # Check for person (context for dangerous scenes)
-                if name == "person" and confidence >= 0.7:
-                    person_detected = True
-        
-        # Context-aware detection: weapon + person = more dangerous
-        if weapon_detected and person_detected:
-            # Already flagged weapon, but this adds context
-            pass
-        
-        # Check for scary/monster content
-        if person_detected:
-            # Check if person looks scary/distorted (monster-like)
-            if detect_scary_face(img_path):
-                flags.append("scary/distorted face detected (monster-like)")
-        
-        # Check for scary animals in dark contexts
-        for obj_name, confidence in detected_objects:
-            if obj_name in ["bear", "wolf", "dog", "snake", "spider"] and confidence >= 0.6:
-                # Check if image is dark (scary context)
-                try:
-                    img = cv2.imread(img_path)
-                    if img is not None:
-                        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                        avg_brightness = np.mean(gray)
-                        # If dark scene + scary animal, flag it
-                        if avg_brightness < 40:
-                            flags.append(f"scary animal detected in dark context: {obj_name}")
-                            break
-                except:
-                    pass
-        
-    except Exception as e:
-        # If YOLO fails, continue to next frame
+def flag_frame(model, img, result):
+    """Apply the flagging logic to one frame's YOLO result"""
+    flags = []
+    detected_objects = []
+    weapon_detected = False
+    person_detected = False
+
+    for i, cls in enumerate(result.boxes.cls):
+        confidence = float(result.boxes.conf[i])
+        name = model.names[int(cls)].lower()
+        detected_objects.append((name, confidence))
+
+        # Check for weapons with high confidence
+        if confidence >= 0.7 and any(danger in name for danger in dangerous_objects):
+            weapon_detected = True
+            flags.append(f"weapon detected: {name} (confidence: {confidence:.2f})")
+
+        # Check for person (context for dangerous scenes)
+        if name == "person" and confidence >= 0.7:
+            person_detected = True
+
+    # Context-aware detection: weapon + person = more dangerous
+    if weapon_detected and person_detected:
+        # Already flagged weapon, but this adds context
         pass
-    
-    # Early exit: if we found something dangerous, stop processing
-    if flags:
-        break
-
-# Only print JSON to stdout, everything else goes to stderr
-try:
-	print(json.dumps(flags), file=sys.stdout)
-	sys.stdout.flush()
-except (KeyboardInterrupt, BrokenPipeError):
-	# Graceful shutdown - output empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
+
+    # Check for scary/monster content
+    if person_detected:
+        # Check if person looks scary/distorted (monster-like)
+        if detect_scary_face(img):
+            flags.append("scary/distorted face detected (monster-like)")
+
+    # Check for scary animals in dark contexts
+    for obj_name, confidence in detected_objects:
+        if obj_name in ["bear", "wolf", "dog", "snake", "spider"] and confidence >= 0.6:
+            # Check if image is dark (scary context)
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            avg_brightness = np.mean(gray)
+            # If dark scene + scary animal, flag it
+            if avg_brightness < 40:
+                flags.append(f"scary animal detected in dark context: {obj_name}")
+                break
+
+    return flags
+
+class FrameDeduplicator:
+    """Drops frames that are near-duplicates of an already kept frame and counts them"""
+
+    def __init__(self, max_distance=DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.kept_hashes = []
+        self.seen = 0
+        self.skipped = 0
+
+    def is_duplicate(self, img):
+        self.seen += 1
+        frame_hash = FrameContext(img).phash
+        # Compare with every kept frame, not just the previous one - videos
+        # often cut back to the same shot
+        if any(hamming_distance(frame_hash, kept) <= self.max_distance for kept in self.kept_hashes):
+            self.skipped += 1
+            return True
+        self.kept_hashes.append(frame_hash)
+        return False
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.seen if self.seen else 0.0
+
+    def log(self):
+        if self.seen:
+            print(
+                f"🔁 Frame dedup: skipped {self.skipped}/{self.seen} near-duplicate frames ({self.skip_ratio:.0%})",
+                file=sys.stderr,
+            )
+
+
+def read_frame_files(frame_dir, limit=FRAME_BUDGET):
+    """Decode the frames ffmpeg extracted into the job directory, in order"""
+    frame_files = sorted([f for f in os.listdir(frame_dir) if f.endswith(".jpg")])[:limit]
+    for file in frame_files:
+        img = cv2.imread(os.path.join(frame_dir, file))
+        if img is not None:
+            yield img
+
+
+def iter_frames(frame_dir):
+    """Frames to scan: sampled from preview.mp4 at scene changes, else the extracted frame files"""
+    video_path = job_path(frame_dir, "preview.mp4")
+    if SAMPLER == "scene" and os.path.exists(video_path):
+        sampled = False
+        for img in sample_frames(video_path):
+            sampled = True
+            yield img
+        if sampled:
+            return
+    yield from read_frame_files(frame_dir)
+
+
+def iter_frame_batches(images, batch_size, dedup=None):
+    """Yield batches of up to batch_size distinct frames from an iterable of images"""
+    frames = []
+    for img in images:
+        if dedup is not None:
+            with span("dedup"):
+                duplicate = dedup.is_duplicate(img)
+            if duplicate:
+                continue
+        frames.append(img)
+        # Frames are decoded lazily, so memory stays bounded by the batch size
+        if len(frames) == batch_size:
+            yield frames
+            frames = []
+    if frames:
+        yield frames
+
+
+@timed_run("image")
+@governed("image")
+def scan(job_dir=None, batch_size=BATCH_SIZE):
+    """Run YOLO + face heuristics over the job's frames and return flags"""
+    model = get_yolo_model()
+    frame_dir = job_dir or DEFAULT_JOB_DIR
+
+    flags = []
+
+    # OPTIMIZATION: at most FRAME_BUDGET frames (default 30), picked at scene changes
+    dedup = FrameDeduplicator() if DEDUP_ENABLED else None
+    # Seeking/decoding frames counts as io (dedup is reported separately)
+    batches = iter_frame_batches(iter_frames(frame_dir), batch_size, dedup)
+    for frames in timed_iter(batches, "io"):
+        # Follow other scans starting/finishing between batches
+        rebalance()
+
+        # AI-based detection using YOLO (no simple color heuristics)
+        try:
+            # Use higher confidence threshold for more accurate detection
+            with span("inference"):
+                results = model(frames, verbose=False, conf=0.6)  # Require 60% confidence
+        except (RuntimeError, ValueError, cv2.error) as e:
+            # If YOLO fails, continue to next batch
+            print(f"⚠️ YOLO failed on a batch of {len(frames)} frames: {e}", file=sys.stderr)
+            continue
+
+        # Map results back to frames in order; stop at the first flagged frame
+        # so the output matches the old frame-by-frame scan
+        with span("post"):
+            for img, result in zip(frames, results):
+                try:
+                    flags.extend(flag_frame(model, img, result))
+                except (ValueError, cv2.error) as e:
+                    print(f"⚠️ Could not flag frame: {e}", file=sys.stderr)
+                if flags:
+                    break
+
+        # Early exit: if we found something dangerous, skip the remaining batches
+        if flags:
+            break
+
+    if dedup is not None:
+        dedup.log()
+    return flags
+
+
+# Handle graceful shutdown
+def signal_handler(sig, frame):
+    print("[]", file=sys.stdout)
+    sys.stdout.flush()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    # Optional argument: the job's working directory (defaults to tmp/)
+    flags = scan(job_dir_arg(sys.argv))
+
+    # Only print JSON to stdout, everything else goes to stderr
+    try:
+        print(json.dumps(flags), file=sys.stdout)
+        sys.stdout.flush()
+    except (KeyboardInterrupt, BrokenPipeError):
+        # Graceful shutdown - output empty result
+        print("[]", file=sys.stdout)
+        sys.stdout.flush()
+        sys.exit(0)
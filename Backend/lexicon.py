@@ -0,0 +1,69 @@
+"""Compiled multi-category keyword matcher for the transcript analyzers.
+
+A Lexicon is built once from keyword lists and regex patterns and then finds
+every category hit in a single pass over the text, instead of running one
+re.search per keyword per sentence.
+
+Literal terms keep the old r'\\b' + re.escape(term) + r'\\b' semantics: the
+text is split into \\w+ tokens once, and every run of up to N tokens (N being
+the longest term) is looked up in a dict. Overlapping hits are all reported,
+so "kill myself" yields both "kill" and "kill myself" just like the separate
+searches did. Regex patterns are combined into one alternation with a named
+group per pattern and matched left to right without overlap, so patterns
+that can match the same words should go in separate Lexicons.
+"""
+import re
+from collections import Counter
+
+_WORD = re.compile(r"\w+")
+
+
+class Lexicon:
+    """Keyword lists and regex patterns compiled into a single-pass matcher"""
+
+    def __init__(self, terms=None, patterns=None, ignore_case=True):
+        """terms: {category: [word or phrase]}, patterns: {category: [regex]}"""
+        self.ignore_case = ignore_case
+
+        # term text -> categories it belongs to
+        self._terms = {}
+        self._max_tokens = 0
+        for category, words in (terms or {}).items():
+            for word in words:
+                key = word.lower() if ignore_case else word
+                if not (key[:1].isalnum() or key[:1] == "_") or not (key[-1:].isalnum() or key[-1:] == "_"):
+                    raise ValueError(f"lexicon term must start and end with a word character: {word!r}")
+                self._terms.setdefault(key, []).append(category)
+                self._max_tokens = max(self._max_tokens, len(_WORD.findall(key)))
+
+        # named group -> (category, original pattern)
+        self._groups = {}
+        alternatives = []
+        for category, regexes in (patterns or {}).items():
+            for pattern in regexes:
+                name = f"p{len(self._groups)}"
+                self._groups[name] = (category, pattern)
+                alternatives.append(f"(?P<{name}>{pattern})")
+        flags = re.IGNORECASE if ignore_case else 0
+        self._pattern = re.compile("|".join(alternatives), flags) if alternatives else None
+
+    def scan(self, text):
+        """Return {category: Counter(term or pattern -> hit count)} for one text"""
+        hits = {}
+        if self.ignore_case:
+            text = text.lower()
+
+        if self._terms:
+            spans = [m.span() for m in _WORD.finditer(text)]
+            for i, (start, _) in enumerate(spans):
+                for end_index in range(i, min(i + self._max_tokens, len(spans))):
+                    term = text[start:spans[end_index][1]]
+                    for category in self._terms.get(term, ()):
+                        hits.setdefault(category, Counter())[term] += 1
+
+        if self._pattern is not None:
+            for m in self._pattern.finditer(text):
+                category, pattern = self._groups[m.lastgroup]
+                hits.setdefault(category, Counter())[pattern] += 1
+
+        return hits
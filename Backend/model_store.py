@@ -0,0 +1,356 @@
+"""Local store for the model weights the scanners use.
+
+Without it, thumbnail_scan.py resolves its Hugging Face models through
+from_pretrained on every launch (a hub lookup even when the files are cached),
+and YOLO and Whisper weights are looked up by name relative to whatever
+directory the process starts in. The store pins every model into one
+directory (models/, or MODEL_STORE_DIR):
+
+    models/
+    ├── manifest.json                       # files, sizes and SHA-256 per model
+    ├── yolo/yolov8n/yolov8n.pt
+    ├── hf/Falconsai__nsfw_image_detection/ # config + model.safetensors + processor
+    ├── hf/openai__clip-vit-base-patch32/
+    └── whisper/tiny/tiny.pt                # or faster-whisper/tiny/ (CTranslate2)
+
+Hugging Face models are re-saved as safetensors, which transformers
+memory-maps on load instead of unpickling. The scanners call resolve(name)
+and load from the store path with local_files_only, so a stored model never
+touches the network. A model missing from the store falls back to the old
+by-name loading with a warning, unless MODEL_STORE_OFFLINE=1, where it is an
+error instead.
+
+    python model_store.py warm [--force] [NAME...]  # download, convert, hash, verify
+    python model_store.py verify [NAME...]          # re-hash every stored file
+    python model_store.py list                      # what is stored
+
+Only sizes are checked when a scanner loads a model (hashing hundreds of MB
+on every cold start would defeat the purpose); warm and verify re-hash.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    # No cross-process locking on Windows - don't warm the store twice at once
+    HAS_FCNTL = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.environ.get("MODEL_STORE_DIR", os.path.join(BASE_DIR, "models"))
+MANIFEST_PATH = os.path.join(STORE_DIR, "manifest.json")
+
+# MODEL_STORE=0 ignores the store (by-name loading, as before)
+ENABLED = os.environ.get("MODEL_STORE", "1") != "0"
+# MODEL_STORE_OFFLINE=1 refuses to load models that are not in the store
+OFFLINE = os.environ.get("MODEL_STORE_OFFLINE", "0") == "1"
+
+# Store kind of every model a scanner may load
+KINDS = {
+    "yolov8n.pt": "yolo",
+    "Falconsai/nsfw_image_detection": "image-classifier",
+    "openai/clip-vit-base-patch32": "clip",
+}
+
+_manifest = None
+# Names already warned about, so a missing model is reported once per process
+_warned = set()
+
+
+def whisper_key(model_name="tiny"):
+    """Store name of the Whisper model for the ASR engine that loads"""
+    import asr
+    prefix = "faster-whisper" if asr.RESOLVED_BACKEND == "faster-whisper" else "whisper"
+    return f"{prefix}:{model_name}"
+
+
+def default_models():
+    """Every model the scanners load with the current configuration"""
+    return list(KINDS) + [whisper_key()]
+
+
+def kind_of(name):
+    if name in KINDS:
+        return KINDS[name]
+    prefix, sep, _model = name.partition(":")
+    if sep and prefix in ("whisper", "faster-whisper"):
+        return prefix
+    raise ValueError(f"Unknown model '{name}' (known: {', '.join(default_models())})")
+
+
+def _entry_dir(name):
+    kind = kind_of(name)
+    if kind == "yolo":
+        model = os.path.splitext(name)[0]
+    elif kind in ("whisper", "faster-whisper"):
+        model = name.partition(":")[2]
+    else:
+        model = name.replace("/", "__")
+        kind = "hf"
+    return os.path.join(STORE_DIR, kind, model)
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("models", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def manifest():
+    """Stored models by name (read once per process)"""
+    global _manifest
+    if _manifest is None:
+        _manifest = _read_manifest()
+    return _manifest
+
+
+def _write_manifest(models):
+    global _manifest
+    # Write to a temp file and rename so loaders never see a partial manifest
+    tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"models": models}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+    _manifest = models
+
+
+def _files_present(entry):
+    root = os.path.join(STORE_DIR, entry["path"])
+    for rel_path, info in entry["files"].items():
+        try:
+            if os.path.getsize(os.path.join(root, rel_path)) != info["size"]:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def local_path(name):
+    """Path of name in the store, or None if it is not stored (or incomplete)"""
+    if not ENABLED:
+        return None
+    entry = manifest().get(name)
+    if entry is None or not _files_present(entry):
+        return None
+    root = os.path.join(STORE_DIR, entry["path"])
+    # Single-file models (YOLO, openai-whisper) load from the file itself
+    return os.path.join(root, entry["main"]) if entry.get("main") else root
+
+
+def resolve(name, fallback=None):
+    """Store path for name, else fallback (default: name itself) for by-name loading"""
+    path = local_path(name)
+    if path is not None:
+        return path
+    if ENABLED and OFFLINE:
+        raise FileNotFoundError(f"{name} is not in the model store ({STORE_DIR}); run python model_store.py warm")
+    if ENABLED and name not in _warned:
+        _warned.add(name)
+        print(f"⚠️ {name} is not in the model store, loading it by name (run python model_store.py warm)", file=sys.stderr)
+    return fallback if fallback is not None else name
+
+
+def pretrained_source(name):
+    """(path or repo id, from_pretrained kwargs) for a Hugging Face model"""
+    source = resolve(name)
+    if source != name:
+        # Stored copy: never ask the hub for a newer revision
+        return source, {"local_files_only": True}
+    return source, {}
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_files(root):
+    files = {}
+    for dir_path, _dir_names, file_names in os.walk(root):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            rel_path = os.path.relpath(path, root)
+            files[rel_path] = {"size": os.path.getsize(path), "sha256": _sha256(path)}
+    return files
+
+
+def _fetch_yolo(name, target_dir):
+    target = os.path.join(target_dir, name)
+    # Reuse weights an earlier by-name load left in the working directory
+    for existing in (os.path.abspath(name), os.path.join(BASE_DIR, name)):
+        if os.path.isfile(existing):
+            shutil.copy2(existing, target)
+            return name
+    from ultralytics.utils.downloads import attempt_download_asset
+    attempt_download_asset(target)
+    if not os.path.isfile(target):
+        raise FileNotFoundError(f"Could not download {name}")
+    return name
+
+
+def _fetch_hf(name, target_dir, kind):
+    if kind == "clip":
+        from transformers import CLIPModel as model_class, CLIPProcessor as processor_class
+    else:
+        from transformers import AutoImageProcessor as processor_class, AutoModelForImageClassification as model_class
+    processor_class.from_pretrained(name).save_pretrained(target_dir)
+    # OPTIMIZATION: safetensors is memory-mapped on load (no unpickling, no extra copy)
+    model_class.from_pretrained(name).save_pretrained(target_dir, safe_serialization=True)
+    return None
+
+
+def _fetch_whisper(name, target_dir):
+    import whisper
+    model_name = name.partition(":")[2]
+    # load_model downloads into target_dir, checks the published SHA-256 and
+    # loads the checkpoint once, so a broken download fails here and not in a scan
+    whisper.load_model(model_name, device="cpu", download_root=target_dir)
+    (checkpoint,) = [file_name for file_name in os.listdir(target_dir) if file_name.endswith(".pt")]
+    return checkpoint
+
+
+def _fetch_faster_whisper(name, target_dir):
+    from faster_whisper import download_model
+    download_model(name.partition(":")[2], output_dir=target_dir)
+    return None
+
+
+def _fetch(name, target_dir):
+    kind = kind_of(name)
+    if kind == "yolo":
+        return _fetch_yolo(name, target_dir)
+    if kind == "whisper":
+        return _fetch_whisper(name, target_dir)
+    if kind == "faster-whisper":
+        return _fetch_faster_whisper(name, target_dir)
+    return _fetch_hf(name, target_dir, kind)
+
+
+@contextlib.contextmanager
+def _store_lock():
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with open(os.path.join(STORE_DIR, ".lock"), "w") as lock_file:
+        if HAS_FCNTL:
+            # Blocks while another process is warming the store
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def warm(names=None, force=False):
+    """Download, convert and hash every model in names (default: all); returns a status per model"""
+    results = {}
+    with _store_lock():
+        models = _read_manifest()
+        for name in names or default_models():
+            entry = models.get(name)
+            if entry is not None and not force and _files_present(entry):
+                results[name] = "stored"
+                continue
+
+            final_dir = _entry_dir(name)
+            # Fetch into a temp dir and rename so a failed download leaves nothing half-stored
+            tmp_dir = f"{final_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            print(f"🔄 Storing {name}...", file=sys.stderr)
+            start = time.perf_counter()
+            try:
+                main = _fetch(name, tmp_dir)
+                files = _hash_files(tmp_dir)
+            except Exception as e:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                print(f"❌ Could not store {name}: {str(e)[:200]}", file=sys.stderr)
+                results[name] = f"error: {str(e)[:200]}"
+                continue
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(tmp_dir, final_dir)
+
+            models[name] = {
+                "kind": kind_of(name),
+                "path": os.path.relpath(final_dir, STORE_DIR),
+                "main": main,
+                "files": files,
+                "stored": round(time.time(), 3),
+            }
+            _write_manifest(models)
+            size_mb = sum(info["size"] for info in files.values()) / (1 << 20)
+            print(f"✅ Stored {name} ({size_mb:.1f} MB in {time.perf_counter() - start:.1f}s)", file=sys.stderr)
+            results[name] = "stored"
+    return results
+
+
+def verify(names=None):
+    """Re-hash stored files; returns "ok", "missing" or "corrupt: <file>" per model"""
+    models = _read_manifest()
+    results = {}
+    for name in names or sorted(models):
+        entry = models.get(name)
+        if entry is None:
+            results[name] = "missing"
+            continue
+        root = os.path.join(STORE_DIR, entry["path"])
+        results[name] = "ok"
+        for rel_path, info in entry["files"].items():
+            path = os.path.join(root, rel_path)
+            if not os.path.isfile(path) or os.path.getsize(path) != info["size"] or _sha256(path) != info["sha256"]:
+                results[name] = f"corrupt: {rel_path}"
+                break
+    return results
+
+
+def listing():
+    models = _read_manifest()
+    return {
+        "store": STORE_DIR,
+        "enabled": ENABLED,
+        "offline": OFFLINE,
+        "models": {
+            name: {
+                "kind": entry["kind"],
+                "path": entry["path"],
+                "size_mb": round(sum(info["size"] for info in entry["files"].values()) / (1 << 20), 1),
+                "complete": _files_present(entry),
+            }
+            for name, entry in sorted(models.items())
+        },
+        "not_stored": [name for name in default_models() if name not in models],
+    }
+
+
+def main(argv):
+    command = argv[0] if argv else "list"
+    names = [arg for arg in argv[1:] if not arg.startswith("--")]
+    if command == "warm":
+        results = warm(names, force="--force" in argv)
+        # A warm-up always ends with a full integrity check of what it stored
+        checked = verify([name for name, status in results.items() if status == "stored"])
+        results.update(checked)
+    elif command == "verify":
+        results = verify(names)
+    elif command == "list":
+        print(json.dumps(listing(), indent=2))
+        return 0
+    else:
+        print("Usage: python model_store.py [warm [--force] | verify | list] [NAME...]", file=sys.stderr)
+        return 2
+    print(json.dumps(results, indent=2))
+    return 0 if all(status in ("ok", "stored") for status in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,162 @@
+"""Optional ONNX Runtime backend for the vision models (YOLO and the NSFW classifier).
+
+VISION_BACKEND=onnx exports each model to ONNX the first time it is needed,
+optionally quantizes the weights to int8 (VISION_INT8=1), keeps the artifacts
+under cache/onnx/ and runs them through ONNX Runtime - on CPU-only machines
+this is considerably faster than eager PyTorch at fp32. Anything that goes
+wrong (onnx/onnxruntime not installed, an export that fails) falls back to the
+PyTorch model, so the scanners behave exactly as before.
+
+Exports are guarded by a per-artifact file lock, so pool workers starting at
+the same time export once and the others reuse the result.
+"""
+import os
+import sys
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    # No cross-process locking on Windows - two workers may export at once
+    HAS_FCNTL = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", os.path.join(BASE_DIR, "cache", "onnx"))
+
+# "torch" (default) or "onnx"
+BACKEND = os.environ.get("VISION_BACKEND", "torch").lower()
+# Dynamic int8 weight quantization of the exported models
+INT8 = os.environ.get("VISION_INT8", "0") == "1"
+
+# Image size YOLO is exported at (the ultralytics default)
+YOLO_IMGSZ = 640
+
+
+def enabled():
+    return BACKEND == "onnx"
+
+
+def backend_tag():
+    """Short description of the active backend, for model version tags"""
+    if not enabled():
+        return "torch"
+    return "onnx-int8" if INT8 else "onnx"
+
+
+def _artifact_path(name):
+    suffix = ".int8.onnx" if INT8 else ".onnx"
+    return os.path.join(CACHE_DIR, name.replace("/", "__") + suffix)
+
+
+def _quantize(fp32_path, int8_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+
+def _build_once(name, export):
+    """Path of the cached artifact for name, running export(fp32_path) if it is missing"""
+    path = _artifact_path(name)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path + ".lock", "w") as lock_file:
+        if HAS_FCNTL:
+            # Blocks while another worker is exporting the same model
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(path):
+                return path
+
+            fp32_path = os.path.join(CACHE_DIR, name.replace("/", "__") + ".onnx")
+            if not os.path.exists(fp32_path):
+                print(f"🔄 Exporting {name} to ONNX (one-time)...", file=sys.stderr)
+                # Export to a temp file and rename so no one loads a partial model
+                tmp_path = f"{fp32_path}.{os.getpid()}.tmp"
+                export(tmp_path)
+                os.replace(tmp_path, fp32_path)
+
+            if INT8:
+                print(f"🔄 Quantizing {name} to int8 (one-time)...", file=sys.stderr)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                _quantize(fp32_path, tmp_path)
+                os.replace(tmp_path, path)
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return path
+
+
+def load_yolo(weights, torch_loader):
+    """YOLO running on ONNX Runtime, or torch_loader() if the ONNX model is unavailable.
+
+    ultralytics loads .onnx weights through the same YOLO class, so results
+    (boxes, names) look exactly like the PyTorch model's.
+    """
+    if not enabled():
+        return torch_loader()
+    try:
+        import onnxruntime  # noqa: F401 - fail early if the runtime is missing
+        from ultralytics import YOLO
+
+        def export(tmp_path):
+            # dynamic=True so image_scan.py can send batches of frames
+            exported = torch_loader().export(format="onnx", imgsz=YOLO_IMGSZ, dynamic=True, verbose=False)
+            os.replace(exported, tmp_path)
+
+        path = _build_once(os.path.splitext(os.path.basename(weights))[0], export)
+        model = YOLO(path, task="detect", verbose=False)
+        print(f"✅ YOLO running on ONNX Runtime ({backend_tag()})", file=sys.stderr)
+        return model
+    except Exception as e:
+        print(f"⚠️ ONNX backend unavailable for {weights} ({str(e)[:200]}), using PyTorch", file=sys.stderr)
+        return torch_loader()
+
+
+class _Outputs:
+    def __init__(self, logits):
+        self.logits = logits
+
+
+class OnnxImageClassifier:
+    """Drop-in for AutoModelForImageClassification inference: model(pixel_values=...).logits"""
+
+    def __init__(self, path, config):
+        import onnxruntime
+        self.config = config
+        self._session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+    def __call__(self, pixel_values, **unused):
+        import torch
+        (logits,) = self._session.run(["logits"], {"pixel_values": pixel_values.cpu().numpy()})
+        return _Outputs(torch.from_numpy(logits))
+
+
+def load_image_classifier(model, model_name):
+    """ONNX Runtime version of a transformers image classifier, or model itself on failure"""
+    if not enabled():
+        return model
+    try:
+        import torch
+
+        def export(tmp_path):
+            size = model.config.image_size if hasattr(model.config, "image_size") else 224
+            dummy = torch.zeros(1, model.config.num_channels, size, size)
+            model.eval()
+            torch.onnx.export(
+                model,
+                (dummy,),
+                tmp_path,
+                input_names=["pixel_values"],
+                output_names=["logits"],
+                # Batch axis stays dynamic for the batched thumbnail scan
+                dynamic_axes={"pixel_values": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=17,
+            )
+
+        classifier = OnnxImageClassifier(_build_once(model_name, export), model.config)
+        print(f"✅ {model_name} running on ONNX Runtime ({backend_tag()})", file=sys.stderr)
+        return classifier
+    except Exception as e:
+        print(f"⚠️ ONNX backend unavailable for {model_name} ({str(e)[:200]}), using PyTorch", file=sys.stderr)
+        return model
@@ -3,16 +3,20 @@
 const { dbHelpers } = require("./database");
 const { safeJsonParse, cleanupTempFiles } = require("./utils");
 const { processAudioFull, analyzeTranscription } = require("./scanner");
+const { runPython } = require("./processPool");
+const { jobPaths, TIMEOUTS } = require("./config");
 
 // Function to complete only the full scan (when quick scan already done)
 function completeFullScanOnly(videoId, existingImageReasons) {
+	// Audio left in this video's workspace by its quick scan
+	const jobDir = jobPaths(videoId).dir;
 	return new Promise((resolve, reject) => {
 		console.log(
 			`🔄 Completing full scan for ${videoId} (quick scan already done)`
 		);
 
 		// Phase 2 & 3: Run in parallel - Full audio word filtering + Context-aware analysis
-		Promise.all([processAudioFull(videoId), analyzeTranscription()])
+		Promise.all([processAudioFull(videoId, jobDir), analyzeTranscription(jobDir)])
 			.then(([fullAudioResult, transcriptionAnalysisResult]) => {
 				const fullAudioReasons = safeJsonParse(fullAudioResult, []);
 				const transcriptionReasons = safeJsonParse(transcriptionAnalysisResult, []);
@@ -77,7 +81,7 @@ function completeFullScanOnly(videoId, existingImageReasons) {
 			})
 			.then(() => {
 				// Cleanup temp files after all phases complete
-				cleanupTempFiles();
+				cleanupTempFiles(jobDir);
 			})
 			.catch((err) => {
 				console.error(`❌ Phase 2/3 failed for ${videoId}:`, err.message);
@@ -93,31 +97,25 @@ function completeFullScanOnly(videoId, existingImageReasons) {
 						console.error("❌ Database delete error:", dbErr.message);
 					});
 				reject(err);
-				cleanupTempFiles();
+				cleanupTempFiles(jobDir);
 			});
 	});
 }
 
 // Run Phase 3 only (when Phase 2 is already complete)
-function runPhase3Only() {
-	return new Promise((resolve) => {
-		let analysisResult = "[]";
-		try {
-			console.log("🔍 Phase 3: Analyzing transcription for context...");
-			const { execSync } = require("child_process");
-			const { pythonCmd, TIMEOUTS } = require("./config");
-			const analysisOutput = execSync(`"${pythonCmd}" transcription_analyzer.py`, {
-				stdio: "pipe",
-				timeout: TIMEOUTS.TRANSCRIPTION_ANALYSIS,
-				cwd: __dirname,
-			}).toString();
-			analysisResult = analysisOutput;
-		} catch (analysisErr) {
-			console.error("⚠️ Phase 3 error:", analysisErr.message);
-			analysisResult = "[]";
-		}
-		resolve(analysisResult);
-	});
+async function runPhase3Only(videoId) {
+	let analysisResult = "[]";
+	try {
+		console.log("🔍 Phase 3: Analyzing transcription for context...");
+		const analysisOutput = await runPython("transcription_analyzer.py", [jobPaths(videoId).dir], {
+			timeout: TIMEOUTS.TRANSCRIPTION_ANALYSIS,
+		});
+		analysisResult = analysisOutput;
+	} catch (analysisErr) {
+		console.error("⚠️ Phase 3 error:", analysisErr.message);
+		analysisResult = "[]";
+	}
+	return analysisResult;
 }
 
 module.exports = {
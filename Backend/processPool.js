@@ -0,0 +1,57 @@
+/* eslint-env node */
+
+const { execFile } = require("child_process");
+const { promisify } = require("util");
+const { pythonCmd, SCAN_CORE_BUDGET } = require("./config");
+
+const execFileAsync = promisify(execFile);
+
+// Process pool for the Python scanners. Scripts run asynchronously (so one
+// video's scan no longer blocks the event loop for every other request) and at
+// most SCAN_CORE_BUDGET of them run at once; the rest wait in FIFO order.
+let running = 0;
+const queue = [];
+
+function runNext() {
+	while (running < SCAN_CORE_BUDGET && queue.length > 0) {
+		const { script, args, options, resolve, reject } = queue.shift();
+		running++;
+		// Missing optional args (e.g. no job directory) are simply left off
+		const argv = args.filter((arg) => arg !== undefined && arg !== null);
+		execFileAsync(pythonCmd, [script, ...argv], {
+			cwd: __dirname,
+			maxBuffer: 10 * 1024 * 1024,
+			...options,
+		})
+			.then(({ stdout }) => resolve(stdout.toString()))
+			// The rejection carries .stdout/.stderr like execSync errors did
+			.catch(reject)
+			.finally(() => {
+				running--;
+				runNext();
+			});
+	}
+}
+
+/**
+ * Run a Python scanner script in the pool
+ * @param {string} script - Script file in the Backend directory
+ * @param {string[]} args - Command-line arguments
+ * @param {object} options - execFile options (timeout, env, ...)
+ * @returns {Promise<string>} - The script's stdout
+ */
+function runPython(script, args = [], options = {}) {
+	return new Promise((resolve, reject) => {
+		queue.push({ script, args, options, resolve, reject });
+		runNext();
+	});
+}
+
+function poolStats() {
+	return { running, queued: queue.length, limit: SCAN_CORE_BUDGET };
+}
+
+module.exports = {
+	runPython,
+	poolStats,
+};
@@ -0,0 +1,247 @@
+"""Re-score stored transcripts with the current text analyzers, in bulk.
+
+After tuning bad_words (whisper_scan_full.py) or the keyword lists and
+thresholds in transcription_analyzer.py, this re-runs Phase 2 and Phase 3 over
+every transcript in the transcript store (transcript_store.py) - no download,
+no Whisper - and compares the result with the verdicts in videos.db:
+
+    python rescore.py                     # report which verdicts would change
+    python rescore.py --apply             # ...and write the new verdicts
+    python rescore.py --processes 8 --output rescore.json
+
+Only fully scanned videos (scanStatus "full") are compared. Their stored
+reasons are either the Phase 2/3 reasons plus any image reasons, or - when
+the quick scan already flagged the video and Phase 2/3 never ran - the
+Phase 1 thumbnail, quick audio and image reasons. Image and thumbnail
+reasons are kept. Phase 2/3 reasons are replaced with the re-scored ones,
+and quick audio reasons with ones re-derived from the transcript's first 2
+minutes (whisper_scan.rescore_flags). If those come out clean and nothing
+else flagged the video, its Phase 2/3 reasons are used, as the scan would
+have gone on to them. Phase 1 verdicts whose stored transcript has no
+timestamps can't be re-derived; they are listed under "skipped_untimed".
+
+A video flagged in Phase 1 only has the quick scan's transcript (the first
+2 minutes, or up to where the scan stopped). Its quick reasons are
+re-derived from it, but if they come out clean the Phase 2/3 verdict is
+unknown: such videos are listed under "needs_full_scan". Verdicts with no
+stored transcript at all are listed under "no_transcript". The report (JSON
+on stdout, or --output) lists every changed verdict with the reasons added
+and removed.
+
+Verdicts are read from the SQLite database; with DATABASE_URL (Postgres) set,
+use --db on an exported SQLite copy.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+import transcript_store
+from thread_governor import cpu_cores
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "videos.db")
+
+# Transcripts sent to a worker process at a time
+CHUNK_SIZE = 200
+
+# Phase 3 reasons start with one of these (Phase 2 reasons with "bad speech: ")
+TRANSCRIPT_REASON_PREFIXES = (
+    "bad speech: ",
+    "excessive screams detected",
+    "horror content detected",
+    "weapons mentioned in dangerous contexts",
+    "escalation patterns detected",
+    "high danger score",
+)
+
+
+# Quick audio scan (Phase 1) reasons, see whisper_scan.build_flags
+QUICK_REASON_PREFIXES = (
+    "inappropriate language: ",
+    "screams detected in audio",
+)
+
+
+def is_transcript_reason(reason):
+    return reason.startswith(TRANSCRIPT_REASON_PREFIXES)
+
+
+def is_quick_reason(reason):
+    return reason.startswith(QUICK_REASON_PREFIXES)
+
+
+def rescored_reasons(old_reasons, transcript_reasons, quick_reasons):
+    """New reasons of a verdict, or None if the stored transcript can't tell.
+
+    transcript_reasons is None for a quick scan transcript (Phase 2/3 can't
+    run on it), quick_reasons None for one without timestamps.
+    """
+    if not any(is_quick_reason(reason) for reason in old_reasons):
+        if transcript_reasons is None:
+            return None
+        # Image reasons were not produced from the transcript, so they stay
+        return transcript_reasons + [reason for reason in old_reasons if not is_transcript_reason(reason)]
+    if quick_reasons is None:
+        return None
+    # A Phase 1 verdict: the quick reasons are replaced where they were
+    position = next(i for i, reason in enumerate(old_reasons) if is_quick_reason(reason))
+    kept = [reason for reason in old_reasons if not is_quick_reason(reason)]
+    if not quick_reasons and not kept:
+        # Phase 1 would now pass the video on to Phase 2/3 (None if they never ran)
+        return transcript_reasons
+    return kept[:position] + quick_reasons + kept[position:]
+
+
+def _init_worker():
+    # One thread per process - the pool already uses every core
+    os.environ["OMP_NUM_THREADS"] = "1"
+
+
+def _rescore_chunk(rows):
+    """Pool task: [(video_id, source key, packed transcript, screams)] -> [(video_id, Phase 2 + 3 reasons, quick reasons)]"""
+    import whisper_scan
+    import whisper_scan_full
+    import transcription_analyzer
+
+    results = []
+    for video_id, source_key, data, screams in rows:
+        transcript = transcript_store.unpack(data)
+        # Acoustic scream events are re-weighted too, but not re-detected (no audio)
+        screams = json.loads(screams) if screams else []
+        reasons = None
+        if not transcript_store.is_quick_key(source_key):
+            reasons = whisper_scan_full.word_filter(transcript["text"])
+            reasons += transcription_analyzer.analyze_segments(transcript["segments"], transcript["text"], screams).flags()
+        results.append((video_id, reasons, whisper_scan.rescore_flags(transcript, screams)))
+    return results
+
+
+def load_verdicts(db_path):
+    """{videoId: (safe, reasons)} of every fully scanned video"""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT videoId, safe, reasons FROM videos WHERE scanStatus = 'full'").fetchall()
+    finally:
+        conn.close()
+    verdicts = {}
+    for video_id, safe, reasons in rows:
+        try:
+            reasons = json.loads(reasons) if reasons else []
+        except ValueError:
+            reasons = []
+        verdicts[video_id] = (bool(safe), reasons)
+    return verdicts
+
+
+def rescore(db_path=DB_PATH, store_path=transcript_store.STORE_PATH, processes=None):
+    """Compare re-scored transcripts with the stored verdicts; returns the report"""
+    start = time.perf_counter()
+    verdicts = load_verdicts(db_path)
+    report = {
+        "transcripts": 0, "compared": 0, "unchanged": 0, "no_verdict": 0,
+        "skipped_untimed": [], "needs_full_scan": [], "no_transcript": [], "changed": [],
+    }
+    stored = set()
+
+    processes = processes or cpu_cores()
+    with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+        chunks = transcript_store.iter_packed(store_path, CHUNK_SIZE)
+        for results in pool.imap_unordered(_rescore_chunk, chunks):
+            for video_id, transcript_reasons, quick_reasons in results:
+                report["transcripts"] += 1
+                stored.add(video_id)
+                if video_id not in verdicts:
+                    # Not scanned to the end (or the row was deleted)
+                    report["no_verdict"] += 1
+                    continue
+                old_safe, old_reasons = verdicts[video_id]
+                new_reasons = rescored_reasons(old_reasons, transcript_reasons, quick_reasons)
+                if new_reasons is None:
+                    report["skipped_untimed" if quick_reasons is None else "needs_full_scan"].append(video_id)
+                    continue
+                report["compared"] += 1
+                if new_reasons == old_reasons:
+                    report["unchanged"] += 1
+                    continue
+                report["changed"].append({
+                    "videoId": video_id,
+                    "safe": [old_safe, not new_reasons],
+                    "added": [reason for reason in new_reasons if reason not in old_reasons],
+                    "removed": [reason for reason in old_reasons if reason not in new_reasons],
+                    "reasons": new_reasons,
+                })
+
+    report["changed"].sort(key=lambda change: change["videoId"])
+    report["skipped_untimed"].sort()
+    report["needs_full_scan"].sort()
+    report["no_transcript"] = sorted(video_id for video_id in verdicts if video_id not in stored)
+    report["verdicts_flipped"] = sum(1 for change in report["changed"] if change["safe"][0] != change["safe"][1])
+    report["processes"] = processes
+    report["elapsed_s"] = round(time.perf_counter() - start, 2)
+    return report
+
+
+def apply_changes(db_path, changed):
+    """Write the re-scored verdicts (scannedAt is left alone - the video wasn't rescanned)"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        with conn:
+            conn.executemany(
+                "UPDATE videos SET safe=?, reasons=? WHERE videoId=?",
+                [(0 if change["reasons"] else 1, json.dumps(change["reasons"]), change["videoId"]) for change in changed],
+            )
+    finally:
+        conn.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Re-score stored transcripts with the current text analyzers")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite verdict database (default: videos.db)")
+    parser.add_argument("--store", default=transcript_store.STORE_PATH, help="transcript store (default: transcripts.db)")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--apply", action="store_true", help="write the changed verdicts to the database")
+    parser.add_argument("--output", help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"❌ No verdict database at {args.db}", file=sys.stderr)
+        return 1
+
+    report = rescore(args.db, args.store, args.processes)
+    print(
+        f"🔁 Re-scored {report['transcripts']} transcripts in {report['elapsed_s']}s: "
+        f"{len(report['changed'])} verdicts would change ({report['verdicts_flipped']} flip safe/unsafe)",
+        file=sys.stderr,
+    )
+    if report["skipped_untimed"]:
+        print(
+            f"⚠️ {len(report['skipped_untimed'])} quick scan verdicts skipped: their transcripts have no timestamps",
+            file=sys.stderr,
+        )
+    if report["needs_full_scan"]:
+        print(
+            f"⚠️ {len(report['needs_full_scan'])} verdicts need a rescan: only their quick scan transcript is stored",
+            file=sys.stderr,
+        )
+    if report["no_transcript"]:
+        print(f"⚠️ {len(report['no_transcript'])} verdicts have no stored transcript", file=sys.stderr)
+    if args.apply and report["changed"]:
+        apply_changes(args.db, report["changed"])
+        print(f"✅ Updated {len(report['changed'])} verdicts in {args.db}", file=sys.stderr)
+    report["applied"] = bool(args.apply and report["changed"])
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,11 +2,11 @@
 
 const fs = require("fs-extra");
 const { dbHelpers } = require("../database");
-const { safeJsonParse, cleanupTempFiles, isValidVideoId } = require("../utils");
+const { safeJsonParse, cleanupTempFiles, prepareJobWorkspace, isValidVideoId } = require("../utils");
 const { downloadAudio, downloadVideo, extractFrames } = require("../download");
 const { processThumbnail, processAudioQuick, processImages, processAudioFull, analyzeTranscription } = require("../scanner");
 const { completeFullScanOnly, runPhase3Only } = require("../phases");
-const { AUDIO_PATH } = require("../config");
+const { jobPaths } = require("../config");
 const { scanManager } = require("../scanManager");
 const { scanTitleForDanger } = require("../titleScanner");
 
@@ -100,7 +100,7 @@ async function analyzeRoute(req, res) {
 						);
 
 						// Check if audio file still exists
-						if (!fs.existsSync(AUDIO_PATH)) {
+						if (!fs.existsSync(jobPaths(videoId).audio)) {
 							console.log(
 								"⚠️ Audio file not found, need to re-download for full scan"
 							);
@@ -140,9 +140,9 @@ async function analyzeRoute(req, res) {
 						console.log(
 							`🔄 Video ${videoId} has Phase 2 complete, continuing to Phase 3...`
 						);
-						if (fs.existsSync(AUDIO_PATH)) {
+						if (fs.existsSync(jobPaths(videoId).audio)) {
 							// Run only Phase 3 (context analysis)
-							runPhase3Only()
+							runPhase3Only(videoId)
 								.then((transcriptionResult) => {
 									const transcriptionReasons = safeJsonParse(transcriptionResult, []);
 									const allReasons = [...transcriptionReasons, ...reasons];
@@ -216,11 +216,22 @@ async function analyzeRoute(req, res) {
 		}
 
 		// Start fresh scan
+		// Each scan works in its own tmp/<videoId>/ workspace. finishScan() frees
+		// this scan's slot and workspace, unless a newer scan of the same video
+		// has taken over after this one was interrupted.
+		const jobDir = jobPaths(videoId).dir;
+		let abortController = null;
+		const finishScan = () => {
+			if (scanManager.completeScan(videoId, abortController)) {
+				cleanupTempFiles(jobDir);
+			}
+		};
+
 		try {
 			console.log(`🔍 Starting scan for video: ${videoId}`);
 
 			// ✅ Register this scan with scan manager (will interrupt previous if different video)
-			const abortController = scanManager.startScan(videoId);
+			abortController = scanManager.startScan(videoId);
 
 			// Check if scan was aborted before we start
 			if (abortController.signal.aborted) {
@@ -233,13 +244,12 @@ async function analyzeRoute(req, res) {
 
 			// ✅ Prepare temp directory
 			console.log("✅ Preparing temp directory...");
-			fs.ensureDirSync("tmp");
-			cleanupTempFiles(); // Clean any leftover files
+			prepareJobWorkspace(jobDir); // Clean any leftover files
 
 			// ✅ 1️⃣ THUMBNAIL ANALYSIS (Before any downloads - fastest check)
 			console.log("✅ Analyzing video thumbnail...");
 			const thumbnailUrl = `https://img.youtube.com/vi/${videoId}/maxresdefault.jpg`;
-			const thumbnailResult = await processThumbnail(thumbnailUrl);
+			const thumbnailResult = await processThumbnail(thumbnailUrl, jobDir);
 			const thumbnailReasons = safeJsonParse(thumbnailResult, []);
 
 			if (thumbnailReasons.length > 0) {
@@ -254,7 +264,7 @@ async function analyzeRoute(req, res) {
 					[videoId, title || null, 0, JSON.stringify(thumbnailReasons), "full"]
 				);
 
-				cleanupTempFiles();
+				finishScan();
 				return res.json({
 					videoId,
 					safe: false,
@@ -272,7 +282,7 @@ async function analyzeRoute(req, res) {
 			// Check if scan was interrupted before downloads
 			if (abortController.signal.aborted) {
 				console.log(`🛑 Scan for ${videoId} was aborted before downloads`);
-				cleanupTempFiles();
+				finishScan();
 				return res.status(409).json({
 					error: "Scan interrupted",
 					details: "Another video scan was requested",
@@ -285,7 +295,7 @@ async function analyzeRoute(req, res) {
 			// Check if scan was interrupted after audio download
 			if (abortController.signal.aborted) {
 				console.log(`🛑 Scan for ${videoId} was aborted after audio download`);
-				cleanupTempFiles();
+				finishScan();
 				return res.status(409).json({
 					error: "Scan interrupted",
 					details: "Another video scan was requested",
@@ -294,7 +304,7 @@ async function analyzeRoute(req, res) {
 
 			// ✅ 3️⃣ START AUDIO PROCESSING IMMEDIATELY (don't wait for video)
 			console.log("✅ Starting audio processing immediately...");
-			const audioProcessingPromise = processAudioQuick();
+			const audioProcessingPromise = processAudioQuick(jobDir);
 
 			// ✅ 4️⃣ VIDEO DOWNLOAD (in parallel with audio processing)
 			console.log("✅ Downloading video in parallel with audio processing...");
@@ -306,7 +316,7 @@ async function analyzeRoute(req, res) {
 			// Check if scan was interrupted during audio processing
 			if (abortController.signal.aborted) {
 				console.log(`🛑 Scan for ${videoId} was aborted during audio processing`);
-				cleanupTempFiles();
+				finishScan();
 				return res.status(409).json({
 					error: "Scan interrupted",
 					details: "Another video scan was requested",
@@ -327,7 +337,9 @@ async function analyzeRoute(req, res) {
 				);
 				
 				// Cancel video download if still in progress (we don't need it)
-				// Note: We can't actually cancel execSync, but we can skip processing
+				// Note: We can't cancel the download, but we can skip processing and
+				// remove the workspace again once it has finished
+				videoDownloadPromise.catch(() => {}).then(finishScan);
 				
 				// Combine thumbnail and audio reasons (thumbnail already checked)
 				const allReasons = [...thumbnailReasons, ...quickAudioReasons];
@@ -338,7 +350,7 @@ async function analyzeRoute(req, res) {
 					[videoId, title || null, 0, JSON.stringify(allReasons), "full"]
 				);
 
-				cleanupTempFiles();
+				finishScan();
 				return res.json({
 					videoId,
 					safe: false,
@@ -354,7 +366,7 @@ async function analyzeRoute(req, res) {
 			// Check if scan was interrupted after video download
 			if (abortController.signal.aborted) {
 				console.log(`🛑 Scan for ${videoId} was aborted after video download`);
-				cleanupTempFiles();
+				finishScan();
 				return res.status(409).json({
 					error: "Scan interrupted",
 					details: "Another video scan was requested",
@@ -363,7 +375,7 @@ async function analyzeRoute(req, res) {
 
 			// ✅ 5️⃣ FRAME EXTRACTION (with error handling)
 			try {
-				extractFrames();
+				await extractFrames(videoId);
 			} catch (frameErr) {
 				// If frame extraction fails due to corrupted video, continue with audio-only scan
 				console.warn(`⚠️ Frame extraction failed: ${frameErr.message}`);
@@ -382,7 +394,7 @@ async function analyzeRoute(req, res) {
 						"INSERT OR REPLACE INTO videos (videoId, title, safe, reasons, scannedAt, scanStatus) VALUES (?, ?, ?, ?, datetime('now'), ?)",
 						[videoId, title || null, 0, JSON.stringify(phase1Reasons), "full"]
 					);
-					cleanupTempFiles();
+					finishScan();
 					return res.json({
 						videoId,
 						safe: false,
@@ -408,21 +420,19 @@ async function analyzeRoute(req, res) {
 				});
 				
 				// Start Phase 2 & 3 in background (same as below)
-				const abortController = scanManager.getAbortController();
-				
 				// Check if scan was interrupted before starting background phases
 				if (abortController && abortController.signal.aborted) {
 					console.log(`🛑 Scan for ${videoId} was aborted, skipping Phase 2 & 3`);
-					cleanupTempFiles();
+					finishScan();
 					return;
 				}
 
-				Promise.all([processAudioFull(videoId), analyzeTranscription()])
+				Promise.all([processAudioFull(videoId, jobDir), analyzeTranscription(jobDir)])
 					.then(async ([fullAudioResult, transcriptionAnalysisResult]) => {
 						// Check if scan was interrupted during processing
 						if (abortController && abortController.signal.aborted) {
 							console.log(`🛑 Scan for ${videoId} was interrupted during Phase 2/3`);
-							cleanupTempFiles();
+							finishScan();
 							return;
 						}
 
@@ -467,14 +477,13 @@ async function analyzeRoute(req, res) {
 							);
 						}
 						
-						scanManager.completeScan(videoId);
-						cleanupTempFiles();
+						finishScan();
 					})
 					.catch((err) => {
 						// Check if error was due to abortion
 						if (abortController && abortController.signal.aborted) {
 							console.log(`🛑 Scan for ${videoId} was aborted`);
-							cleanupTempFiles();
+							finishScan();
 							return;
 						}
 
@@ -494,8 +503,7 @@ async function analyzeRoute(req, res) {
 								console.error("❌ Database delete error:", dbErr.message);
 							});
 						
-						scanManager.completeScan(videoId);
-						cleanupTempFiles();
+						finishScan();
 					});
 				
 				return; // Exit early since we handled everything
@@ -505,7 +513,7 @@ async function analyzeRoute(req, res) {
 			console.log("✅ Phase 1: Processing images...");
 
 			// Process images
-			const imageResult = await processImages();
+			const imageResult = await processImages(jobDir);
 
 			// Parse Phase 1 results (audio already parsed above)
 			const imageReasons = safeJsonParse(imageResult, []);
@@ -530,7 +538,7 @@ async function analyzeRoute(req, res) {
 			// Check if scan was interrupted during Phase 1
 			if (abortController.signal.aborted) {
 				console.log(`🛑 Scan for ${videoId} was aborted during Phase 1`);
-				cleanupTempFiles();
+				finishScan();
 				return res.status(409).json({
 					error: "Scan interrupted",
 					details: "Another video scan was requested",
@@ -550,8 +558,7 @@ async function analyzeRoute(req, res) {
 					[videoId, title || null, 0, JSON.stringify(phase1Reasons), "full"]
 				);
 
-				scanManager.completeScan(videoId);
-				cleanupTempFiles();
+				finishScan();
 				return res.json({
 					videoId,
 					safe: false,
@@ -583,7 +590,7 @@ async function analyzeRoute(req, res) {
 			});
 
 			// Start Phase 2 & 3 in parallel: Full audio word filtering + Context-aware analysis
-			Promise.all([processAudioFull(videoId), analyzeTranscription()])
+			Promise.all([processAudioFull(videoId, jobDir), analyzeTranscription(jobDir)])
 				.then(async ([fullAudioResult, transcriptionAnalysisResult]) => {
 					const fullAudioReasons = safeJsonParse(fullAudioResult, []);
 					const transcriptionReasons = safeJsonParse(transcriptionAnalysisResult, []);
@@ -641,7 +648,7 @@ async function analyzeRoute(req, res) {
 					}
 
 					// Cleanup temp files after all phases complete
-					cleanupTempFiles();
+					finishScan();
 				})
 				.catch((err) => {
 					console.error(
@@ -659,15 +666,13 @@ async function analyzeRoute(req, res) {
 						.catch((dbErr) => {
 							console.error("❌ Database delete error:", dbErr.message);
 						});
-					cleanupTempFiles();
+					finishScan();
 				});
 		} catch (e) {
 			// Check if error was due to scan interruption
-			const abortController = scanManager.getAbortController();
 			if (abortController && abortController.signal.aborted) {
 				console.log(`🛑 Scan for ${videoId} was interrupted`);
-				scanManager.completeScan(videoId);
-				cleanupTempFiles();
+				finishScan();
 				return;
 			}
 
@@ -684,11 +689,8 @@ async function analyzeRoute(req, res) {
 				console.error("❌ Failed to delete from database on scan failure:", dbErr.message);
 			}
 
-			// Mark scan as complete
-			scanManager.completeScan(videoId);
-
-			// Cleanup temp files on error
-			cleanupTempFiles();
+			// Mark scan as complete and cleanup temp files on error
+			finishScan();
 
 			// Determine error type and provide helpful message
 			let errorMessage = "Scan failed";
@@ -8,6 +8,7 @@ function rootRoute(req, res) {
 		endpoints: {
 			"POST /validate": "Validate a YouTube video (check duration, Shorts, playlists)",
 			"POST /analyze": "Analyze a YouTube video for safety",
+			"POST /analyze-thumbnails": "Scan the thumbnails of many videos in one pass",
 			"GET /health": "Health check endpoint",
 		},
 	});
@@ -26,6 +27,7 @@ function notFoundRoute(req, res) {
 		endpoints: {
 			"POST /validate": "Validate a YouTube video (check duration, Shorts, playlists)",
 			"POST /analyze": "Analyze a YouTube video for safety",
+			"POST /analyze-thumbnails": "Scan the thumbnails of many videos in one pass",
 			"GET /health": "Health check endpoint",
 			"GET /": "API information",
 		},
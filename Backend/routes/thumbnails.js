@@ -0,0 +1,93 @@
+/* eslint-env node */
+
+const { dbHelpers } = require("../database");
+const { safeJsonParse, isValidVideoId } = require("../utils");
+const { processThumbnailBatch } = require("../scanner");
+const { THUMBNAIL_BATCH_LIMIT } = require("../config");
+
+const thumbnailUrl = (videoId) => `https://img.youtube.com/vi/${videoId}/maxresdefault.jpg`;
+
+// Scan the thumbnails of many videos at once (e.g. every tile on a results page)
+async function thumbnailsRoute(req, res) {
+	try {
+		const { videoIds } = req.body;
+
+		// Validate input
+		if (!Array.isArray(videoIds) || videoIds.length === 0) {
+			return res.status(400).json({
+				error: "Missing videoIds",
+				details: "Please provide a non-empty videoIds array in the request body",
+			});
+		}
+		if (videoIds.length > THUMBNAIL_BATCH_LIMIT) {
+			return res.status(400).json({
+				error: "Too many videoIds",
+				details: `At most ${THUMBNAIL_BATCH_LIMIT} videos per request, got ${videoIds.length}`,
+			});
+		}
+		const invalid = videoIds.filter((videoId) => !isValidVideoId(videoId));
+		if (invalid.length > 0) {
+			return res.status(400).json({
+				error: "Invalid videoId format",
+				details: `Expected 11-character YouTube video IDs, got: ${invalid.join(", ")}`,
+			});
+		}
+
+		const uniqueIds = [...new Set(videoIds)];
+		const verdicts = {};
+
+		// ✅ CACHE CHECK: videos already known to be unsafe, or fully scanned, need no thumbnail scan
+		const rows = await Promise.all(
+			uniqueIds.map((videoId) => dbHelpers.get("SELECT * FROM videos WHERE videoId = ?", [videoId]))
+		);
+		uniqueIds.forEach((videoId, i) => {
+			const row = rows[i];
+			if (row && (row.safe === 0 || row.scanStatus === "full")) {
+				verdicts[videoId] = {
+					videoId,
+					safe: !!row.safe,
+					reasons: safeJsonParse(row.reasons, []),
+					cached: true,
+				};
+			}
+		});
+
+		// ✅ One batch scan for everything else (one process, pooled downloads)
+		const toScan = uniqueIds.filter((videoId) => !verdicts[videoId]);
+		if (toScan.length > 0) {
+			console.log(`🖼️ Batch thumbnail scan for ${toScan.length} videos...`);
+			const results = safeJsonParse(await processThumbnailBatch(toScan.map(thumbnailUrl)), []);
+			const byUrl = new Map(results.map((result) => [result.url, result]));
+
+			for (const videoId of toScan) {
+				const result = byUrl.get(thumbnailUrl(videoId));
+				const reasons = result && Array.isArray(result.reasons) ? result.reasons : [];
+				verdicts[videoId] = { videoId, safe: reasons.length === 0, reasons, cached: false };
+
+				if (reasons.length > 0) {
+					// Same as a thumbnail hit in /analyze: the video is blocked for good
+					await dbHelpers.run(
+						"INSERT OR REPLACE INTO videos (videoId, title, safe, reasons, scannedAt, scanStatus) VALUES (?, ?, ?, ?, datetime('now'), ?)",
+						[videoId, null, 0, JSON.stringify(reasons), "full"]
+					);
+				}
+			}
+		}
+
+		res.json({
+			results: videoIds.map((videoId) => verdicts[videoId]),
+			scanType: "thumbnail",
+		});
+	} catch (err) {
+		console.error("❌ Batch thumbnail scan failed:", err.message);
+		if (!res.headersSent) {
+			res.status(500).json({
+				error: "Thumbnail scan failed",
+				details: "An unexpected error occurred",
+				message: err.message,
+			});
+		}
+	}
+}
+
+module.exports = { thumbnailsRoute };
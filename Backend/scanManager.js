@@ -1,17 +1,21 @@
 /* eslint-env node */
 
-// Scan manager to track active scans and handle interruptions
-let currentScanVideoId = null;
-let currentScanAbortController = null;
+const { MAX_CONCURRENT_SCANS } = require("./config");
+
+// Scan manager to track active scans and handle interruptions.
+// Up to MAX_CONCURRENT_SCANS videos are scanned at once (each in its own
+// tmp/<videoId>/ workspace); starting one more interrupts the oldest scan.
+// Map preserves insertion order, so the first entry is always the oldest.
+const activeScans = new Map(); // videoId -> AbortController
 
 const scanManager = {
 	/**
-	 * Check if a scan should be interrupted (different video requested)
+	 * Check if a scan should be interrupted (no free slot for a new video)
 	 * @param {string} videoId - The video ID being requested
-	 * @returns {boolean} - True if current scan should be interrupted
+	 * @returns {boolean} - True if starting this scan would interrupt another
 	 */
 	shouldInterrupt: (videoId) => {
-		return currentScanVideoId !== null && currentScanVideoId !== videoId;
+		return !activeScans.has(videoId) && activeScans.size >= MAX_CONCURRENT_SCANS;
 	},
 
 	/**
@@ -20,44 +24,62 @@ const scanManager = {
 	 * @returns {AbortController} - AbortController for cancelling the scan
 	 */
 	startScan: (videoId) => {
-		// If different video is being scanned, interrupt it
-		if (currentScanVideoId !== null && currentScanVideoId !== videoId) {
+		// Free a slot if all are taken: interrupt the oldest scan
+		while (!activeScans.has(videoId) && activeScans.size >= MAX_CONCURRENT_SCANS) {
+			const oldestVideoId = activeScans.keys().next().value;
 			console.log(
-				`🛑 Interrupting scan for ${currentScanVideoId} - new video ${videoId} requested`
+				`🛑 Interrupting scan for ${oldestVideoId} - new video ${videoId} requested`
 			);
-			scanManager.interruptCurrentScan();
+			scanManager.interruptScan(oldestVideoId);
 		}
 
 		// Start tracking new scan
-		currentScanVideoId = videoId;
-		currentScanAbortController = new AbortController();
-		console.log(`▶️ Starting scan for ${videoId}`);
+		const abortController = new AbortController();
+		activeScans.set(videoId, abortController);
+		console.log(`▶️ Starting scan for ${videoId} (${activeScans.size}/${MAX_CONCURRENT_SCANS} active)`);
+
+		return abortController;
+	},
 
-		return currentScanAbortController;
+	/**
+	 * Interrupt the scan of one video
+	 * @param {string} videoId - The video ID to interrupt
+	 */
+	interruptScan: (videoId) => {
+		const abortController = activeScans.get(videoId);
+		if (abortController) {
+			abortController.abort();
+			console.log(`🛑 Scan interrupted for ${videoId}`);
+		}
+		activeScans.delete(videoId);
 	},
 
 	/**
-	 * Interrupt the current scan
+	 * Interrupt every active scan (used on shutdown)
 	 */
 	interruptCurrentScan: () => {
-		if (currentScanAbortController) {
-			currentScanAbortController.abort();
-			console.log(`🛑 Scan interrupted for ${currentScanVideoId}`);
+		for (const videoId of [...activeScans.keys()]) {
+			scanManager.interruptScan(videoId);
 		}
-		currentScanVideoId = null;
-		currentScanAbortController = null;
 	},
 
 	/**
-	 * Complete the current scan
+	 * Complete a scan
 	 * @param {string} videoId - The video ID that completed
+	 * @param {AbortController} [abortController] - Only complete if this scan still owns the video
+	 * @returns {boolean} - False if a newer scan of the same video is now running
 	 */
-	completeScan: (videoId) => {
-		if (currentScanVideoId === videoId) {
-			console.log(`✅ Scan completed for ${videoId}`);
-			currentScanVideoId = null;
-			currentScanAbortController = null;
+	completeScan: (videoId, abortController) => {
+		const current = activeScans.get(videoId);
+		if (!current) {
+			return true;
 		}
+		if (abortController && current !== abortController) {
+			return false;
+		}
+		console.log(`✅ Scan completed for ${videoId}`);
+		activeScans.delete(videoId);
+		return true;
 	},
 
 	/**
@@ -66,25 +88,35 @@ const scanManager = {
 	 * @returns {boolean} - True if this video is currently being scanned
 	 */
 	isScanning: (videoId) => {
-		return currentScanVideoId === videoId;
+		return activeScans.has(videoId);
 	},
 
 	/**
-	 * Get the current scanning video ID
-	 * @returns {string|null} - Current video ID being scanned, or null
+	 * Get the most recently started scan's video ID
+	 * @returns {string|null} - Newest video ID being scanned, or null
 	 */
 	getCurrentScanVideoId: () => {
-		return currentScanVideoId;
+		const videoIds = [...activeScans.keys()];
+		return videoIds.length > 0 ? videoIds[videoIds.length - 1] : null;
+	},
+
+	/**
+	 * Get the IDs of every video being scanned
+	 * @returns {string[]} - Active video IDs, oldest first
+	 */
+	getActiveScans: () => {
+		return [...activeScans.keys()];
 	},
 
 	/**
-	 * Get the abort controller for the current scan
-	 * @returns {AbortController|null} - Current abort controller, or null
+	 * Get the abort controller for a scan
+	 * @param {string} [videoId] - Video ID (defaults to the most recent scan)
+	 * @returns {AbortController|null} - The scan's abort controller, or null
 	 */
-	getAbortController: () => {
-		return currentScanAbortController;
+	getAbortController: (videoId) => {
+		const id = videoId || scanManager.getCurrentScanVideoId();
+		return (id && activeScans.get(id)) || null;
 	},
 };
 
 module.exports = { scanManager };
-
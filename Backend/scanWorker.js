@@ -0,0 +1,49 @@
+/* eslint-env node */
+
+const { spawn } = require("child_process");
+const { pythonCmd, SCAN_WORKER_ENABLED, SCAN_WORKER_SOCKET, SCAN_WORKER_PROCESSES } = require("./config");
+
+// Long-lived Python process that keeps Whisper/YOLO/classifier models loaded.
+// The scanner scripts detect its socket and forward jobs to it; if it is not
+// running they simply scan in-process as before.
+let workerProcess = null;
+
+function startScanWorker() {
+	if (!SCAN_WORKER_ENABLED || workerProcess) {
+		return null;
+	}
+
+	console.log("🔄 Starting persistent scan worker (models load once)...");
+	workerProcess = spawn(pythonCmd, ["scan_worker.py"], {
+		cwd: __dirname,
+		stdio: ["ignore", "ignore", "inherit"],
+		// More than one process lets scans of different videos run in parallel
+		env: { ...process.env, SCAN_WORKER_SOCKET, SCAN_WORKER_PROCESSES: String(SCAN_WORKER_PROCESSES) },
+	});
+
+	workerProcess.on("exit", (code, signal) => {
+		console.warn(
+			`⚠️ Scan worker exited (code: ${code}, signal: ${signal}) - scanners will run standalone`
+		);
+		workerProcess = null;
+	});
+
+	workerProcess.on("error", (err) => {
+		console.error("⚠️ Failed to start scan worker:", err.message);
+		workerProcess = null;
+	});
+
+	return workerProcess;
+}
+
+function stopScanWorker() {
+	if (workerProcess) {
+		workerProcess.kill("SIGTERM");
+		workerProcess = null;
+	}
+}
+
+module.exports = {
+	startScanWorker,
+	stopScanWorker,
+};
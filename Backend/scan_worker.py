@@ -0,0 +1,271 @@
+"""Long-lived scan worker: loads each model once and serves scan jobs.
+
+The scanner scripts (whisper_scan.py, image_scan.py, ...) stay runnable on
+their own, but when this worker is listening they act as thin clients and hand
+the job over instead of importing torch and reloading weights on every scan.
+
+Protocol (JSON lines, one request and one response per line):
+    request:  {"id": 1, "scanner": "thumbnail", "args": ["https://..."]}
+    response: {"id": 1, "ok": true, "flags": [...]}
+              {"id": 1, "ok": false, "error": "..."}
+
+Transports:
+    python scan_worker.py            # Unix socket at SCAN_WORKER_SOCKET
+    python scan_worker.py --stdio    # requests on stdin, responses on stdout
+
+Scanner args are passed through unchanged, including the optional per-job
+working directory (see workspace.py). With SCAN_WORKER_PROCESSES > 1, jobs run
+in a pool of processes that each hold their own models, so scans of several
+videos proceed in parallel instead of queueing on one model per family.
+"""
+import json
+import os
+import socket
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Kept outside tmp/ because cleanupTempFiles() empties that directory
+SOCKET_PATH = os.environ.get("SCAN_WORKER_SOCKET", os.path.join(BASE_DIR, "scan_worker.sock"))
+
+# scanner name -> (module, model family[, function]). Jobs in the same family
+# share a model instance and are serialised; audio and vision jobs can still run
+# side by side. The function defaults to the module's scan().
+SCANNERS = {
+    "whisper_quick": ("whisper_scan", "audio"),
+    "whisper_full": ("whisper_scan_full", "audio"),
+    "transcription": ("transcription_analyzer", "audio"),
+    "transcription_ranges": ("transcription_analyzer", "audio", "scan_ranges"),
+    "image": ("image_scan", "vision"),
+    "thumbnail": ("thumbnail_scan", "vision"),
+    "thumbnail_batch": ("thumbnail_scan", "vision", "scan_batch"),
+}
+
+# Number of worker processes. 1 (default) serves every job from this process;
+# more trades memory (one set of models per process) for parallel scans.
+PROCESSES = max(1, int(os.environ.get("SCAN_WORKER_PROCESSES", "1")))
+
+
+# ---------------------------------------------------------------------------
+# Client side (used by the scanner scripts - stdlib only, so it stays cheap)
+# ---------------------------------------------------------------------------
+
+def request_scan(scanner, args, socket_path=SOCKET_PATH):
+    """Send one job to the worker and return its decoded response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps({"scanner": scanner, "args": list(args)}) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+    if not line:
+        raise ValueError("scan worker closed the connection without a response")
+    return json.loads(line)
+
+
+def forward_to_worker(scanner, args):
+    """If a worker is listening, run the job there, print its flags and exit.
+
+    Returns normally (so the caller scans in-process) when the worker is
+    disabled, not running, or fails the job.
+    """
+    if os.environ.get("SCAN_WORKER") == "0" or not os.path.exists(SOCKET_PATH):
+        return
+    try:
+        response = request_scan(scanner, args)
+    except (OSError, ValueError):
+        # Stale socket or worker died - fall back to scanning in-process
+        return
+    if not response.get("ok"):
+        print(f"⚠️ Scan worker failed ({response.get('error')}), scanning in-process", file=sys.stderr)
+        return
+    print(json.dumps(response["flags"]))
+    sys.stdout.flush()
+    sys.exit(0)
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+def _family_locks():
+    import threading
+    return {family: threading.Lock() for _, family, *_ in SCANNERS.values()}
+
+
+_locks = None
+_pool = None
+
+
+def _scan_in_child(module_name, function, args):
+    """Pool task: run one scanner in a pool process and return its flags"""
+    import importlib
+
+    return getattr(importlib.import_module(module_name), function)(*args)
+
+
+def _init_child(preload_models):
+    """Pool initializer: same working directory as the parent, models loaded once"""
+    os.chdir(BASE_DIR)
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    import thread_governor
+    import timing
+    timing.skip_import_span()
+    thread_governor.budget_process(PROCESSES)
+    # Keep stdout free for the parent's responses in --stdio mode
+    sys.stdout = sys.stderr
+    if preload_models:
+        preload()
+
+
+def start_pool(processes, preload_models=True):
+    """Create the process pool used by run_job() when PROCESSES > 1"""
+    global _pool
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn, not fork: forking after torch has started threads can deadlock
+    _pool = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_child,
+        initargs=(preload_models,),
+    )
+    print(f"✅ Scan worker pool started with {processes} processes", file=sys.stderr)
+
+
+def run_job(job):
+    """Execute one decoded request and return the response dict"""
+    import importlib
+
+    response = {"id": job.get("id")}
+    scanner = job.get("scanner")
+    if scanner not in SCANNERS:
+        response.update(ok=False, error=f"unknown scanner: {scanner}")
+        return response
+
+    module_name, family, *function = SCANNERS[scanner]
+    function = function[0] if function else "scan"
+    try:
+        if _pool is not None:
+            # Each pool process runs one job at a time, so no family lock needed
+            flags = _pool.submit(_scan_in_child, module_name, function, job.get("args", [])).result()
+        else:
+            module = importlib.import_module(module_name)
+            with _locks[family]:
+                flags = getattr(module, function)(*job.get("args", []))
+        response.update(ok=True, flags=flags)
+    except Exception as e:
+        response.update(ok=False, error=f"{type(e).__name__}: {e}")
+    return response
+
+
+def preload():
+    """Load every model up front so the first real scan is already warm"""
+    import scan_models
+
+    for loader in (scan_models.get_asr_engine, scan_models.get_yolo_model):
+        try:
+            loader()
+        except Exception as e:
+            print(f"⚠️ Preload failed for {loader.__name__}: {e}", file=sys.stderr)
+    try:
+        import thumbnail_scan
+        thumbnail_scan.load_content_safety_model()
+    except Exception as e:
+        print(f"⚠️ Preload failed for content safety model: {e}", file=sys.stderr)
+    print(f"✅ Scan worker models loaded: {', '.join(scan_models.loaded_models())}", file=sys.stderr)
+
+
+def serve_stdio():
+    """Serve requests from stdin, one JSON object per line"""
+    import contextlib
+
+    # Scanners may print progress; keep stdout reserved for responses
+    out = sys.stdout
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            response = {"id": None, "ok": False, "error": f"bad request: {e}"}
+        else:
+            with contextlib.redirect_stdout(sys.stderr):
+                response = run_job(job)
+        out.write(json.dumps(response) + "\n")
+        out.flush()
+
+
+def serve_socket(socket_path=SOCKET_PATH):
+    """Serve requests on a Unix socket, one thread per connection"""
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    response = run_job(json.loads(line))
+                except ValueError as e:
+                    response = {"id": None, "ok": False, "error": f"bad request: {e}"}
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with Server(socket_path, Handler) as server:
+        print(f"✅ Scan worker listening on {socket_path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+def main(argv):
+    global _locks
+    import signal
+
+    # Scanners use paths relative to the Backend directory (tmp/audio.wav, ...)
+    os.chdir(BASE_DIR)
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    _locks = _family_locks()
+    import thread_governor
+    import timing
+    timing.skip_import_span()
+
+    # Turn SIGTERM into a normal exit so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
+
+    preload_models = "--no-preload" not in argv
+    if PROCESSES > 1:
+        # Models are loaded in the pool processes, not here
+        start_pool(PROCESSES, preload_models)
+    else:
+        # Audio and vision jobs share this process's thread pools
+        thread_governor.budget_process()
+        if preload_models:
+            preload()
+
+    try:
+        if "--stdio" in argv:
+            serve_stdio()
+        else:
+            serve_socket()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
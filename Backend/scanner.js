@@ -1,181 +1,190 @@
 /* eslint-env node */
 
-const { execSync } = require("child_process");
-const { pythonCmd, TIMEOUTS } = require("./config");
+const { TIMEOUTS } = require("./config");
+const { runPython } = require("./processPool");
+
+// Every scanner takes the job's workspace directory (tmp/<videoId>/) as its
+// last argument, so several videos can be scanned at once
 
 // Process thumbnail (before any downloads)
-function processThumbnail(thumbnailUrl) {
-	return new Promise((resolve) => {
-		let thumbnailResult = "[]";
-		try {
-			if (!thumbnailUrl) {
-				resolve(thumbnailResult);
-				return;
-			}
-			
-			const output = execSync(`"${pythonCmd}" thumbnail_scan.py "${thumbnailUrl}"`, {
-				stdio: "pipe",
-				timeout: 30000, // 30 second timeout
-				cwd: __dirname,
-			}).toString();
-			
-			thumbnailResult = output;
-			console.log(
-				"📝 Thumbnail scan output (first 200 chars):",
-				output.substring(0, 200)
-			);
-		} catch (thumbErr) {
-			console.error("⚠️ Thumbnail scan error:", thumbErr.message);
-			// Don't fail the whole scan if thumbnail fails
-			thumbnailResult = "[]";
+async function processThumbnail(thumbnailUrl, jobDir) {
+	let thumbnailResult = "[]";
+	try {
+		if (!thumbnailUrl) {
+			return thumbnailResult;
+		}
+		
+		const output = await runPython("thumbnail_scan.py", [thumbnailUrl, jobDir], {
+			timeout: 30000, // 30 second timeout
+		});
+		
+		thumbnailResult = output;
+		console.log(
+			"📝 Thumbnail scan output (first 200 chars):",
+			output.substring(0, 200)
+		);
+	} catch (thumbErr) {
+		console.error("⚠️ Thumbnail scan error:", thumbErr.message);
+		// Don't fail the whole scan if thumbnail fails
+		thumbnailResult = "[]";
+	}
+	return thumbnailResult;
+}
+
+// Process many thumbnails in one Python call (pooled downloads, batched inference).
+// Returns a JSON array of {url, safe, reasons} verdicts, one per URL.
+async function processThumbnailBatch(thumbnailUrls) {
+	let batchResult = "[]";
+	try {
+		if (!thumbnailUrls || thumbnailUrls.length === 0) {
+			return batchResult;
 		}
-		resolve(thumbnailResult);
-	});
+
+		const output = await runPython("thumbnail_scan.py", ["--batch", ...thumbnailUrls], {
+			timeout: TIMEOUTS.THUMBNAIL_BATCH_SCAN,
+		});
+
+		batchResult = output;
+		console.log(
+			"📝 Batch thumbnail scan output (first 200 chars):",
+			output.substring(0, 200)
+		);
+	} catch (thumbErr) {
+		console.error("⚠️ Batch thumbnail scan error:", thumbErr.message);
+		// Don't fail the request if the batch scan fails
+		batchResult = "[]";
+	}
+	return batchResult;
 }
 
 // Process quick audio (first 2 minutes)
-function processAudioQuick() {
-	return new Promise((resolve) => {
-		let transcript = "[]";
-		try {
-			const audioOutput = execSync(`"${pythonCmd}" whisper_scan.py`, {
-				stdio: "pipe",
-				timeout: TIMEOUTS.QUICK_AUDIO_SCAN,
-				cwd: __dirname,
-			}).toString();
-			transcript = audioOutput;
-			console.log(
-				"📝 Quick Audio AI output (first 200 chars):",
-				audioOutput.substring(0, 200)
+async function processAudioQuick(jobDir) {
+	let transcript = "[]";
+	try {
+		const audioOutput = await runPython("whisper_scan.py", [jobDir], {
+			timeout: TIMEOUTS.QUICK_AUDIO_SCAN,
+		});
+		transcript = audioOutput;
+		console.log(
+			"📝 Quick Audio AI output (first 200 chars):",
+			audioOutput.substring(0, 200)
+		);
+	} catch (aiErr) {
+		console.error("⚠️ Quick Audio AI error:", aiErr.message);
+		if (aiErr.stdout) {
+			console.error(
+				"⚠️ Quick Audio AI stdout:",
+				aiErr.stdout.toString().substring(0, 200)
 			);
-		} catch (aiErr) {
-			console.error("⚠️ Quick Audio AI error:", aiErr.message);
-			if (aiErr.stdout) {
-				console.error(
-					"⚠️ Quick Audio AI stdout:",
-					aiErr.stdout.toString().substring(0, 200)
-				);
-			}
-			transcript = "[]"; // Default to empty if AI fails
 		}
-		resolve(transcript);
-	});
+		transcript = "[]"; // Default to empty if AI fails
+	}
+	return transcript;
 }
 
 // Process images
-function processImages() {
-	return new Promise((resolve) => {
-		let imageResult = "[]";
-		try {
-			const output = execSync(`"${pythonCmd}" image_scan.py`, {
-				stdio: "pipe",
-				timeout: TIMEOUTS.IMAGE_SCAN,
-				cwd: __dirname,
-			}).toString();
+async function processImages(jobDir) {
+	let imageResult = "[]";
+	try {
+		const output = await runPython("image_scan.py", [jobDir], {
+			timeout: TIMEOUTS.IMAGE_SCAN,
+		});
 
-			console.log(
-				"📝 Image AI raw output (first 500 chars):",
-				output.substring(0, 500)
-			);
+		console.log(
+			"📝 Image AI raw output (first 500 chars):",
+			output.substring(0, 500)
+		);
 
-			// Extract JSON from output (YOLO may print progress messages)
-			const lines = output.trim().split("\n");
-			for (let i = lines.length - 1; i >= 0; i--) {
-				const line = lines[i].trim();
-				if (
-					(line.startsWith("[") && line.endsWith("]")) ||
-					(line.startsWith("{") && line.endsWith("}"))
-				) {
-					imageResult = line;
-					console.log(`✅ Found JSON in line ${i + 1}:`, line);
-					break;
-				}
+		// Extract JSON from output (YOLO may print progress messages)
+		const lines = output.trim().split("\n");
+		for (let i = lines.length - 1; i >= 0; i--) {
+			const line = lines[i].trim();
+			if (
+				(line.startsWith("[") && line.endsWith("]")) ||
+				(line.startsWith("{") && line.endsWith("}"))
+			) {
+				imageResult = line;
+				console.log(`✅ Found JSON in line ${i + 1}:`, line);
+				break;
 			}
+		}
 
-			if (imageResult === "[]" && lines.length > 0) {
-				console.warn(
-					"⚠️ No valid JSON found in image AI output. Last line:",
-					lines[lines.length - 1]
-				);
-			}
-		} catch (aiErr) {
-			console.error("⚠️ Image AI error:", aiErr.message);
-			if (aiErr.stdout) {
-				console.error(
-					"⚠️ Image AI stdout:",
-					aiErr.stdout.toString().substring(0, 500)
-				);
-			}
-			imageResult = "[]"; // Default to empty if AI fails
+		if (imageResult === "[]" && lines.length > 0) {
+			console.warn(
+				"⚠️ No valid JSON found in image AI output. Last line:",
+				lines[lines.length - 1]
+			);
 		}
-		resolve(imageResult);
-	});
+	} catch (aiErr) {
+		console.error("⚠️ Image AI error:", aiErr.message);
+		if (aiErr.stdout) {
+			console.error(
+				"⚠️ Image AI stdout:",
+				aiErr.stdout.toString().substring(0, 500)
+			);
+		}
+		imageResult = "[]"; // Default to empty if AI fails
+	}
+	return imageResult;
 }
 
 // Process full audio (entire file)
-function processAudioFull(videoId) {
-	return new Promise((resolve) => {
-		let transcript = "[]";
-		try {
-			console.log(`🔄 Phase 2: Starting full audio scan for ${videoId}...`);
-			const audioOutput = execSync(`"${pythonCmd}" whisper_scan_full.py`, {
-				stdio: "pipe",
-				timeout: TIMEOUTS.FULL_AUDIO_SCAN,
-				cwd: __dirname,
-			}).toString();
-			transcript = audioOutput;
-			console.log(
-				"📝 Full Audio AI output (first 200 chars):",
-				audioOutput.substring(0, 200)
+async function processAudioFull(videoId, jobDir) {
+	let transcript = "[]";
+	try {
+		console.log(`🔄 Phase 2: Starting full audio scan for ${videoId}...`);
+		const audioOutput = await runPython("whisper_scan_full.py", [jobDir], {
+			timeout: TIMEOUTS.FULL_AUDIO_SCAN,
+		});
+		transcript = audioOutput;
+		console.log(
+			"📝 Full Audio AI output (first 200 chars):",
+			audioOutput.substring(0, 200)
+		);
+	} catch (aiErr) {
+		console.error("⚠️ Full Audio AI error:", aiErr.message);
+		if (aiErr.stdout) {
+			console.error(
+				"⚠️ Full Audio AI stdout:",
+				aiErr.stdout.toString().substring(0, 200)
 			);
-		} catch (aiErr) {
-			console.error("⚠️ Full Audio AI error:", aiErr.message);
-			if (aiErr.stdout) {
-				console.error(
-					"⚠️ Full Audio AI stdout:",
-					aiErr.stdout.toString().substring(0, 200)
-				);
-			}
-			transcript = "[]"; // Default to empty if AI fails
 		}
-		resolve(transcript);
-	});
+		transcript = "[]"; // Default to empty if AI fails
+	}
+	return transcript;
 }
 
 // Analyze transcription for screams, horror, and weapons
-function analyzeTranscription() {
-	return new Promise((resolve) => {
-		let analysisResult = "[]";
-		try {
-			console.log(
-				"🔍 Final check: Analyzing transcription for screams, horror, and weapons..."
+async function analyzeTranscription(jobDir) {
+	let analysisResult = "[]";
+	try {
+		console.log(
+			"🔍 Final check: Analyzing transcription for screams, horror, and weapons..."
+		);
+		const analysisOutput = await runPython("transcription_analyzer.py", [jobDir], {
+			timeout: TIMEOUTS.TRANSCRIPTION_ANALYSIS,
+		});
+		analysisResult = analysisOutput;
+		console.log(
+			"📊 Transcription analysis output (first 200 chars):",
+			analysisOutput.substring(0, 200)
+		);
+	} catch (analysisErr) {
+		console.error("⚠️ Transcription analysis error:", analysisErr.message);
+		if (analysisErr.stdout) {
+			console.error(
+				"⚠️ Transcription analysis stdout:",
+				analysisErr.stdout.toString().substring(0, 200)
 			);
-			const analysisOutput = execSync(`"${pythonCmd}" transcription_analyzer.py`, {
-				stdio: "pipe",
-				timeout: TIMEOUTS.TRANSCRIPTION_ANALYSIS,
-				cwd: __dirname,
-			}).toString();
-			analysisResult = analysisOutput;
-			console.log(
-				"📊 Transcription analysis output (first 200 chars):",
-				analysisOutput.substring(0, 200)
-			);
-		} catch (analysisErr) {
-			console.error("⚠️ Transcription analysis error:", analysisErr.message);
-			if (analysisErr.stdout) {
-				console.error(
-					"⚠️ Transcription analysis stdout:",
-					analysisErr.stdout.toString().substring(0, 200)
-				);
-			}
-			analysisResult = "[]"; // Default to empty if analysis fails
 		}
-		resolve(analysisResult);
-	});
+		analysisResult = "[]"; // Default to empty if analysis fails
+	}
+	return analysisResult;
 }
 
 module.exports = {
 	processThumbnail,
+	processThumbnailBatch,
 	processAudioQuick,
 	processImages,
 	processAudioFull,
@@ -0,0 +1,349 @@
+"""NumPy scream/distress detector that works on the raw audio.
+
+The transcript-based scream checks only see screams Whisper writes down as
+"ahhh" or "nooo", and Whisper drops most non-speech vocalisations. This module
+looks at the signal instead, one window at a time (ScreamStream), so memory
+stays bounded by the window size however long the audio is. Per-frame energy
+is computed per window in float32, and STFT features (in vectorised chunks)
+only for the frames that are energy bursts:
+
+* energy burst - the frame is well above the loudness of the surrounding
+  seconds (a moving baseline, carried across windows, so loud videos need
+  louder screams);
+* high pitch - autocorrelation pitch far above normal speech, with a clear
+  periodic peak (screams are voiced, noise bursts are not);
+* bright spectrum - a high spectral centroid and a large share of energy
+  above 2 kHz.
+
+Frames that are bursts with a high pitch and a bright spectrum are screams;
+runs of them that last long enough become timestamped events. A run is then
+rejected as a tone rather than a scream if its pitch barely moves or its
+periodicity is cleaner than a voice produces: a sung or played note (a
+kids' song, a whistle, a synth) is as high and bright as a scream but steady
+and harmonic, while screams waver and are rough.
+
+Single events are evidence, not a verdict: whisper_scan.py and
+transcription_analyzer.py count them alongside screams found in the
+transcript. Only a dense cluster of them (confident_cluster) flags a video
+on its own - it is what a screaming scene looks like even when Whisper
+writes none of it down, and lets the quick scan stop before transcribing.
+
+    python scream_detector.py [job_dir]   # prints the events as JSON
+"""
+import json
+import math
+import os
+import sys
+import wave
+
+import numpy as np
+
+import audio_io
+from audio_io import SAMPLE_RATE
+
+# AUDIO_SCREAM_DETECTOR=0 turns the acoustic detector off (transcript-only scream checks)
+ENABLED = os.environ.get("AUDIO_SCREAM_DETECTOR", "1") != "0"
+
+FRAME_SECONDS = 0.032
+HOP_SECONDS = 0.016
+# Frames per FFT batch - keeps the spectrum buffer small for hour-long audio
+CHUNK_FRAMES = 4096
+
+# Energy burst: this far above the moving baseline, and at least this loud (dBFS)
+BURST_DB = 8.0
+MIN_ENERGY_DB = -30.0
+BASELINE_SECONDS = 8.0
+
+# Pitch search range, and what counts as a scream pitch (speech is ~85-300 Hz)
+MIN_SEARCH_HZ = 100.0
+MAX_SEARCH_HZ = 1600.0
+MIN_SCREAM_PITCH_HZ = 400.0
+# Normalised autocorrelation peak needed to call a frame voiced
+MIN_VOICING = 0.45
+
+# Brightness: spectral centroid and share of energy above HIGH_BAND_HZ
+MIN_CENTROID_HZ = 1200.0
+HIGH_BAND_HZ = 2000.0
+MIN_HIGH_RATIO = 0.2
+
+# Events: bridge gaps shorter than this, then keep runs at least this long
+MAX_GAP_SECONDS = 0.15
+MIN_EVENT_SECONDS = 0.3
+
+# Tone rejection: a run whose pitch spreads less than this (standard
+# deviation, semitones) or whose median voicing is above MAX_VOICING is a note
+MIN_PITCH_SPREAD_SEMITONES = 0.35
+MAX_VOICING = 0.9
+
+# A cluster that flags without the transcript: at least this many events
+# starting within CLUSTER_SECONDS of each other
+CLUSTER_MIN_EVENTS = 4
+CLUSTER_SECONDS = 20.0
+
+
+def frame_energy_db(samples, sample_rate=SAMPLE_RATE):
+    """Per-frame energy (dBFS), float32 - no FFT and no copy of the samples"""
+    samples = np.asarray(samples, dtype=np.float32)
+    frame_len = int(sample_rate * FRAME_SECONDS)
+    hop = int(sample_rate * HOP_SECONDS)
+    if len(samples) < frame_len:
+        return np.zeros(0, dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_len)[::hop]
+    energy = np.einsum("ij,ij->i", frames, frames) / np.float32(frame_len)
+    return 10.0 * np.log10(energy + np.float32(1e-12))
+
+
+def spectral_features(samples, indices, sample_rate=SAMPLE_RATE):
+    """(spectral centroid Hz, high-band ratio, pitch Hz, voicing) of the frames at indices"""
+    samples = np.asarray(samples, dtype=np.float32)
+    frame_len = int(sample_rate * FRAME_SECONDS)
+    hop = int(sample_rate * HOP_SECONDS)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, frame_len)[::hop]
+
+    # Zero-padded to 2x so the autocorrelation from the power spectrum isn't circular
+    n_fft = 2 * frame_len
+    window = np.hanning(frame_len).astype(np.float32)
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    high_band = freqs >= HIGH_BAND_HZ
+    min_lag = int(sample_rate / MAX_SEARCH_HZ)
+    max_lag = int(sample_rate / MIN_SEARCH_HZ)
+
+    count = len(indices)
+    centroid = np.empty(count)
+    high_ratio = np.empty(count)
+    pitch = np.empty(count)
+    voicing = np.empty(count)
+    for start in range(0, count, CHUNK_FRAMES):
+        chunk = frames[indices[start:start + CHUNK_FRAMES]]
+        end = start + len(chunk)
+        power = np.abs(np.fft.rfft(chunk * window, n=n_fft, axis=1)) ** 2 + 1e-12
+        total = power.sum(axis=1)
+        centroid[start:end] = (power * freqs).sum(axis=1) / total
+        high_ratio[start:end] = power[:, high_band].sum(axis=1) / total
+
+        # Autocorrelation (Wiener-Khinchin), normalised by the zero-lag energy
+        autocorr = np.fft.irfft(power, n=n_fft, axis=1)[:, : max_lag + 2]
+        autocorr = autocorr / np.maximum(autocorr[:, :1], 1e-12)
+        rows = np.arange(len(chunk))
+        lags = min_lag + np.argmax(autocorr[:, min_lag:max_lag + 1], axis=1)
+        voicing[start:end] = autocorr[rows, lags]
+        # Parabolic interpolation around the peak: whole-sample lags are
+        # almost a semitone apart at scream pitches, too coarse to see a wobble
+        before, peak, after = autocorr[rows, lags - 1], autocorr[rows, lags], autocorr[rows, lags + 1]
+        curvature = before - 2 * peak + after
+        shift = np.where(curvature < 0, 0.5 * (before - after) / np.minimum(curvature, -1e-12), 0.0)
+        pitch[start:end] = sample_rate / (lags + np.clip(shift, -0.5, 0.5))
+
+    return centroid, high_ratio, pitch, voicing
+
+
+def _runs(mask):
+    """(start, end) frame index pairs of the True runs in mask"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+
+def is_tonal(pitch, voicing):
+    """Whether a run's voiced frames look like a sung/played note rather than a scream"""
+    if len(pitch) == 0:
+        return False
+    spread = float(np.std(12.0 * np.log2(pitch)))
+    return spread < MIN_PITCH_SPREAD_SEMITONES or float(np.median(voicing)) > MAX_VOICING
+
+
+class ScreamStream:
+    """Scream detection over consecutive windows of one recording.
+
+    feed() takes the next window and returns the events that are complete;
+    finish() returns the rest. A frame is judged once the energy half a
+    baseline ahead of it is known, so besides the current window only that
+    much audio (BASELINE_SECONDS / 2) and the frames of an unfinished event
+    are held - the baseline runs on across windows exactly as over one array.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, offset=0.0):
+        self.sample_rate = sample_rate
+        self.offset = offset
+        self.frame_len = int(sample_rate * FRAME_SECONDS)
+        self.hop = int(sample_rate * HOP_SECONDS)
+        self.width = max(1, int(BASELINE_SECONDS / HOP_SECONDS))
+        self.bridge = int(round(MAX_GAP_SECONDS / HOP_SECONDS))
+        # Audio from frame _sample_frame on
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._sample_frame = 0
+        # Frame energies (dBFS) from frame _energy_frame on, and the first
+        # frame's (the baseline's left edge is padded with it)
+        self._energy = np.zeros(0, dtype=np.float32)
+        self._energy_frame = 0
+        self._first_energy = None
+        # Frames before this one are judged
+        self._judged = 0
+        # Judged frames from _open_frame on that may still join an event:
+        # (scream, energy dB, pitch Hz, voicing)
+        self._open_frame = 0
+        self._open = (np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32), np.zeros(0), np.zeros(0))
+
+    def feed(self, samples):
+        """Add the next window of audio; returns the events completed so far"""
+        self._samples = np.concatenate([self._samples, np.asarray(samples, dtype=np.float32)])
+        # Energy of the frames that now fit in the buffer
+        frames_in_buffer = (len(self._samples) - self.frame_len) // self.hop + 1 if len(self._samples) >= self.frame_len else 0
+        known = self._energy_frame + len(self._energy)
+        if self._sample_frame + frames_in_buffer > known:
+            new = frame_energy_db(self._samples[(known - self._sample_frame) * self.hop:], self.sample_rate)
+            if self._first_energy is None and len(new):
+                self._first_energy = new[0]
+            self._energy = np.concatenate([self._energy, new])
+        return self._judge(final=False)
+
+    def finish(self):
+        """Events still open at the end of the recording"""
+        return self._judge(final=True)
+
+    def _judge(self, final):
+        known = self._energy_frame + len(self._energy)
+        before = self.width // 2
+        after = self.width - 1 - before
+        end = known if final else known - after
+        if end > self._judged:
+            self._judge_frames(self._judged, end, known, before, after)
+            self._judged = end
+        events = self._close_events(final)
+
+        # Keep only what frames not judged yet (and the baseline) still need
+        drop = self._judged - self._sample_frame
+        if drop > 0:
+            self._samples = self._samples[drop * self.hop:]
+            self._sample_frame = self._judged
+        drop = self._judged - before - self._energy_frame
+        if drop > 0:
+            self._energy = self._energy[drop:]
+            self._energy_frame += drop
+        return events
+
+    def _judge_frames(self, start, end, known, before, after):
+        # Centred moving mean, edge-padded like a whole-array mean
+        lo, hi = start - before, end + after
+        energy = self._energy[max(lo, 0) - self._energy_frame:min(hi, known) - self._energy_frame]
+        padded = np.concatenate([
+            np.full(max(0, -lo), self._first_energy, dtype=np.float32),
+            energy,
+            np.full(max(0, hi - known), energy[-1] if len(energy) else 0.0, dtype=np.float32),
+        ])
+        cumsum = np.cumsum(np.concatenate([[0.0], padded.astype(np.float64)]))
+        baseline = (cumsum[self.width:] - cumsum[:-self.width]) / self.width
+        energy_db = padded[before:before + end - start]
+        scream = (energy_db > baseline + BURST_DB) & (energy_db > MIN_ENERGY_DB)
+
+        # OPTIMIZATION: the STFT features are only computed for the (few) burst frames
+        candidates = np.flatnonzero(scream)
+        pitch = np.zeros(end - start)
+        voicing = np.zeros(end - start)
+        if len(candidates):
+            centroid, high_ratio, candidate_pitch, candidate_voicing = spectral_features(
+                self._samples, candidates + start - self._sample_frame, self.sample_rate
+            )
+            scream[candidates] = (
+                (candidate_voicing > MIN_VOICING)
+                & (candidate_pitch > MIN_SCREAM_PITCH_HZ)
+                & (centroid > MIN_CENTROID_HZ)
+                & (high_ratio > MIN_HIGH_RATIO)
+            )
+            pitch[candidates] = candidate_pitch
+            voicing[candidates] = candidate_voicing
+
+        if not self._open[0].any():
+            # Nothing open to extend: start afresh at this range
+            self._open_frame = start
+            self._open = (scream, energy_db, pitch, voicing)
+        else:
+            self._open = tuple(np.concatenate([old, new]) for old, new in zip(self._open, (scream, energy_db, pitch, voicing)))
+
+    def _close_events(self, final):
+        scream, energy_db, pitch, voicing = self._open
+        scream = scream.copy()
+        # Bridge short dropouts (breaks in voicing inside one scream)
+        for start, end in list(_runs(~scream)):
+            if 0 < start and end < len(scream) and end - start <= self.bridge:
+                scream[start:end] = True
+
+        events = []
+        keep_from = len(scream)
+        for start, end in _runs(scream):
+            if not final and len(scream) - end <= self.bridge:
+                # The next frames may still extend this run
+                keep_from = start
+                break
+            # A frame covers FRAME_SECONDS from its start, hence the last frame's tail
+            start_s = (self._open_frame + start) * HOP_SECONDS
+            end_s = (self._open_frame + end - 1) * HOP_SECONDS + FRAME_SECONDS
+            if end_s - start_s < MIN_EVENT_SECONDS:
+                continue
+            # Bridged dropout frames have no pitch of their own
+            voiced = pitch[start:end] > 0
+            if is_tonal(pitch[start:end][voiced], voicing[start:end][voiced]):
+                continue
+            events.append({
+                "start": round(float(self.offset + start_s), 2),
+                "end": round(float(self.offset + end_s), 2),
+                "peak_db": round(float(energy_db[start:end].max()), 1),
+                "pitch_hz": round(float(np.median(pitch[start:end][voiced])), 0),
+            })
+
+        self._open = tuple(values[keep_from:] for values in self._open)
+        self._open_frame += keep_from
+        return events
+
+
+def detect(samples, sample_rate=SAMPLE_RATE, offset=0.0):
+    """Scream events [{"start", "end", "peak_db", "pitch_hz"}] (seconds, plus offset)"""
+    stream = ScreamStream(sample_rate, offset)
+    return stream.feed(samples) + stream.finish()
+
+
+def detect_file(audio_path, limit_seconds=None):
+    """Scream events in a WAV file (the first limit_seconds only, if given), read window by window"""
+    stream = ScreamStream()
+    events = []
+    for _, samples in audio_io.iter_wav_windows(audio_path, audio_io.STREAM_WINDOW_SECONDS, limit_seconds):
+        events += stream.feed(samples)
+    return events + stream.finish()
+
+
+def confident_cluster(events):
+    """The first CLUSTER_MIN_EVENTS or more events within CLUSTER_SECONDS, else []"""
+    events = sorted(events, key=lambda event: event["start"])
+    first = 0
+    for last, event in enumerate(events):
+        while event["start"] - events[first]["start"] > CLUSTER_SECONDS:
+            first += 1
+        if last - first + 1 >= CLUSTER_MIN_EVENTS:
+            # Take in the rest of the run as well
+            while last + 1 < len(events) and events[last + 1]["start"] - events[first]["start"] <= CLUSTER_SECONDS:
+                last += 1
+            return events[first:last + 1]
+    return []
+
+
+def format_events(events, limit=3):
+    """Event times for flag reasons, e.g. 0:12-0:14, 1:05-1:07 +2 more"""
+    def clock(seconds):
+        minutes, seconds = divmod(seconds, 60)
+        return f"{minutes}:{seconds:02d}"
+
+    shown = ", ".join(
+        f"{clock(int(event['start']))}-{clock(math.ceil(event['end']))}" for event in events[:limit]
+    )
+    return shown + (f" +{len(events) - limit} more" if len(events) > limit else "")
+
+
+if __name__ == "__main__":
+    from workspace import job_dir_arg, job_path
+
+    try:
+        events = detect_file(job_path(job_dir_arg(sys.argv), "audio.wav"))
+    except (OSError, wave.Error, EOFError, ValueError) as e:
+        print(f"⚠️ Could not read audio: {e}", file=sys.stderr)
+        events = []
+    print(json.dumps(events))
+    sys.stdout.flush()
@@ -6,7 +6,9 @@ const { dbHelpers } = require("./database");
 const { jsonParser, jsonErrorHandler, errorHandler } = require("./middleware");
 const { analyzeRoute } = require("./routes/analyze");
 const { validateRoute } = require("./routes/validate");
+const { thumbnailsRoute } = require("./routes/thumbnails");
 const { rootRoute, healthRoute, notFoundRoute } = require("./routes/index");
+const { startScanWorker, stopScanWorker } = require("./scanWorker");
 
 /** @type {import('express').Express} */
 const app = express();
@@ -17,6 +19,7 @@ app.use(jsonErrorHandler);
 // Routes
 app.post("/validate", validateRoute);
 app.post("/analyze", analyzeRoute);
+app.post("/analyze-thumbnails", thumbnailsRoute);
 app.get("/", rootRoute);
 app.get("/health", healthRoute);
 app.use(notFoundRoute);
@@ -28,6 +31,7 @@ app.use(errorHandler);
 const PORT = process.env.PORT || 4000;
 app.listen(PORT, () => {
 	console.log(`✅ Kidsafe backend running on http://localhost:${PORT}`);
+	startScanWorker();
 });
 
 // Graceful shutdown
@@ -37,6 +41,7 @@ process.on("SIGINT", async () => {
 	// Interrupt any active scans
 	const { scanManager } = require("./scanManager");
 	scanManager.interruptCurrentScan();
+	stopScanWorker();
 	
 	// Give background processes a moment to clean up
 	await new Promise((resolve) => setTimeout(resolve, 1000));
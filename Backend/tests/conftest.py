@@ -0,0 +1,181 @@
+"""Shared setup for the Backend tests (run from Backend/: python -m pytest -q).
+
+The scanner modules import each other by name, as they do when run from
+Backend/, so that directory goes first on sys.path. The fixtures stand in for
+the network and the models: a local http.server plays the thumbnail CDN, and a
+fake YOLO (no detections) replaces the real one, so the tests need neither.
+"""
+import email.utils
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Every scan in the tests runs in-process, never through a running worker
+os.environ["SCAN_WORKER"] = "0"
+os.environ.setdefault("SCAN_TIMING", "0")
+
+
+def encode_image(bgr, size=(120, 90)):
+    """JPEG bytes of a solid-colour image"""
+    import cv2
+    import numpy as np
+    image = np.zeros((size[1], size[0], 3), np.uint8)
+    image[:] = bgr
+    ok, data = cv2.imencode(".jpg", image)
+    assert ok
+    return data.tobytes()
+
+
+def write_wav(path, samples, sample_rate=16000):
+    """16-bit mono WAV of float samples in [-1, 1]"""
+    import wave
+    import numpy as np
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+# A light grey thumbnail (no flags) and a deep red one (blood/gore fallback flag)
+SAFE_IMAGE = (200, 200, 200)
+BLOOD_IMAGE = (0, 0, 150)
+
+
+class ThumbnailServer:
+    """Local stand-in for the thumbnail CDN.
+
+    Serves the bodies registered with add() with an ETag and Last-Modified,
+    answers matching If-None-Match / If-Modified-Since with 304, and records
+    every request's path and headers.
+    """
+
+    LAST_MODIFIED = email.utils.formatdate(1700000000, usegmt=True)
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers)))
+                server.respond(self)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def add(self, path, body, status=200, validators=True):
+        """Serve body at path; returns its URL"""
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"' if validators else None
+        self.files[path] = (status, body, etag)
+        return self.url(path)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def hits(self, path):
+        return [headers for requested, headers in self.requests if requested == path]
+
+    def respond(self, handler):
+        if handler.path not in self.files:
+            handler.send_error(404)
+            return
+        status, body, etag = self.files[handler.path]
+        if status != 200:
+            handler.send_error(status)
+            return
+        if etag is not None and (
+            handler.headers.get("If-None-Match") == etag
+            or (not handler.headers.get("If-None-Match") and handler.headers.get("If-Modified-Since") == self.LAST_MODIFIED)
+        ):
+            handler.send_response(304)
+            handler.send_header("ETag", etag)
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "image/jpeg")
+        handler.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            handler.send_header("ETag", etag)
+            handler.send_header("Last-Modified", self.LAST_MODIFIED)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def thumbnail_server():
+    server = ThumbnailServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def unreachable_url():
+    """URL of a local port nothing listens on (connection refused)"""
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/gone.jpg"
+
+
+class FakeYolo:
+    """Callable like an ultralytics model; finds nothing and records batch sizes"""
+
+    names = {}
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images, verbose=False, conf=0.6):
+        images = images if isinstance(images, list) else [images]
+        self.batches.append(len(images))
+        boxes = SimpleNamespace(cls=[], conf=[], xyxy=[])
+        return [SimpleNamespace(boxes=boxes) for _ in images]
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """thumbnail_scan with a fake YOLO and no content safety model; yields the fake YOLO"""
+    import thumbnail_scan
+    yolo = FakeYolo()
+    monkeypatch.setattr(thumbnail_scan, "get_yolo_model", lambda: yolo)
+    monkeypatch.setattr(thumbnail_scan, "HAS_TRANSFORMERS", False)
+    yield yolo
+
+
+@pytest.fixture
+def verdict_cache(tmp_path, monkeypatch):
+    """A fresh, enabled thumbnail verdict cache in tmp_path"""
+    import thumbnail_cache
+    monkeypatch.setattr(thumbnail_cache, "ENABLED", True)
+    monkeypatch.setattr(thumbnail_cache, "CACHE_PATH", str(tmp_path / "verdicts.sqlite3"))
+    monkeypatch.setattr(thumbnail_cache, "_caches", {})
+    yield thumbnail_cache
+
+
+@pytest.fixture(autouse=True)
+def transcript_store_path(tmp_path, monkeypatch):
+    """Scans store transcripts by videoId - in tmp_path, never in Backend/transcripts.db"""
+    import transcript_store
+    path = str(tmp_path / "transcripts.db")
+    monkeypatch.setattr(transcript_store, "STORE_PATH", path)
+    yield path
@@ -0,0 +1,42 @@
+"""ASR engine selection: cache keys name the engine that actually loads."""
+import importlib
+
+import pytest
+
+import asr
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """configure(backend, installed) re-imports asr with ASR_BACKEND=backend"""
+    find_spec = importlib.util.find_spec
+
+    def configure(backend, installed):
+        monkeypatch.setenv("ASR_BACKEND", backend)
+        monkeypatch.setattr(
+            importlib.util, "find_spec",
+            lambda name, *args: (find_spec("os") if installed else None) if name == "faster_whisper" else find_spec(name, *args),
+        )
+        importlib.reload(asr)
+
+    yield configure
+    monkeypatch.undo()
+    importlib.reload(asr)
+
+
+def test_missing_faster_whisper_is_tagged_as_whisper(configure, monkeypatch):
+    configure("faster-whisper", installed=False)
+    loaded = []
+    monkeypatch.setattr(asr, "WhisperEngine", lambda name, compute_type: loaded.append(name) or "whisper engine")
+
+    # Same key as openai-whisper's transcripts - that is what produces them
+    assert asr.engine_tag("tiny") == "tiny"
+    assert asr.load_engine("tiny") == "whisper engine"
+    assert loaded == ["tiny"]
+
+
+def test_installed_faster_whisper_gets_its_own_tag(configure):
+    configure("faster-whisper", installed=True)
+
+    assert asr.RESOLVED_BACKEND == "faster-whisper"
+    assert asr.engine_tag("tiny") == "tiny-faster-whisper-auto"
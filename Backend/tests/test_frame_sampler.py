@@ -0,0 +1,70 @@
+"""Scene sampler: cuts come from packet sizes and keyframe cadence, only chosen frames are decoded."""
+import numpy as np
+import pytest
+
+import frame_sampler
+
+cv2 = pytest.importorskip("cv2")
+
+
+def packets(count=120, gop=12, inserted=()):
+    """Steady delta frames of ~1000 bytes, a keyframe every gop frames (counted again from inserted ones)"""
+    rng = np.random.default_rng(0)
+    sizes = rng.uniform(900, 1100, count)
+    keys = np.zeros(count, bool)
+    last = 0
+    for frame in range(count):
+        if frame - last in (0, gop) or frame in inserted:
+            keys[frame] = True
+            last = frame
+    sizes[keys] = 20000
+    return sizes, keys
+
+
+def test_oversized_delta_frames_and_inserted_keyframes_are_cuts():
+    # Encoder-inserted keyframe at 30, off the 12-frame cadence
+    sizes, keys = packets(inserted=(30,))
+    sizes[50] = 8000  # cut between keyframes
+    # A cut into a busier scene: every frame after it is larger, but only the first is a cut
+    sizes[95:] *= 3
+    sizes[95] = 12000
+
+    scores = frame_sampler.scene_scores(sizes, keys)
+    assert list(np.flatnonzero(scores)) == [30, 50, 95]
+    assert all(scores[[30, 50, 95]] >= frame_sampler.SCENE_THRESHOLD)
+
+
+def test_scheduled_keyframes_and_intra_only_video_have_no_cuts():
+    sizes, keys = packets()
+    assert not frame_sampler.scene_scores(sizes, keys).any()
+    assert not frame_sampler.scene_scores(sizes, np.ones(len(sizes), bool)).any()
+
+
+def test_samples_cuts_within_the_budget(tmp_path, monkeypatch):
+    import benchmark
+    benchmark.write_video(str(tmp_path), 60)
+    path = str(tmp_path / "preview.mp4")
+
+    reads = []
+    capture = cv2.VideoCapture
+
+    class CountingCapture:
+        def __init__(self, *args):
+            self.cap = capture(*args)
+            self.raw = len(args) > 1
+
+        def read(self):
+            if not self.raw:
+                reads.append(1)
+            return self.cap.read()
+
+        def __getattr__(self, name):
+            return getattr(self.cap, name)
+
+    monkeypatch.setattr(frame_sampler.cv2, "VideoCapture", CountingCapture)
+    frames = list(frame_sampler.sample_frames(path, budget=8))
+
+    assert 1 <= len(frames) <= 8
+    assert all(frame.shape == (benchmark.VIDEO_SIZE[1], benchmark.VIDEO_SIZE[0], 3) for frame in frames)
+    # One full decode per chosen frame, never a pass over the whole video
+    assert len(reads) == len(frames)
@@ -0,0 +1,131 @@
+"""rescore.py: stored verdicts re-derived from the transcript store."""
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+import rescore
+import transcript_store
+import vad
+import whisper_scan
+from conftest import write_wav
+
+
+def segments(*timed_texts):
+    return {
+        "text": "".join(text for _, text in timed_texts),
+        "segments": [{"start": start, "end": start + 3.0, "text": text} for start, text in timed_texts],
+    }
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """(verdict db path, transcript store path, add(video_id, reasons, transcript))"""
+    db_path = str(tmp_path / "videos.db")
+    store_path = str(tmp_path / "transcripts.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE videos (videoId TEXT PRIMARY KEY, safe INTEGER, reasons TEXT, scanStatus TEXT)")
+
+    def add(video_id, reasons, transcript, source_key="key"):
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "INSERT INTO videos VALUES (?, ?, ?, 'full')", (video_id, 0 if reasons else 1, json.dumps(reasons))
+            )
+        if transcript is None:
+            return
+        conn = transcript_store.connect(store_path)
+        with conn:
+            conn.execute(
+                "INSERT INTO transcripts (video_id, source_key, stored_at, data) VALUES (?, ?, 0, ?)",
+                (video_id, source_key, transcript_store.pack(transcript)),
+            )
+        conn.close()
+
+    yield db_path, store_path, add
+
+
+def changes(db_path, store_path):
+    report = rescore.rescore(db_path, store_path, processes=1)
+    return report, {change["videoId"]: change["reasons"] for change in report["changed"]}
+
+
+def test_phase2_verdict_keeps_image_reasons(stores):
+    db_path, store_path, add = stores
+    add("phase2", ["bad speech: damn", "weapon detected in frame: knife"], segments((5.0, " what the hell")))
+
+    report, changed = changes(db_path, store_path)
+
+    assert changed == {"phase2": ["bad speech: hell", "weapon detected in frame: knife"]}
+    assert report["compared"] == 1
+
+
+def test_quick_reasons_are_rederived_from_the_first_two_minutes(stores):
+    db_path, store_path, add = stores
+    # Flagged by the quick scan; "hell" is in the first 2 minutes, "damn" after them
+    add("quick", ["weapon detected in thumbnail: knife", "inappropriate language: damn"], segments((10.0, " hell no"), (150.0, " damn")))
+    # Same words, but after the first 2 minutes only: Phase 1 passes, so Phase 2 applies
+    add("late", ["inappropriate language: damn"], segments((10.0, " hello there"), (150.0, " damn")))
+    add("unchanged", ["inappropriate language: hell"], segments((10.0, " hell")))
+
+    report, changed = changes(db_path, store_path)
+
+    assert changed == {
+        "quick": ["weapon detected in thumbnail: knife", "inappropriate language: hell"],
+        "late": ["bad speech: damn"],
+    }
+    assert report["unchanged"] == 1
+
+
+def test_untimed_quick_verdicts_are_skipped(stores):
+    db_path, store_path, add = stores
+    add("untimed", ["inappropriate language: hell"], {"text": " damn", "segments": []})
+
+    report, changed = changes(db_path, store_path)
+
+    assert changed == {}
+    assert report["skipped_untimed"] == ["untimed"]
+    assert report["compared"] == 0
+
+
+def test_quick_scan_transcripts_rederive_only_phase1(stores):
+    db_path, store_path, add = stores
+    quick = transcript_store.QUICK_KEY_PREFIX + "tiny"
+    add("still_flagged", ["inappropriate language: damn"], segments((10.0, " hell")), quick)
+    # Clean now, but Phase 2/3 never ran on the whole audio
+    add("passes_phase1", ["inappropriate language: damn"], segments((10.0, " hello")), quick)
+    add("missing", ["inappropriate language: damn"], None)
+
+    report, changed = changes(db_path, store_path)
+
+    assert changed == {"still_flagged": ["inappropriate language: hell"]}
+    assert report["needs_full_scan"] == ["passes_phase1"]
+    assert report["no_transcript"] == ["missing"]
+
+
+class FakeAsr:
+    """Transcribes every window as one segment saying "damn" 1-2 s in"""
+
+    def transcribe(self, audio):
+        return {"text": " damn", "segments": [{"start": 1.0, "end": 2.0, "text": " damn"}]}
+
+
+def test_quick_scan_stores_its_transcript(tmp_path, monkeypatch):
+    job_dir = tmp_path / "abc123"
+    job_dir.mkdir()
+    write_wav(job_dir / "audio.wav", np.zeros(40 * 16000, np.float32))
+    monkeypatch.setattr(whisper_scan, "get_asr_engine", lambda name: FakeAsr())
+    monkeypatch.setattr(vad, "ENABLED", False)
+
+    assert whisper_scan.scan(str(job_dir)) == ["inappropriate language: damn"]
+
+    [[(video_id, source_key, data, screams)]] = transcript_store.iter_packed(transcript_store.STORE_PATH)
+    assert (video_id, source_key, screams) == ("abc123", transcript_store.QUICK_KEY_PREFIX + "tiny", "[]")
+    # Stopped after the first window
+    assert transcript_store.unpack(data)["segments"] == [{"start": 1.0, "end": 2.0, "text": " damn"}]
+
+    # A full transcript replaces it, and is never replaced by a quick one
+    transcript_store.save("abc123", "full-key", segments((1.0, " damn")))
+    whisper_scan.scan(str(job_dir))
+    [[(_, source_key, _, _)]] = transcript_store.iter_packed(transcript_store.STORE_PATH)
+    assert source_key == "full-key"
@@ -0,0 +1,105 @@
+"""Acoustic scream detector: tones are rejected, windows match the whole file, only clusters flag alone."""
+import numpy as np
+import pytest
+
+import audio_io
+import scream_detector
+import transcription_analyzer
+import whisper_scan
+from conftest import write_wav
+
+SR = scream_detector.SAMPLE_RATE
+
+
+def room_tone(seconds, rng):
+    return (0.003 * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+def melody(seconds=120):
+    """0.6 s sawtooth notes (C5/E5/G5/A5) every 4 s on room tone, at -15 dBFS"""
+    rng = np.random.default_rng(0)
+    audio = room_tone(seconds, rng)
+    t = np.arange(int(0.6 * SR)) / SR
+    amplitude = 10 ** (-15 / 20) * np.sqrt(3)
+    for i, start in enumerate(np.arange(2.0, seconds - 1, 4.0)):
+        freq = (523.25, 659.25, 783.99, 880.0)[i % 4]
+        note = amplitude * (2 * ((t * freq) % 1.0) - 1)
+        audio[int(start * SR):int(start * SR) + len(note)] += note.astype(np.float32)
+    return audio
+
+
+def scream(seconds, rng):
+    """Rough, wavering, bright voiced sound: a pitch glide with jitter and breath noise"""
+    n = int(seconds * SR)
+    t = np.arange(n) / SR
+    jitter = np.cumsum(rng.standard_normal(n))
+    f0 = np.interp(t, [0, seconds * 0.3, seconds], [700, 1100, 770]) * (1 + 0.04 * jitter / np.abs(jitter).max())
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    voice = sum(np.sin(k * phase) * 0.8 ** k for k in range(1, 10))
+    shimmer = 1 + 0.3 * rng.standard_normal(n // 160 + 1).repeat(160)[:n]
+    signal = (voice * shimmer + 0.6 * rng.standard_normal(n)) * np.minimum(1, np.minimum(t / 0.05, (seconds - t) / 0.1))
+    return (0.3 * signal / np.abs(signal).max()).astype(np.float32)
+
+
+def screams(seconds, times):
+    rng = np.random.default_rng(1)
+    audio = room_tone(seconds, rng)
+    for start in times:
+        sound = scream(1.2, rng)
+        audio[int(start * SR):int(start * SR) + len(sound)] += sound
+    return audio
+
+
+def test_steady_notes_are_not_screams():
+    assert scream_detector.detect(melody()) == []
+
+
+def test_screams_are_found():
+    events = scream_detector.detect(screams(60, (10, 30, 50)))
+    assert [round(event["start"]) for event in events] == [10, 30, 50]
+    assert all(event["pitch_hz"] > scream_detector.MIN_SCREAM_PITCH_HZ for event in events)
+
+
+@pytest.mark.parametrize("window_seconds", [0.5, 7.7, 30.0])
+def test_windows_match_the_whole_file(tmp_path, monkeypatch, window_seconds):
+    # Screams across window edges, and one right before the 2 minute limit
+    path = tmp_path / "audio.wav"
+    write_wav(path, screams(150, (10, 29.5, 59.9, 118.5, 130)))
+    whole = scream_detector.detect(audio_io.load_wav(str(path)))
+    assert len(whole) == 5
+
+    monkeypatch.setattr(audio_io, "STREAM_WINDOW_SECONDS", window_seconds)
+    assert scream_detector.detect_file(str(path)) == whole
+    assert scream_detector.detect_file(str(path), 120) == scream_detector.detect(audio_io.load_wav(str(path), 120))
+
+
+def test_sparse_acoustic_events_need_a_transcript_scream():
+    events = [{"start": float(t), "end": t + 0.6} for t in range(2, 120, 30)]
+
+    # Neither scan flags on scattered acoustic events alone...
+    assert whisper_scan.build_flags({}, 0, events) == []
+    assert transcription_analyzer.analyze_segments([], "la la la", events).flags() == []
+
+    # ...but they back up a scream in the transcript
+    assert whisper_scan.build_flags({}, 1, events[:2])[0].startswith("screams detected in audio (1 instances, with 2 acoustic events")
+    assert transcription_analyzer.analyze_segments([], "help! help! help!", events).flags()[0].startswith("excessive screams detected")
+
+
+def test_a_dense_cluster_flags_without_the_transcript():
+    events = scream_detector.detect(screams(60, (5, 10, 15, 20)))
+    assert scream_detector.confident_cluster(events) == events
+
+    assert whisper_scan.build_flags({}, 0, events) == ["screams detected in audio (4 acoustic events at 0:05-0:07, 0:10-0:12, 0:15-0:17 +1 more)"]
+    flags = transcription_analyzer.analyze_segments([], "la la la", events).detailed_flags()
+    assert [flag["category"] for flag in flags] == ["scream"]
+    assert flags[0]["reason"].startswith("excessive screams detected (4 acoustic events)")
+
+
+def test_quick_scan_flags_a_cluster_before_transcribing(tmp_path, monkeypatch):
+    write_wav(tmp_path / "audio.wav", screams(60, (5, 10, 15, 20)))
+
+    def no_whisper(*args, **kwargs):
+        raise AssertionError("Whisper loaded for an already flagged video")
+
+    monkeypatch.setattr(whisper_scan, "get_asr_engine", no_whisper)
+    assert whisper_scan.scan(str(tmp_path))[0].startswith("screams detected in audio (4 acoustic events")
@@ -0,0 +1,56 @@
+"""Thread governor: per-job shares in standalone scanners, one budget per worker process."""
+import os
+import sys
+
+import pytest
+
+import thread_governor
+
+
+@pytest.fixture
+def governor(tmp_path, monkeypatch):
+    monkeypatch.setattr(thread_governor, "ENABLED", True)
+    monkeypatch.setattr(thread_governor, "FIXED_THREADS", 0)
+    monkeypatch.setattr(thread_governor, "GOVERNOR_DIR", str(tmp_path))
+    monkeypatch.setattr(thread_governor, "_process_threads", None)
+    monkeypatch.setenv("SCAN_CPU_CORES", "8")
+    applied = []
+    real_apply = thread_governor.apply_threads
+    monkeypatch.setattr(thread_governor, "apply_threads", lambda threads: applied.append(threads))
+    yield applied, real_apply
+
+
+def test_standalone_job_takes_a_share_of_the_cores(governor):
+    applied, _ = governor
+    with thread_governor.governed("image"):
+        with thread_governor.governed("nested"):
+            pass
+        assert [job["threads"] for job in thread_governor.active_jobs()] == [8]
+    assert applied == [8]
+    assert thread_governor.active_jobs() == []
+
+
+def test_worker_process_is_budgeted_once(governor):
+    applied, _ = governor
+    thread_governor.budget_process(2)
+    assert applied == [4]
+
+    with thread_governor.governed("whisper_quick"):
+        with thread_governor.governed("image"):
+            thread_governor.rebalance()
+        assert [job["threads"] for job in thread_governor.active_jobs()] == [4]
+    # Leases record the process budget but never resize the pools
+    assert applied == [4]
+
+
+def test_env_vars_only_set_before_import(governor, monkeypatch):
+    _, apply_threads = governor
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.delitem(sys.modules, "torch", raising=False)
+    import numpy  # noqa: F401 - already loaded, so OPENBLAS_NUM_THREADS would be ignored
+
+    apply_threads(3)
+
+    assert os.environ["OMP_NUM_THREADS"] == os.environ["MKL_NUM_THREADS"] == "3"
+    assert "OPENBLAS_NUM_THREADS" not in os.environ
@@ -0,0 +1,58 @@
+"""Batch thumbnail scan (thumbnail_scan.scan_batch, behind POST /analyze-thumbnails)."""
+import pytest
+
+import thumbnail_scan
+from conftest import BLOOD_IMAGE, SAFE_IMAGE, encode_image
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    # Verdict caching is covered in test_thumbnail_fetch.py
+    monkeypatch.setattr(thumbnail_scan.thumbnail_cache, "get_cache", lambda model_version: None)
+
+
+def test_one_verdict_per_url_in_request_order(thumbnail_server, fake_models, unreachable_url):
+    safe = thumbnail_server.add("/safe.jpg", encode_image(SAFE_IMAGE))
+    blood = thumbnail_server.add("/blood.jpg", encode_image(BLOOD_IMAGE))
+    missing = thumbnail_server.url("/missing.jpg")
+
+    verdicts = thumbnail_scan.scan_batch([blood, safe, missing, unreachable_url])
+
+    assert [verdict["url"] for verdict in verdicts] == [blood, safe, missing, unreachable_url]
+    assert not verdicts[0]["safe"]
+    assert verdicts[0]["reasons"][0].startswith("blood/gore detected in thumbnail")
+    assert verdicts[1] == {"url": safe, "safe": True, "reasons": []}
+    # 404 and connection refused: no flags, marked as unavailable
+    for verdict in verdicts[2:]:
+        assert verdict["safe"] and verdict["reasons"] == []
+        assert verdict["error"] == "thumbnail unavailable"
+
+
+def test_server_errors_and_undecodable_bodies_are_unavailable(thumbnail_server, fake_models):
+    broken = thumbnail_server.add("/broken.jpg", b"<html>not an image</html>")
+    failing = thumbnail_server.add("/failing.jpg", b"", status=500)
+
+    verdicts = thumbnail_scan.scan_batch([broken, failing])
+
+    assert [verdict["error"] for verdict in verdicts] == ["thumbnail unavailable"] * 2
+    # Nothing decodable, so the models never ran
+    assert fake_models.batches == []
+
+
+def test_duplicates_and_empty_urls_are_fetched_once(thumbnail_server, fake_models):
+    safe = thumbnail_server.add("/safe.jpg", encode_image(SAFE_IMAGE))
+
+    verdicts = thumbnail_scan.scan_batch([safe, "", safe, None, safe])
+
+    assert [verdict["url"] for verdict in verdicts] == [safe]
+    assert len(thumbnail_server.hits("/safe.jpg")) == 1
+
+
+def test_inference_runs_in_batches(thumbnail_server, fake_models, monkeypatch):
+    monkeypatch.setattr(thumbnail_scan, "BATCH_SIZE", 2)
+    urls = [thumbnail_server.add(f"/thumb_{i}.jpg", encode_image((40 * i, 200, 200))) for i in range(5)]
+
+    verdicts = thumbnail_scan.scan_batch(urls)
+
+    assert len(verdicts) == 5
+    assert fake_models.batches == [2, 2, 1]
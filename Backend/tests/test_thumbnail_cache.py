@@ -0,0 +1,117 @@
+"""Thumbnail verdict cache: which verdicts may be reused, and under which model version."""
+import threading
+
+import cv2
+import numpy as np
+
+import thumbnail_fetch
+import thumbnail_scan
+from conftest import SAFE_IMAGE, encode_image
+from frame_context import FrameContext, hamming_distance
+
+
+def textured(seed=0, size=(120, 90)):
+    """A dark, blotchy grey image: enough structure for a stable pHash"""
+    rng = np.random.default_rng(seed)
+    blotches = rng.integers(20, 80, (6, 8)).astype(np.uint8)
+    return cv2.cvtColor(cv2.resize(blotches, size, interpolation=cv2.INTER_CUBIC), cv2.COLOR_GRAY2BGR)
+
+
+def jpeg(image):
+    ok, data = cv2.imencode(".jpg", image)
+    assert ok
+    return data.tobytes()
+
+
+def test_identical_image_under_another_url_reuses_the_verdict(thumbnail_server, fake_models, verdict_cache):
+    body = encode_image(SAFE_IMAGE)
+    first = thumbnail_server.add("/vi/abc/hqdefault.jpg", body)
+    second = thumbnail_server.add("/vi/abc/hqdefault.jpg?sqp=1", body)
+
+    assert thumbnail_scan.scan(first) == []
+    assert thumbnail_scan.scan(second) == []
+
+    # Downloaded twice (different URLs), scanned once
+    assert fake_models.batches == [1]
+
+
+def test_near_duplicate_gets_its_own_scan(thumbnail_server, fake_models, verdict_cache):
+    image = textured()
+    clean = jpeg(image)
+    # Deep red of about the same brightness as the corner it covers
+    image[-24:, -24:] = (0, 0, 150)
+    inset = jpeg(image)
+    # pHash only sees brightness, so a perceptual-hash lookup would have matched...
+    distance = hamming_distance(FrameContext.from_bytes(clean).phash, FrameContext.from_bytes(inset).phash)
+    assert distance <= 6
+
+    assert thumbnail_scan.scan(thumbnail_server.add("/clean.jpg", clean)) == []
+    flags = thumbnail_scan.scan(thumbnail_server.add("/inset.jpg", inset))
+
+    # ...but the inset is only found by scanning the image itself
+    assert fake_models.batches == [1, 1]
+    assert flags and flags[0].startswith("blood/gore detected in thumbnail")
+
+
+def test_verdicts_are_kept_per_model_version(verdict_cache):
+    falconsai = verdict_cache.get_cache("classifier=Falconsai/nsfw_image_detection")
+    clip = verdict_cache.get_cache("classifier=openai/clip-vit-base-patch32")
+    digest = verdict_cache.content_digest(b"thumbnail")
+    falconsai.put(digest, ["specialized model detected nsfw (confidence: 0.91)"], "https://i.ytimg.com/a.jpg")
+
+    assert clip.get_by_url("https://i.ytimg.com/a.jpg") is None
+    assert clip.get_by_digest(digest) is None
+    # Opening another version's cache doesn't drop this one's verdicts
+    assert falconsai.get_by_url("https://i.ytimg.com/a.jpg") == ["specialized model detected nsfw (confidence: 0.91)"]
+
+
+def test_model_version_names_the_loaded_classifier(monkeypatch):
+    monkeypatch.setattr(thumbnail_scan, "HAS_TRANSFORMERS", True)
+    monkeypatch.setattr(thumbnail_scan, "content_safety_unavailable", False)
+    monkeypatch.setattr(thumbnail_scan, "content_safety_model_name", None)
+    # Before loading: the first choice
+    assert "classifier=Falconsai/nsfw_image_detection|" in thumbnail_scan.model_version()
+
+    monkeypatch.setattr(thumbnail_scan, "content_safety_model_name", "openai/clip-vit-base-patch32")
+    assert "classifier=openai/clip-vit-base-patch32|" in thumbnail_scan.model_version()
+
+    monkeypatch.setattr(thumbnail_scan, "content_safety_model_name", None)
+    monkeypatch.setattr(thumbnail_scan, "content_safety_unavailable", True)
+    assert "classifier=none|" in thumbnail_scan.model_version()
+
+
+def test_cache_hits_do_not_load_the_models(thumbnail_server, fake_models, verdict_cache, monkeypatch):
+    loads = []
+    warm_models = thumbnail_scan.warm_models
+    monkeypatch.setattr(thumbnail_scan, "warm_models", lambda: loads.append(1) or warm_models())
+    url = thumbnail_server.add("/first.jpg", encode_image(SAFE_IMAGE))
+
+    thumbnail_scan.scan(url)
+    # Same URL again while fresh, then revalidated (304) once stale
+    thumbnail_scan.scan(url)
+    monkeypatch.setattr(verdict_cache, "URL_TTL_SECONDS", -1)
+    thumbnail_scan.scan(url)
+
+    assert loads == [1]
+    assert len(thumbnail_server.hits("/first.jpg")) == 2
+
+
+def test_models_load_while_a_new_thumbnail_downloads(fake_models, verdict_cache, monkeypatch):
+    warmed = threading.Event()
+    warm_models = thumbnail_scan.warm_models
+
+    def warm():
+        model = warm_models()
+        warmed.set()
+        return model
+
+    def fetch(url, validators=None):
+        # Held until the models are loaded: a serial scan would time out here
+        assert warmed.wait(timeout=5)
+        return thumbnail_fetch.Fetched(url, 200, encode_image(SAFE_IMAGE))
+
+    monkeypatch.setattr(thumbnail_scan, "warm_models", warm)
+    monkeypatch.setattr(thumbnail_fetch, "fetch", fetch)
+
+    assert thumbnail_scan.scan("https://i.ytimg.com/vi/abc/hqdefault.jpg") == []
+    assert fake_models.batches == [1]
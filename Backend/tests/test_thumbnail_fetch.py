@@ -0,0 +1,82 @@
+"""Thumbnail downloads (thumbnail_fetch.py) and conditional revalidation of cached verdicts."""
+import pytest
+
+import thumbnail_fetch
+import thumbnail_scan
+from conftest import BLOOD_IMAGE, SAFE_IMAGE, ThumbnailServer, encode_image
+
+
+def test_200_returns_the_body_and_its_validators(thumbnail_server):
+    body = encode_image(SAFE_IMAGE)
+    url = thumbnail_server.add("/vi/abc/hqdefault.jpg", body)
+
+    fetched = thumbnail_fetch.fetch(url)
+
+    assert fetched.ok and fetched.content == body
+    assert fetched.validators == {
+        "etag": thumbnail_server.files["/vi/abc/hqdefault.jpg"][2],
+        "last_modified": ThumbnailServer.LAST_MODIFIED,
+    }
+    # Nothing stored yet, so nothing conditional was sent
+    headers = thumbnail_server.hits("/vi/abc/hqdefault.jpg")[0]
+    assert "If-None-Match" not in headers and "If-Modified-Since" not in headers
+
+
+@pytest.mark.parametrize("validator", ["etag", "last_modified"])
+def test_matching_validator_gets_304_without_a_body(thumbnail_server, validator):
+    url = thumbnail_server.add("/thumb.jpg", encode_image(SAFE_IMAGE))
+    stored = thumbnail_fetch.fetch(url).validators
+
+    fetched = thumbnail_fetch.fetch(url, {validator: stored[validator]})
+
+    assert fetched.not_modified and not fetched.ok
+    assert fetched.content is None
+    sent = thumbnail_server.hits("/thumb.jpg")[-1]
+    header = "If-None-Match" if validator == "etag" else "If-Modified-Since"
+    assert sent[header] == stored[validator]
+
+
+def test_error_statuses_are_not_ok(thumbnail_server, unreachable_url):
+    forbidden = thumbnail_server.add("/forbidden.jpg", b"", status=403)
+    failing = thumbnail_server.add("/failing.jpg", b"", status=500)
+
+    results = [thumbnail_fetch.fetch(url) for url in (forbidden, failing, thumbnail_server.url("/missing.jpg"))]
+
+    assert [(result.status, result.ok, result.content) for result in results] == [
+        (403, False, None), (500, False, None), (404, False, None),
+    ]
+    # Connection refused: status 0, and fetch() doesn't raise
+    refused = thumbnail_fetch.fetch(unreachable_url)
+    assert refused.status == 0 and not refused.ok
+
+
+def test_stale_verdict_is_revalidated_with_its_validators(thumbnail_server, fake_models, verdict_cache, monkeypatch):
+    url = thumbnail_server.add("/vi/abc/hqdefault.jpg", encode_image(BLOOD_IMAGE))
+    flags = thumbnail_scan.scan(url)
+    assert flags and fake_models.batches == [1]
+    etag = thumbnail_server.files["/vi/abc/hqdefault.jpg"][2]
+
+    # Every URL entry is now stale: the next scan asks the server again
+    monkeypatch.setattr(verdict_cache, "URL_TTL_SECONDS", -1)
+    assert thumbnail_scan.scan(url) == flags
+
+    sent = thumbnail_server.hits("/vi/abc/hqdefault.jpg")[-1]
+    assert sent["If-None-Match"] == etag
+    assert sent["If-Modified-Since"] == ThumbnailServer.LAST_MODIFIED
+    # 304: the stored verdict, no second inference
+    assert fake_models.batches == [1]
+
+
+def test_changed_thumbnail_is_scanned_and_its_new_validators_stored(thumbnail_server, fake_models, verdict_cache, monkeypatch):
+    url = thumbnail_server.add("/vi/abc/hqdefault.jpg", encode_image(SAFE_IMAGE))
+    assert thumbnail_scan.scan(url) == []
+    monkeypatch.setattr(verdict_cache, "URL_TTL_SECONDS", -1)
+
+    # Same URL, new image: the old ETag no longer matches, so the server sends it
+    thumbnail_server.add("/vi/abc/hqdefault.jpg", encode_image(BLOOD_IMAGE))
+    flags = thumbnail_scan.scan(url)
+
+    assert flags and flags[0].startswith("blood/gore detected in thumbnail")
+    assert fake_models.batches == [1, 1]
+    cache = verdict_cache.get_cache(thumbnail_scan.model_version())
+    assert cache.get_validators(url)["etag"] == thumbnail_server.files["/vi/abc/hqdefault.jpg"][2]
@@ -0,0 +1,42 @@
+"""Quick audio scan: a failed transcription is not mistaken for an unreadable WAV."""
+import numpy as np
+
+import vad
+import whisper_scan
+from conftest import write_wav
+
+
+class FailingAsr:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio):
+        self.calls += 1
+        raise ValueError("bad decode")
+
+
+class EchoAsr:
+    def transcribe(self, audio):
+        return {"text": " damn", "segments": [{"start": 0.0, "end": 1.0, "text": " damn"}]}
+
+
+def test_transcription_error_is_not_retried_through_ffmpeg(tmp_path, monkeypatch):
+    write_wav(tmp_path / "audio.wav", np.zeros(10 * 16000, np.float32))
+    engine = FailingAsr()
+    extracted = []
+    monkeypatch.setattr(whisper_scan, "get_asr_engine", lambda name: engine)
+    monkeypatch.setattr(whisper_scan, "extract_quick_audio_ffmpeg", lambda path: extracted.append(path) or path)
+    monkeypatch.setattr(vad, "ENABLED", False)
+
+    assert whisper_scan.scan(str(tmp_path)) == []
+    assert engine.calls == 1 and extracted == []
+
+
+def test_unreadable_wav_falls_back_to_ffmpeg(tmp_path, monkeypatch):
+    (tmp_path / "audio.wav").write_bytes(b"not a wav")
+    extracted = []
+    monkeypatch.setattr(whisper_scan, "get_asr_engine", lambda name: EchoAsr())
+    monkeypatch.setattr(whisper_scan, "extract_quick_audio_ffmpeg", lambda path: extracted.append(path) or path)
+
+    assert whisper_scan.scan(str(tmp_path)) == ["inappropriate language: damn"]
+    assert extracted == [str(tmp_path / "audio.wav")]
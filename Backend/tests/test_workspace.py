@@ -0,0 +1,74 @@
+"""Per-job workspaces: two scans never share a file under tmp/."""
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import workspace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every file a scan job reads or writes in its directory
+JOB_FILES = ("audio.wav", "audio_quick.wav", "preview.mp4", "frame_001.jpg", "frame_030.jpg")
+
+
+def job_files(job_dir):
+    return {os.path.normpath(workspace.job_path(job_dir, name)) for name in JOB_FILES}
+
+
+def test_job_paths_do_not_collide():
+    first = job_files(os.path.join("tmp", "dQw4w9WgXcQ"))
+    second = job_files(os.path.join("tmp", "9bZkp7q19f0"))
+    assert len(first) == len(JOB_FILES)
+    assert not first & second
+    # Neither job touches the shared tmp/ files the scanners used before
+    shared = job_files(None)
+    assert not first & shared
+    assert not second & shared
+
+
+def test_job_paths_stay_inside_the_job_dir():
+    job_dir = os.path.join("tmp", "dQw4w9WgXcQ")
+    for path in job_files(job_dir):
+        assert os.path.dirname(path) == os.path.normpath(job_dir)
+
+
+def test_job_video_id():
+    assert workspace.job_video_id(os.path.join("tmp", "dQw4w9WgXcQ")) == "dQw4w9WgXcQ"
+    assert workspace.job_video_id(os.path.join("tmp", "dQw4w9WgXcQ") + os.sep) == "dQw4w9WgXcQ"
+    # The shared directory (CLI use without a job) belongs to no video
+    assert workspace.job_video_id("tmp") is None
+    assert workspace.job_video_id(None) is None
+
+
+def test_job_dir_arg():
+    assert workspace.job_dir_arg(["whisper_scan.py", "tmp/abc"]) == "tmp/abc"
+    assert workspace.job_dir_arg(["thumbnail_scan.py", "https://i.ytimg.com/x.jpg", "tmp/abc"], 2) == "tmp/abc"
+    assert workspace.job_dir_arg(["whisper_scan.py"]) is None
+    assert workspace.job_dir_arg(["whisper_scan.py", ""]) is None
+
+
+def _node_job_paths(*video_ids):
+    script = (
+        "const { jobPaths } = require('./config');"
+        f"console.log(JSON.stringify({json.dumps(video_ids)}.map(jobPaths)));"
+    )
+    proc = subprocess.run(["node", "-e", script], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=30)
+    if proc.returncode != 0 and "Cannot find module" in proc.stderr:
+        pytest.skip("node_modules not installed (npm install)")
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_server_job_paths_do_not_collide():
+    first, second = _node_job_paths("dQw4w9WgXcQ", "9bZkp7q19f0")
+    tmp_dir = os.path.join(BACKEND_DIR, "tmp")
+    assert first["dir"] == os.path.join(tmp_dir, "dQw4w9WgXcQ")
+    assert second["dir"] == os.path.join(tmp_dir, "9bZkp7q19f0")
+    for paths in (first, second):
+        for key in ("audio", "video", "frames"):
+            assert os.path.dirname(paths[key]) == paths["dir"]
+    assert not set(first.values()) & set(second.values())
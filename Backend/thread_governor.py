@@ -0,0 +1,223 @@
+"""CPU thread governor for scanners that run at the same time.
+
+Phase 2 and Phase 3 (and quick scans overlapping image scans) each run torch
+and OpenCV, and left alone every process sizes its thread pools to the whole
+machine - on a 4-core box two parallel scans then run 8+ busy threads and
+finish later than they would one after the other.
+
+Every scan job registers a lease file while it runs (one per job, in
+SCAN_GOVERNOR_DIR, shared by standalone scripts and worker processes). A
+standalone scanner process runs one job, so its job gets an equal share of
+the cores for the jobs active when it starts, applied to
+torch.set_num_threads and cv2.setNumThreads, and long jobs call rebalance()
+between windows/batches to follow jobs starting or finishing.
+
+Thread pools belong to the process, not the job, so the scan worker (whose
+processes serve audio and vision jobs side by side on threads) sizes them
+once per process with budget_process() - its cores split over
+SCAN_WORKER_PROCESSES - and its leases never resize them.
+
+OMP/MKL/OPENBLAS_NUM_THREADS are only read when torch / numpy are imported,
+so they are only set while the library that reads them isn't loaded yet.
+
+Tuning:
+    SCAN_CPU_CORES        cores to share (default: cores this process may use)
+    SCAN_THREADS_PER_JOB  fixed threads per job instead of an equal share
+    SCAN_THREAD_GOVERNOR  0 disables the governor (library defaults)
+
+python thread_governor.py prints the current allocation as JSON.
+"""
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ENABLED = os.environ.get("SCAN_THREAD_GOVERNOR", "1") != "0"
+GOVERNOR_DIR = os.environ.get("SCAN_GOVERNOR_DIR", os.path.join(tempfile.gettempdir(), "scan_governor"))
+FIXED_THREADS = int(os.environ.get("SCAN_THREADS_PER_JOB", "0"))
+
+
+def cpu_cores():
+    """Cores shared by all scan jobs"""
+    if os.environ.get("SCAN_CPU_CORES"):
+        return max(1, int(os.environ["SCAN_CPU_CORES"]))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def active_jobs():
+    """Leases of the scan jobs currently running (stale leases are removed)"""
+    jobs = []
+    try:
+        names = os.listdir(GOVERNOR_DIR)
+    except OSError:
+        return jobs
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(GOVERNOR_DIR, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lease = json.load(f)
+        except (OSError, ValueError):
+            # Being written or removed right now
+            continue
+        if not _pid_alive(lease.get("pid", -1)):
+            # A scan that was killed never released its lease
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            continue
+        jobs.append(lease)
+    return jobs
+
+
+def threads_per_job(active_count):
+    if FIXED_THREADS > 0:
+        return FIXED_THREADS
+    return max(1, cpu_cores() // max(1, active_count))
+
+
+# Environment variables sizing a library's pools when it is first imported
+_IMPORT_TIME_VARS = {
+    "torch": ("OMP_NUM_THREADS", "MKL_NUM_THREADS"),
+    "numpy": ("OPENBLAS_NUM_THREADS",),
+}
+
+# Threads of a process sized once by budget_process(), else None
+_process_threads = None
+
+
+def apply_threads(threads):
+    """Size the thread pools of this process"""
+    for module, variables in _IMPORT_TIME_VARS.items():
+        if module not in sys.modules:
+            for var in variables:
+                os.environ[var] = str(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+    cv2 = sys.modules.get("cv2")
+    if cv2 is not None:
+        cv2.setNumThreads(threads)
+
+
+def budget_process(processes=1):
+    """Size this process's pools once, for its share of the cores over `processes` processes.
+
+    For processes that run several scan jobs at once (the scan worker); call
+    it before the models are imported. Leases taken afterwards leave the
+    pools alone.
+    """
+    global _process_threads
+    if not ENABLED:
+        return
+    _process_threads = FIXED_THREADS if FIXED_THREADS > 0 else max(1, cpu_cores() // max(1, processes))
+    apply_threads(_process_threads)
+    print(f"🧵 Scan process: {_process_threads} threads ({processes} processes, {cpu_cores()} cores)", file=sys.stderr)
+
+
+class Lease:
+    """One running scan job's share of the cores"""
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.threads = 0
+        self.path = os.path.join(GOVERNOR_DIR, f"{os.getpid()}-{threading.get_ident()}-{scanner}.json")
+
+    def _write(self):
+        # Write to a temp file and rename so readers never see a partial lease
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "scanner": self.scanner, "threads": self.threads, "started": self.started}, f)
+        os.replace(tmp_path, self.path)
+
+    def acquire(self):
+        self.started = time.time()
+        os.makedirs(GOVERNOR_DIR, exist_ok=True)
+        self._write()
+        self.rebalance(log=True)
+
+    def rebalance(self, log=False):
+        """Re-apply this job's share if the number of active jobs changed"""
+        if _process_threads is not None:
+            # Sized once for the whole process (budget_process); just record it
+            if self.threads != _process_threads:
+                self.threads = _process_threads
+                self._write()
+            return
+        active = len(active_jobs())
+        threads = threads_per_job(active)
+        if threads != self.threads:
+            self.threads = threads
+            apply_threads(threads)
+            self._write()
+            if log or active > 1:
+                print(f"🧵 {self.scanner}: {threads} threads ({active} active scan jobs, {cpu_cores()} cores)", file=sys.stderr)
+
+    def release(self):
+        with contextlib.suppress(OSError):
+            os.remove(self.path)
+
+
+_current = threading.local()
+
+
+@contextlib.contextmanager
+def governed(scanner):
+    """Hold a core share for the duration of a scan (context manager or decorator)"""
+    if not ENABLED or getattr(_current, "lease", None) is not None:
+        # Disabled, or nested inside another governed scan of this thread
+        yield
+        return
+    lease = Lease(scanner)
+    try:
+        lease.acquire()
+    except OSError as e:
+        print(f"⚠️ Thread governor unavailable ({e}), using library defaults", file=sys.stderr)
+        yield
+        return
+    _current.lease = lease
+    try:
+        yield
+    finally:
+        _current.lease = None
+        lease.release()
+
+
+def rebalance():
+    """Called by long scans between windows/batches; a no-op outside governed()"""
+    lease = getattr(_current, "lease", None)
+    if lease is not None:
+        with contextlib.suppress(OSError):
+            lease.rebalance()
+
+
+def usage():
+    """Current allocation, for tuning"""
+    jobs = active_jobs()
+    return {
+        "enabled": ENABLED,
+        "cores": cpu_cores(),
+        "next_job_threads": threads_per_job(len(jobs) + 1),
+        "active_jobs": sorted(jobs, key=lambda job: job.get("started", 0)),
+        "threads_assigned": sum(job.get("threads", 0) for job in jobs),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(usage(), indent=2))
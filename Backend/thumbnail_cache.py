@@ -0,0 +1,188 @@
+"""Persistent thumbnail verdict cache, keyed by URL and by image content.
+
+The same thumbnails appear again and again across home, search and sidebar
+views. Verdicts are stored in a small SQLite database under cache/ and looked
+up two ways:
+
+* by URL - no download at all while the URL entry is fresh (URL_TTL_SECONDS),
+  and after that a conditional request with the stored ETag / Last-Modified
+  (a 304 keeps the verdict without downloading the image again);
+* by SHA-256 of the downloaded bytes - the identical file under another URL
+  reuses the verdict instead of running YOLO and the content safety model.
+
+Only identical images share a verdict. Perceptual hashes are deliberately
+not used: a near-duplicate can differ in exactly the detail that matters (a
+small inset of gore on an otherwise unchanged thumbnail keeps the low
+frequencies a pHash is built from), so it always gets its own scan.
+
+Each verdict carries the model version it was produced with (which
+classifier actually loaded, see thumbnail_scan.model_version), and lookups
+only return verdicts from the caller's version; other versions' entries are
+left to age out. The cache is bounded to MAX_ENTRIES verdicts, least recently
+used first out.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("THUMBNAIL_CACHE_DIR", os.path.join(BASE_DIR, "cache", "thumbnails"))
+CACHE_PATH = os.path.join(CACHE_DIR, "verdicts.sqlite3")
+
+# THUMBNAIL_CACHE=0 disables the cache (every thumbnail is scanned)
+ENABLED = os.environ.get("THUMBNAIL_CACHE", "1") != "0"
+
+# Least recently used verdicts beyond this are evicted
+MAX_ENTRIES = int(os.environ.get("THUMBNAIL_CACHE_MAX_ENTRIES", "5000"))
+
+# A URL can be re-pointed at a new thumbnail; after this long it is requested
+# again (conditionally - a 304 or identical bytes keep the verdict)
+URL_TTL_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    digest TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    flags TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (digest, model_version)
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts (last_used);
+"""
+
+# Verdicts of the URL's current image made by this cache's model version
+_URL_VERDICT = (
+    "SELECT v.digest, v.flags FROM urls u JOIN verdicts v ON v.digest = u.digest "
+    "WHERE u.url = ? AND v.model_version = ?"
+)
+
+
+def content_digest(data):
+    """Cache key of a downloaded image: SHA-256 of its bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class VerdictCache:
+    """Thumbnail verdicts for one model version (other versions share the file)"""
+
+    def __init__(self, model_version, path=CACHE_PATH):
+        self.model_version = model_version
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Worker pool processes share the file; SQLite serialises the writers
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _touch(self, digest):
+        self._conn.execute(
+            "UPDATE verdicts SET last_used = ? WHERE digest = ? AND model_version = ?",
+            (time.time(), digest, self.model_version),
+        )
+
+    def get_by_url(self, url):
+        """Cached flags for a URL seen within URL_TTL_SECONDS, else None"""
+        row = self._conn.execute(
+            _URL_VERDICT + " AND u.fetched_at >= ?",
+            (url, self.model_version, time.time() - URL_TTL_SECONDS),
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._touch(row[0])
+        return json.loads(row[1])
+
+    def get_validators(self, url):
+        """Stored ETag / Last-Modified of a URL with a verdict (at any age), else None"""
+        row = self._conn.execute(
+            "SELECT u.etag, u.last_modified FROM urls u JOIN verdicts v ON v.digest = u.digest "
+            "WHERE u.url = ? AND v.model_version = ?",
+            (url, self.model_version),
+        ).fetchone()
+        if row is None or not any(row):
+            return None
+        return {"etag": row[0], "last_modified": row[1]}
+
+    def revalidated(self, url):
+        """Flags for a URL the server answered 304 Not Modified for (its entry is fresh again)"""
+        row = self._conn.execute(_URL_VERDICT, (url, self.model_version)).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._touch(row[0])
+            self._conn.execute("UPDATE urls SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        return json.loads(row[1])
+
+    def _record_url(self, url, digest, validators):
+        validators = validators or {}
+        self._conn.execute(
+            "INSERT OR REPLACE INTO urls (url, digest, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+            (url, digest, time.time(), validators.get("etag"), validators.get("last_modified")),
+        )
+
+    def get_by_digest(self, digest, url=None, validators=None):
+        """Cached flags for an identical image (same content_digest), else None.
+
+        On a hit the URL (if given) is recorded, with the response's validators,
+        so the next lookup needs no download.
+        """
+        row = self._conn.execute(
+            "SELECT flags FROM verdicts WHERE digest = ? AND model_version = ?", (digest, self.model_version)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._touch(digest)
+            if url:
+                self._record_url(url, digest, validators)
+        return json.loads(row[0])
+
+    def put(self, digest, flags, url=None, validators=None):
+        """Store the verdict for an image (and the URL it came from, with its validators)"""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (digest, model_version, flags, last_used) VALUES (?, ?, ?, ?)",
+                (digest, self.model_version, json.dumps(flags), time.time()),
+            )
+            if url:
+                self._record_url(url, digest, validators)
+        self._evict()
+
+    def _evict(self):
+        """Keep at most MAX_ENTRIES verdicts, dropping the least recently used"""
+        with self._conn:
+            count = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            if count <= MAX_ENTRIES:
+                return
+            # Another model version's verdicts stop being used, so they age out first
+            self._conn.execute(
+                "DELETE FROM verdicts WHERE rowid IN "
+                "(SELECT rowid FROM verdicts ORDER BY last_used ASC LIMIT ?)",
+                (count - MAX_ENTRIES,),
+            )
+            self._conn.execute("DELETE FROM urls WHERE digest NOT IN (SELECT digest FROM verdicts)")
+
+
+_caches = {}
+
+
+def get_cache(model_version):
+    """Process-wide cache for model_version, or None if caching is disabled or unavailable"""
+    if not ENABLED:
+        return None
+    if model_version not in _caches:
+        try:
+            _caches[model_version] = VerdictCache(model_version, CACHE_PATH)
+        except sqlite3.Error as e:
+            print(f"⚠️ Thumbnail cache unavailable ({e}), scanning without it", file=sys.stderr)
+            _caches[model_version] = None
+    return _caches[model_version]
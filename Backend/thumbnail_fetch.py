@@ -0,0 +1,140 @@
+"""Thumbnail downloads for thumbnail_scan.py: pooled, conditional and in memory.
+
+* One keep-alive requests session per process (connection pool sized for
+  THUMBNAIL_FETCH_WORKERS), so the scan worker reuses connections to the
+  thumbnail host across jobs instead of opening one per thumbnail.
+* Downloads run on a small thread pool: fetch_async() returns a future and
+  fetch_many() (scan_batch) fetches a whole batch concurrently. scan()
+  starts its download first and, for a URL with no stored validators, loads
+  the models while it runs; a revalidation (likely a 304) waits for the
+  response before loading anything.
+* Conditional requests: validators (ETag / Last-Modified) stored with a
+  thumbnail's verdict (see thumbnail_cache.py) are sent as If-None-Match /
+  If-Modified-Since, and a 304 reuses the verdict with no body transferred.
+* Bodies stay in memory and are decoded straight from the response buffer
+  (FrameContext.from_bytes) - no temp file, no re-reading from disk.
+
+Without requests installed, urllib is used (same behaviour, no pooling).
+"""
+import http.client
+import importlib.util
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads (and pooled connections) for concurrent downloads
+FETCH_WORKERS = int(os.environ.get("THUMBNAIL_FETCH_WORKERS", "8"))
+TIMEOUT_SECONDS = 10
+
+# What a failed download raises: connection errors and timeouts (requests'
+# exceptions and urllib's URLError are OSErrors), malformed URLs, bad responses
+FETCH_ERRORS = (OSError, ValueError, http.client.HTTPException)
+
+# requests for downloads, urllib (stdlib) as the fallback. Only located here -
+# requests is imported with the first download (fast start).
+HAS_REQUESTS = importlib.util.find_spec("requests") is not None
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+class Fetched:
+    """Outcome of one download: status 200 (content set), 304, another HTTP status, or 0 on error"""
+
+    def __init__(self, url, status=0, content=None, etag=None, last_modified=None):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def ok(self):
+        return self.status == 200 and bool(self.content)
+
+    @property
+    def not_modified(self):
+        return self.status == 304
+
+    @property
+    def validators(self):
+        """What to store with the verdict for the next conditional request"""
+        return {"etag": self.etag, "last_modified": self.last_modified}
+
+
+def get_session():
+    """The process-wide keep-alive session, or None without requests"""
+    global _session
+    if not HAS_REQUESTS:
+        return None
+    with _lock:
+        if _session is None:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def _executor_pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="thumbnail-fetch")
+    return _executor
+
+
+def _conditional_headers(validators):
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def fetch(url, validators=None):
+    """Download url (conditionally, given stored validators); never raises"""
+    headers = _conditional_headers(validators)
+    try:
+        session = get_session()
+        if session is not None:
+            response = session.get(url, headers=headers, timeout=TIMEOUT_SECONDS)
+            status, content, response_headers = response.status_code, response.content, response.headers
+        else:
+            request = urllib.request.Request(url, headers=headers)
+            try:
+                with urllib.request.urlopen(request, timeout=TIMEOUT_SECONDS) as response:
+                    status, content, response_headers = response.status, response.read(), response.headers
+            except urllib.error.HTTPError as e:
+                # urllib reports 304 (and every other non-2xx status) as an error
+                status, content, response_headers = e.code, None, e.headers
+    except FETCH_ERRORS as e:
+        print(f"⚠️ Thumbnail download failed for {url}: {str(e)[:200]}", file=sys.stderr)
+        return Fetched(url)
+    return Fetched(
+        url,
+        status,
+        content if status == 200 else None,
+        response_headers.get("ETag"),
+        response_headers.get("Last-Modified"),
+    )
+
+
+def fetch_async(url, validators=None):
+    """Start fetch() on the download pool; returns a Future of Fetched"""
+    return _executor_pool().submit(fetch, url, validators)
+
+
+def fetch_many(urls, validators=None):
+    """Fetch urls concurrently; url -> Fetched. validators: url -> stored validators"""
+    validators = validators or {}
+    futures = {url: fetch_async(url, validators.get(url)) for url in urls}
+    return {url: future.result() for url, future in futures.items()}
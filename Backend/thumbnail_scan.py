@@ -1,63 +1,115 @@
-from ultralytics import YOLO
 import json
 import sys
+
+from scan_worker import forward_to_worker
+
+# Thin-client fast path: hand the job to the long-lived worker if it is running
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--batch"]:
+        forward_to_worker("thumbnail_batch", [sys.argv[2:]])
+    else:
+        forward_to_worker("thumbnail", sys.argv[1:])
+
+# Imported first so the "import" timing span covers everything below
+from timing import timed_run, span, timed_import
+
+import importlib.util
 import os
-import cv2
-import numpy as np
 import signal
 
-# Handle graceful shutdown
-def signal_handler(sig, frame):
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
+with timed_import("cv2+numpy"):
+    import cv2
+    import numpy as np
 
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+with timed_import("scanner modules"):
+    from scan_models import get_yolo_model
+    from frame_context import FrameContext
+    from workspace import job_dir_arg
+    from thread_governor import governed
+    import thumbnail_cache
+    import clip_text_cache
+    import onnx_backend
+    import model_store
 
-# Try to import specialized content safety models
-try:
-    from transformers import pipeline, AutoImageProcessor, AutoModelForImageClassification
-    import torch
-    HAS_TRANSFORMERS = True
-except ImportError:
-    HAS_TRANSFORMERS = False
-
-try:
-    import tensorflow as tf
-    import tensorflow_hub as hub
-    HAS_TF_HUB = True
-except ImportError:
-    HAS_TF_HUB = False
-
-# Try to import requests, fallback to urllib if not available
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
-    try:
-        import urllib.request
-        HAS_URLLIB = True
-    except ImportError:
-        HAS_URLLIB = False
+with timed_import("thumbnail_fetch"):
+    import thumbnail_fetch
+
+# FAST START: torch/transformers (here) and requests (in thumbnail_fetch) are
+# only located, not imported - find_spec() doesn't execute the package. They
+# are imported the first time a model is loaded or a thumbnail fetched, so a
+# cache hit (or a call without a URL) never pays for them. YOLO is likewise
+# built on first use (scan_models.get_yolo_model).
+def _installed(name):
+    return importlib.util.find_spec(name) is not None
+
+# Specialized content safety models (transformers + torch)
+HAS_TRANSFORMERS = _installed("transformers") and _installed("torch")
 
 # Suppress YOLO verbose output
 import warnings
 warnings.filterwarnings("ignore")
-os.environ["YOLO_VERBOSE"] = "False"
 
-# Initialize YOLO model for object detection
-yolo_model = YOLO("yolov8n.pt", verbose=False)
+# Batch mode: images per YOLO/classifier forward pass (downloads: see thumbnail_fetch.py)
+BATCH_SIZE = int(os.environ.get("THUMBNAIL_BATCH_SIZE", "8"))
+
+# Bump DETECTOR_VERSION whenever detectors or thresholds change (see model_version)
+DETECTOR_VERSION = 1
 
 # Initialize specialized content safety models (lazy loading)
 content_safety_model = None
 content_safety_processor = None
 content_safety_model_type = None  # Track which model is loaded
+content_safety_model_name = None
+# Set once every content safety model failed to load (YOLO-only verdicts)
+content_safety_unavailable = False
+
+# Content safety models, in order of preference
+CONTENT_SAFETY_MODELS = [
+    {
+        "name": "Falconsai/nsfw_image_detection",
+        "type": "nsfw",
+        "description": "NSFW and content safety detection",
+        "use_classification": True
+    },
+    {
+        "name": "openai/clip-vit-base-patch32",
+        "type": "clip",
+        "description": "CLIP for semantic image understanding",
+        "use_classification": False
+    }
+]
+
+def model_version():
+    """Tag stored with every cached verdict: the models that actually produce verdicts.
+
+    Falconsai and the CLIP fallback flag different things, so the tag names
+    the classifier that loaded. Before any load it names the one that will be
+    tried first - scan() looks the cache up again once the models are loaded,
+    so a process that fell back to CLIP only ever reuses CLIP verdicts.
+    """
+    if content_safety_model_name is not None:
+        classifier = content_safety_model_name
+    elif content_safety_unavailable or not HAS_TRANSFORMERS:
+        classifier = "none"
+    else:
+        classifier = CONTENT_SAFETY_MODELS[0]["name"]
+    return (
+        f"yolov8n.pt|classifier={classifier}|detectors={DETECTOR_VERSION}"
+        f"|backend={onnx_backend.backend_tag()}"
+    )
+
+# Zero-shot prompts for the CLIP fallback (their embeddings are cached, see clip_text_cache.py)
+CLIP_PROMPTS = (
+    "violence", "gore", "blood", "horror scene", "scary image", "weapon",
+    "inappropriate content", "disturbing imagery", "adult content",
+    "monster", "zombie", "demon", "horror movie", "bloody scene",
+    "violent scene", "horror character", "scary monster"
+)
 
 def load_content_safety_model():
     """Load specialized content safety model for violence/horror/gore detection with fallbacks"""
-    global content_safety_model, content_safety_processor, content_safety_model_type
+    global content_safety_model, content_safety_processor, content_safety_model_type, content_safety_model_name
+    global content_safety_unavailable
     
     if content_safety_model is not None:
         return True
@@ -65,38 +117,36 @@ def load_content_safety_model():
     if not HAS_TRANSFORMERS:
         print("⚠️ Transformers library not available, skipping specialized models", file=sys.stderr)
         return False
+
+    try:
+        # Deferred from module import (fast start)
+        from transformers import AutoImageProcessor, AutoModelForImageClassification
+    except ImportError as e:
+        print(f"⚠️ Transformers could not be imported ({e}), skipping specialized models", file=sys.stderr)
+        content_safety_unavailable = True
+        return False
     
     # Try multiple models in order of preference
-    model_options = [
-        {
-            "name": "Falconsai/nsfw_image_detection",
-            "type": "nsfw",
-            "description": "NSFW and content safety detection",
-            "use_classification": True
-        },
-        {
-            "name": "openai/clip-vit-base-patch32",
-            "type": "clip",
-            "description": "CLIP for semantic image understanding",
-            "use_classification": False
-        }
-    ]
-    
-    for model_option in model_options:
+    for model_option in CONTENT_SAFETY_MODELS:
         try:
             model_name = model_option["name"]
             print(f"🔄 Attempting to load {model_name}...", file=sys.stderr)
             
             if model_option["use_classification"]:
                 # Standard image classification model
-                processor = AutoImageProcessor.from_pretrained(model_name)
-                model = AutoModelForImageClassification.from_pretrained(model_name)
+                # Local model store copy (safetensors, memory-mapped) when present
+                source, options = model_store.pretrained_source(model_name)
+                processor = AutoImageProcessor.from_pretrained(source, **options)
+                model = AutoModelForImageClassification.from_pretrained(source, **options)
+                # OPTIMIZATION: run on ONNX Runtime (optionally int8) when VISION_BACKEND=onnx
+                model = onnx_backend.load_image_classifier(model, model_name)
             else:
                 # CLIP model - use different approach
                 try:
                     from transformers import CLIPProcessor, CLIPModel
-                    processor = CLIPProcessor.from_pretrained(model_name)
-                    model = CLIPModel.from_pretrained(model_name)
+                    source, options = model_store.pretrained_source(model_name)
+                    processor = CLIPProcessor.from_pretrained(source, **options)
+                    model = CLIPModel.from_pretrained(source, **options)
                 except ImportError:
                     print(f"⚠️ CLIP models require CLIPProcessor, skipping {model_name}", file=sys.stderr)
                     continue
@@ -104,6 +154,7 @@ def load_content_safety_model():
             content_safety_processor = processor
             content_safety_model = model
             content_safety_model_type = model_option["type"]
+            content_safety_model_name = model_name
             
             print(f"✅ Loaded specialized content safety model: {model_name} ({model_option['description']})", file=sys.stderr)
             return True
@@ -113,10 +164,9 @@ def load_content_safety_model():
             continue
     
     print("⚠️ All specialized content safety models failed to load, using YOLO only", file=sys.stderr)
+    content_safety_unavailable = True
     return False
 
-flags = []
-
 # Dangerous objects to detect (expanded list for AI detection)
 dangerous_objects = [
     "knife", "gun", "pistol", "rifle", "weapon", "firearm",
@@ -131,17 +181,21 @@ scary_objects = [
 
 # Removed simple color-based heuristics - relying on AI (YOLO) instead
 
-def detect_scary_face(img_path):
+_face_cascade = None
+
+def get_face_cascade():
+    """Load OpenCV's Haar Cascade face detector once per process"""
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _face_cascade
+
+def detect_scary_face(ctx):
     """Use AI/ML to detect if faces look scary, distorted, or monster-like"""
     try:
-        img = cv2.imread(img_path)
-        if img is None:
-            return False
-        
         # Use OpenCV's face detector (Haar Cascade) to find faces
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        gray = ctx.gray
+        faces = get_face_cascade().detectMultiScale(gray, 1.1, 4)
         
         if len(faces) == 0:
             return False
@@ -170,8 +224,8 @@ def detect_scary_face(img_path):
             # 4. Check for unusual texture patterns (deformed features)
             # Calculate local variance (texture complexity)
             if face_roi.size > 0:
-                # Use Laplacian to detect edges/texture
-                laplacian = cv2.Laplacian(face_roi, cv2.CV_64F)
+                # Use Laplacian to detect edges/texture (shared full-frame Laplacian)
+                laplacian = ctx.laplacian[y:y+h, x:x+w]
                 texture_variance = np.var(laplacian)
                 # High texture variance can indicate deformed/distorted features
                 if texture_variance > 500:  # Unusually high texture complexity
@@ -195,35 +249,21 @@ def detect_scary_face(img_path):
     except Exception as e:
         return False
 
-def detect_deformed_monster(img_path):
+def detect_deformed_monster(ctx):
     """Detect deformed/monster-like humanoid shapes using YOLO + image analysis"""
     try:
-        img = cv2.imread(img_path)
-        if img is None:
-            return False
-        
-        # Use YOLO to detect person
-        results = yolo_model(img_path, verbose=False, conf=0.5)
-        
-        person_detected = False
-        person_boxes = []
-        
-        for r in results:
-            for i, cls in enumerate(r.boxes.cls):
-                name = yolo_model.names[int(cls)].lower()
-                if name == "person":
-                    confidence = float(r.boxes.conf[i])
-                    if confidence >= 0.6:
-                        person_detected = True
-                        # Get bounding box
-                        box = r.boxes.xyxy[i].cpu().numpy()
-                        person_boxes.append((box, confidence))
-        
-        if not person_detected:
+        # Reuse the YOLO detections already on the context (no second inference)
+        person_boxes = [
+            (box, confidence)
+            for name, confidence, box in ctx.detections
+            if name == "person" and confidence >= 0.6
+        ]
+        
+        if not person_boxes:
             return False
         
         # Analyze detected person(s) for monster-like features
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = ctx.gray
         monster_score = 0
         
         for box, confidence in person_boxes:
@@ -231,8 +271,8 @@ def detect_deformed_monster(img_path):
             # Ensure coordinates are within image bounds
             x1 = max(0, x1)
             y1 = max(0, y1)
-            x2 = min(img.shape[1], x2)
-            y2 = min(img.shape[0], y2)
+            x2 = min(ctx.width, x2)
+            y2 = min(ctx.height, y2)
             
             if x2 <= x1 or y2 <= y1:
                 continue
@@ -264,7 +304,7 @@ def detect_deformed_monster(img_path):
                 monster_score += 1
             
             # 4. Check for unusual texture (deformed skin/features)
-            laplacian = cv2.Laplacian(person_roi, cv2.CV_64F)
+            laplacian = ctx.laplacian[y1:y2, x1:x2]
             texture_variance = np.var(laplacian)
             if texture_variance > 600:  # Unusually complex texture
                 monster_score += 1
@@ -275,50 +315,33 @@ def detect_deformed_monster(img_path):
     except Exception as e:
         return False
 
-def detect_scary_animals(img_path, detected_objects):
+def detect_scary_animals(ctx):
     """Check if detected animals are in scary/aggressive contexts"""
     scary_animals = ["bear", "wolf", "dog", "snake", "spider"]
     
-    for obj_name, confidence in detected_objects:
+    for obj_name, confidence, _ in ctx.detections:
         if obj_name in scary_animals and confidence >= 0.6:
             # Check if image is dark (scary context)
             try:
-                img = cv2.imread(img_path)
-                if img is not None:
-                    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                    avg_brightness = np.mean(gray)
-                    # If dark scene + scary animal, flag it
-                    if avg_brightness < 40:
-                        return True
+                # If dark scene + scary animal, flag it
+                if ctx.brightness < 40:
+                    return True
             except:
                 pass
     
     return False
 
-def detect_blood_gore_advanced(img_path):
+def detect_blood_gore_advanced(ctx):
     """Advanced blood/gore detection using multiple techniques"""
     try:
-        img = cv2.imread(img_path)
-        if img is None:
-            return False, 0
-        
-        # Convert to HSV for better color detection
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        
-        # More sophisticated red detection for blood
-        # Blood typically has specific hue ranges and saturation
-        lower_red1 = np.array([0, 120, 70])   # Deep red, high saturation
-        upper_red1 = np.array([10, 255, 200])
-        lower_red2 = np.array([170, 120, 70])
-        upper_red2 = np.array([180, 255, 200])
-        
-        mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-        mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-        red_mask = mask1 + mask2
+        # More sophisticated red detection for blood (HSV from the shared context)
+        # Blood typically has specific hue ranges and saturation:
+        # deep red, high saturation, not too bright
+        red_mask = ctx.red_mask(120, 70, 200)
         
         # Count red pixels
         red_pixel_count = cv2.countNonZero(red_mask)
-        total_pixels = img.shape[0] * img.shape[1]
+        total_pixels = ctx.height * ctx.width
         red_percentage = (red_pixel_count / total_pixels) * 100
         
         # Check for blood-like patterns (clusters, not just scattered red)
@@ -342,20 +365,16 @@ def detect_blood_gore_advanced(img_path):
     except Exception as e:
         return False, 0
 
-def detect_horror_scene(img_path):
+def detect_horror_scene(ctx):
     """Detect horror scenes using multiple indicators"""
     try:
-        img = cv2.imread(img_path)
-        if img is None:
-            return False
-        
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = ctx.gray
         
         # Multiple horror indicators
         horror_score = 0
         
         # 1. Very dark overall (horror movies are often dark)
-        avg_brightness = np.mean(gray)
+        avg_brightness = ctx.brightness
         if avg_brightness < 25:
             horror_score += 2
         
@@ -371,9 +390,7 @@ def detect_horror_scene(img_path):
             horror_score += 2
         
         # 4. Check for red tint (blood/horror atmosphere)
-        hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-        red_mask = cv2.inRange(hsv, np.array([0, 50, 50]), np.array([10, 255, 255])) + \
-                   cv2.inRange(hsv, np.array([170, 50, 50]), np.array([180, 255, 255]))
+        red_mask = ctx.red_mask(50, 50)
         red_percentage = np.sum(red_mask > 0) / red_mask.size * 100
         if red_percentage > 2.5 and avg_brightness < 50:  # Red tint in dark scene
             horror_score += 1
@@ -383,34 +400,115 @@ def detect_horror_scene(img_path):
     except Exception as e:
         return False
 
-def detect_content_safety_specialized(img_path):
-    """Use specialized content safety model to detect violence, gore, horror"""
-    if not load_content_safety_model():
+def _top_label_flags(predictions, dangerous_keywords, threshold):
+    """Flags for the top-5 labels of one image's softmax scores"""
+    import torch
+    flags = []
+    # Clamp k: binary classifiers (e.g. normal/nsfw) have fewer than 5 labels
+    top_predictions = torch.topk(predictions, k=min(5, predictions.shape[-1]))
+    for idx, score in zip(top_predictions.indices, top_predictions.values):
+        label = content_safety_model.config.id2label[idx.item()]
+        confidence = score.item()
+
+        if any(keyword in label.lower() for keyword in dangerous_keywords):
+            if confidence > threshold:
+                flags.append(f"specialized model detected {label} (confidence: {confidence:.2f})")
+    return flags
+
+def _clip_pipeline_flags(image):
+    """CLIP fallback through the zero-shot pipeline (one image at a time)"""
+    from transformers import pipeline
+    classifier = pipeline("zero-shot-image-classification", 
+                        model=content_safety_model,
+                        device=-1)
+    
+    candidate_labels = [
+        "violence", "gore", "blood", "horror", "scary", "weapon",
+        "inappropriate content", "disturbing imagery", "adult content",
+        "monster", "zombie", "demon", "horror movie scene"
+    ]
+    
+    result = classifier(image, candidate_labels=candidate_labels)
+    
+    flags = []
+    for item in result[:3]:
+        label = item["label"].lower()
+        score = item["score"]
+        dangerous_keywords = [
+            "violence", "gore", "blood", "horror", "scary", "weapon",
+            "inappropriate", "disturbing", "adult", "monster", "zombie", "demon"
+        ]
+        if any(keyword in label for keyword in dangerous_keywords):
+            if score > 0.25:
+                flags.append(f"specialized model detected {item['label']} (confidence: {score:.2f})")
+    return flags
+
+def detect_content_safety_specialized_batch(ctxs):
+    """Run the content safety model once over several images; one flag list per image"""
+    if not ctxs:
         return []
+    with span("model_load"):
+        loaded = load_content_safety_model()
+    if not loaded:
+        return [[] for _ in ctxs]
+    # Already imported by the model load above
+    import torch
     
     try:
         try:
-            from PIL import Image
+            # RGB images from the already decoded frames (no second decode)
+            images = [ctx.pil_image for ctx in ctxs]
         except ImportError:
             print("⚠️ PIL not available, skipping specialized model", file=sys.stderr)
-            return []
-        
-        # Load and preprocess image
-        image = Image.open(img_path).convert("RGB")
+            return [[] for _ in ctxs]
         
-        # Run inference
-        inputs = content_safety_processor(image, return_tensors="pt")
+        # Different handling based on model type
+        if content_safety_model_type == "clip":
+            # CLIP-based model - use text prompts for semantic understanding
+            try:
+                # OPTIMIZATION: prompt embeddings are computed once and cached,
+                # so only the image tower runs per scan
+                text_embeds = torch.from_numpy(clip_text_cache.get_text_embeddings(
+                    content_safety_model, content_safety_processor, content_safety_model_name, CLIP_PROMPTS
+                ))
+                inputs = content_safety_processor(images=images, return_tensors="pt")
+                
+                with torch.no_grad():
+                    image_embeds = content_safety_model.get_image_features(**inputs)
+                    image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+                    # Same as CLIPModel's logits_per_image: scaled cosine similarity (one row per image)
+                    logits = content_safety_model.logit_scale.exp() * image_embeds @ text_embeds.T
+                    probs = logits.softmax(dim=1)
+                
+                batch_flags = []
+                for row in probs:
+                    safety_flags = []
+                    # Check each dangerous prompt
+                    for i, prompt in enumerate(CLIP_PROMPTS):
+                        score = row[i].item()
+                        if score > 0.15:  # 15% threshold for CLIP (lower because it's semantic matching)
+                            safety_flags.append(f"CLIP detected '{prompt}' (confidence: {score:.2f})")
+                    batch_flags.append(safety_flags)
+                return batch_flags
+                
+            except Exception as clip_err:
+                # Fallback: try pipeline approach
+                batch_flags = []
+                for image in images:
+                    try:
+                        batch_flags.append(_clip_pipeline_flags(image))
+                    except Exception as pipeline_err:
+                        print(f"⚠️ CLIP detection failed: {clip_err}, pipeline also failed: {pipeline_err}", file=sys.stderr)
+                        batch_flags.append([])
+                return batch_flags
+        
+        # Run inference on the whole batch
+        inputs = content_safety_processor(images, return_tensors="pt")
         
         with torch.no_grad():
             outputs = content_safety_model(**inputs)
             predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
         
-        # Get top predictions (check more for better detection)
-        top_predictions = torch.topk(predictions[0], k=5)
-        
-        safety_flags = []
-        
-        # Different handling based on model type
         if content_safety_model_type == "nsfw":
             # NSFW model - check for inappropriate content
             dangerous_keywords = [
@@ -418,206 +516,296 @@ def detect_content_safety_specialized(img_path):
                 "explicit", "inappropriate", "adult", "mature", "disturbing",
                 "porn", "sexual", "nude", "naked"
             ]
-            
-            for idx, score in zip(top_predictions.indices, top_predictions.values):
-                label = content_safety_model.config.id2label[idx.item()]
-                confidence = score.item()
-                
-                if any(keyword in label.lower() for keyword in dangerous_keywords):
-                    # Lower threshold for NSFW model (20% instead of 30%)
-                    if confidence > 0.2:
-                        safety_flags.append(f"specialized model detected {label} (confidence: {confidence:.2f})")
+            # Lower threshold for NSFW model (20% instead of 30%)
+            return [_top_label_flags(row, dangerous_keywords, 0.2) for row in predictions]
         
-        elif content_safety_model_type == "clip":
-            # CLIP-based model - use text prompts for semantic understanding
-            try:
-                from transformers import CLIPProcessor, CLIPModel
-                
-                # Define dangerous text prompts
-                dangerous_prompts = [
-                    "violence", "gore", "blood", "horror scene", "scary image", "weapon",
-                    "inappropriate content", "disturbing imagery", "adult content",
-                    "monster", "zombie", "demon", "horror movie", "bloody scene",
-                    "violent scene", "horror character", "scary monster"
-                ]
-                
-                # Process image and text prompts
-                inputs = content_safety_processor(
-                    text=dangerous_prompts,
-                    images=image,
-                    return_tensors="pt",
-                    padding=True
-                )
-                
-                with torch.no_grad():
-                    outputs = content_safety_model(**inputs)
-                    # Get image-text similarity scores
-                    logits_per_image = outputs.logits_per_image
-                    probs = logits_per_image.softmax(dim=1)
-                
-                # Check each dangerous prompt
-                for i, prompt in enumerate(dangerous_prompts):
-                    score = probs[0][i].item()
-                    if score > 0.15:  # 15% threshold for CLIP (lower because it's semantic matching)
-                        safety_flags.append(f"CLIP detected '{prompt}' (confidence: {score:.2f})")
-                
-            except Exception as clip_err:
-                # Fallback: try pipeline approach
-                try:
-                    from transformers import pipeline
-                    classifier = pipeline("zero-shot-image-classification", 
-                                        model=content_safety_model,
-                                        device=-1)
-                    
-                    candidate_labels = [
-                        "violence", "gore", "blood", "horror", "scary", "weapon",
-                        "inappropriate content", "disturbing imagery", "adult content",
-                        "monster", "zombie", "demon", "horror movie scene"
-                    ]
-                    
-                    result = classifier(image, candidate_labels=candidate_labels)
-                    
-                    for item in result[:3]:
-                        label = item["label"].lower()
-                        score = item["score"]
-                        dangerous_keywords = [
-                            "violence", "gore", "blood", "horror", "scary", "weapon",
-                            "inappropriate", "disturbing", "adult", "monster", "zombie", "demon"
-                        ]
-                        if any(keyword in label for keyword in dangerous_keywords):
-                            if score > 0.25:
-                                safety_flags.append(f"specialized model detected {item['label']} (confidence: {score:.2f})")
-                except Exception as pipeline_err:
-                    print(f"⚠️ CLIP detection failed: {clip_err}, pipeline also failed: {pipeline_err}", file=sys.stderr)
-        else:
-            # Generic model - use standard approach
-            dangerous_keywords = [
-                "nsfw", "violence", "gore", "blood", "horror", "scary", "weapon",
-                "explicit", "inappropriate", "adult", "mature", "disturbing"
-            ]
-            
-            for idx, score in zip(top_predictions.indices, top_predictions.values):
-                label = content_safety_model.config.id2label[idx.item()]
-                confidence = score.item()
-                
-                if any(keyword in label.lower() for keyword in dangerous_keywords):
-                    if confidence > 0.2:  # 20% threshold for generic models
-                        safety_flags.append(f"specialized model detected {label} (confidence: {confidence:.2f})")
-        
-        return safety_flags
+        # Generic model - use standard approach
+        dangerous_keywords = [
+            "nsfw", "violence", "gore", "blood", "horror", "scary", "weapon",
+            "explicit", "inappropriate", "adult", "mature", "disturbing"
+        ]
+        # 20% threshold for generic models
+        return [_top_label_flags(row, dangerous_keywords, 0.2) for row in predictions]
         
     except Exception as e:
         # If specialized model fails, return empty (fallback to YOLO)
         print(f"⚠️ Specialized model detection failed: {e}", file=sys.stderr)
         import traceback
         print(f"⚠️ Traceback: {traceback.format_exc()}", file=sys.stderr)
-        return []
+        return [[] for _ in ctxs]
+
+def detect_content_safety_specialized(ctx):
+    """Use specialized content safety model to detect violence, gore, horror"""
+    return detect_content_safety_specialized_batch([ctx])[0]
+
+def warm_models():
+    """Load the detection models once a thumbnail missed the cache"""
+    model = get_yolo_model()
+    if HAS_TRANSFORMERS:
+        with span("model_load"):
+            load_content_safety_model()
+    return model
+
+def _warm_models_for_scan():
+    """warm_models() for scan(): None if loading failed (YOLO is retried before inference)"""
+    try:
+        return warm_models()
+    except Exception as e:
+        print(f"⚠️ Model load error: {e}", file=sys.stderr)
+        return None
+
+def flag_thumbnail(ctx, specialized_flags):
+    """Flags for one decoded thumbnail whose YOLO detections are already on ctx"""
+    flags = []
 
-# Get thumbnail URL from command line argument
-thumbnail_url = sys.argv[1] if len(sys.argv) > 1 else None
-
-if not thumbnail_url:
-    print(json.dumps([]))
-    sys.exit(0)
-
-# Download thumbnail
-thumbnail_path = "tmp/thumbnail.jpg"
-try:
-    if HAS_REQUESTS:
-        response = requests.get(thumbnail_url, timeout=10)
-        if response.status_code == 200:
-            with open(thumbnail_path, "wb") as f:
-                f.write(response.content)
-        else:
-            print(json.dumps([]))
-            sys.exit(0)
-    elif HAS_URLLIB:
-        urllib.request.urlretrieve(thumbnail_url, thumbnail_path)
-    else:
-        print(json.dumps([]))
-        sys.exit(0)
-except Exception as e:
-    print(json.dumps([]))
-    sys.exit(0)
-
-# AI-based detection using YOLO + Specialized Content Safety Models
-try:
-    # 1. YOLO Object Detection (weapons, people, objects)
-    # Use higher confidence threshold for more accurate detection
-    results = yolo_model(thumbnail_path, verbose=False, conf=0.6)  # Require 60% confidence
-    
-    detected_objects = []
     weapon_detected = False
     person_detected = False
-    
-    for r in results:
-        for i, cls in enumerate(r.boxes.cls):
-            confidence = float(r.boxes.conf[i])
-            name = yolo_model.names[int(cls)].lower()
-            detected_objects.append((name, confidence))
-            
-            # Check for weapons with high confidence
-            if confidence >= 0.7 and any(danger in name for danger in dangerous_objects):
-                weapon_detected = True
-                flags.append(f"weapon detected in thumbnail: {name} (confidence: {confidence:.2f})")
-            
-            # Check for person (context for dangerous scenes)
-            if name == "person" and confidence >= 0.7:
-                person_detected = True
-    
+
+    for name, confidence, _ in ctx.detections:
+        # Check for weapons with high confidence
+        if confidence >= 0.7 and any(danger in name for danger in dangerous_objects):
+            weapon_detected = True
+            flags.append(f"weapon detected in thumbnail: {name} (confidence: {confidence:.2f})")
+
+        # Check for person (context for dangerous scenes)
+        if name == "person" and confidence >= 0.7:
+            person_detected = True
+
     # Context-aware detection: weapon + person = more dangerous
     if weapon_detected and person_detected:
         # Already flagged weapon, but this adds context
         pass
-    
+
     # Check for scary/monster content
     if person_detected:
         # Check if person looks scary/distorted (monster-like)
-        if detect_scary_face(thumbnail_path):
+        if detect_scary_face(ctx):
             flags.append("scary/distorted face detected in thumbnail (monster-like)")
-        
+
         # Check for deformed/monster-like humanoid shapes
-        if detect_deformed_monster(thumbnail_path):
+        if detect_deformed_monster(ctx):
             flags.append("deformed/monster-like humanoid detected in thumbnail")
-    
+
     # Check for scary animals in dark contexts
-    if detect_scary_animals(thumbnail_path, detected_objects):
+    if detect_scary_animals(ctx):
         flags.append("scary animal detected in dark/creepy context")
-    
+
     # 2. Specialized Content Safety Model (violence, gore, horror, NSFW)
-    specialized_flags = detect_content_safety_specialized(thumbnail_path)
     flags.extend(specialized_flags)
-    
+
     # 3. Fallback: Advanced blood/gore detection (if specialized model didn't catch it)
     if len(specialized_flags) == 0:  # Only use fallback if specialized model found nothing
-        has_blood, blood_pct = detect_blood_gore_advanced(thumbnail_path)
+        has_blood, blood_pct = detect_blood_gore_advanced(ctx)
         if has_blood:
             flags.append(f"blood/gore detected in thumbnail ({blood_pct:.1f}% red content)")
-    
+
     # 4. Fallback: Horror scene detection
-    if detect_horror_scene(thumbnail_path):
+    if detect_horror_scene(ctx):
         flags.append("horror scene detected in thumbnail (dark, high contrast, red tint)")
-    
-except Exception as e:
-    print(f"⚠️ Detection error: {e}", file=sys.stderr)
-    pass
-
-# Removed simple color-based blood/gore and dark content detection
-# These were causing false positives. Relying on YOLO's AI understanding instead.
-
-# Cleanup
-try:
-    if os.path.exists(thumbnail_path):
-        os.remove(thumbnail_path)
-except:
-    pass
-
-try:
-	print(json.dumps(flags))
-	sys.stdout.flush()
-except (KeyboardInterrupt, BrokenPipeError):
-	# Graceful shutdown - output empty result
+
+    # Removed simple color-based blood/gore and dark content detection
+    # These were causing false positives. Relying on YOLO's AI understanding instead.
+
+    return flags
+
+@timed_run("thumbnail")
+@governed("thumbnail")
+def scan(thumbnail_url=None, job_dir=None):
+    """Download one thumbnail, run every detector on it and return flags.
+
+    The image is decoded from memory, so job_dir (kept for the CLI and the
+    worker protocol) is no longer written to.
+    """
+    if not thumbnail_url:
+        return []
+
+    # OPTIMIZATION: a thumbnail seen before needs no download or inference
+    cache = thumbnail_cache.get_cache(model_version())
+    if cache is not None:
+        cached = cache.get_by_url(thumbnail_url)
+        if cached is not None:
+            print("✅ Thumbnail verdict from cache (URL)", file=sys.stderr)
+            return cached
+
+    # A stale entry is revalidated with a conditional request
+    validators = cache.get_validators(thumbnail_url) if cache is not None else None
+    pending = thumbnail_fetch.fetch_async(thumbnail_url, validators)
+
+    # OPTIMIZATION: with no validators no 304 is possible, so the models load
+    # while the download runs. A revalidation is likely a 304 and loads them
+    # only once the image turns out to need a scan.
+    warmed = not validators
+    model = None
+    if warmed:
+        model = _warm_models_for_scan()
+        # Verdicts are only shared with the classifier that actually loaded
+        cache = thumbnail_cache.get_cache(model_version())
+    with span("io"):
+        fetched = pending.result()
+
+    if fetched.not_modified and cache is not None:
+        # Conditional request: the server still has the image we have a verdict for
+        cached = cache.revalidated(thumbnail_url)
+        if cached is not None:
+            print("✅ Thumbnail verdict from cache (not modified)", file=sys.stderr)
+            return cached
+    if not fetched.ok:
+        return []
+
+    # Decode once, straight from the response buffer - every detector below shares this context
+    with span("io"):
+        ctx = FrameContext.from_bytes(fetched.content)
+    if ctx is None:
+        return []
+
+    # The identical image under another URL - reuse its verdict
+    digest = thumbnail_cache.content_digest(fetched.content)
+    if cache is not None:
+        cached = cache.get_by_digest(digest, thumbnail_url, fetched.validators)
+        if cached is not None:
+            print("✅ Thumbnail verdict from cache (same image)", file=sys.stderr)
+            return cached
+
+    if not warmed:
+        model = _warm_models_for_scan()
+        # Verdicts are only shared with the classifier that actually loaded
+        cache = thumbnail_cache.get_cache(model_version())
+
+    # AI-based detection using YOLO + Specialized Content Safety Models
+    try:
+        # 1. YOLO Object Detection (weapons, people, objects)
+        # Use higher confidence threshold for more accurate detection
+        if model is None:
+            model = get_yolo_model()
+        with span("inference"):
+            ctx.detect_objects(model, conf=0.6)  # Require 60% confidence
+            specialized_flags = detect_content_safety_specialized(ctx)
+
+        with span("post"):
+            flags = flag_thumbnail(ctx, specialized_flags)
+    except Exception as e:
+        # Not cached - a failed scan must not be remembered as a verdict
+        print(f"⚠️ Detection error: {e}", file=sys.stderr)
+        return []
+
+    if cache is not None:
+        cache.put(digest, flags, thumbnail_url, fetched.validators)
+    return flags
+
+@timed_run("thumbnail_batch")
+@governed("thumbnail_batch")
+def scan_batch(thumbnail_urls):
+    """Scan many thumbnails in one pass; returns one verdict per URL, in order.
+
+    Thumbnails are fetched concurrently and decoded in memory, and YOLO and
+    the content safety model each run on batches of BATCH_SIZE images.
+    """
+    thumbnail_urls = list(dict.fromkeys(url for url in thumbnail_urls if url))
+    verdicts = {}
+
+    def verdict(url, reasons):
+        return {"url": url, "safe": len(reasons) == 0, "reasons": reasons}
+
+    # OPTIMIZATION: thumbnails seen before need no download or inference
+    cache = thumbnail_cache.get_cache(model_version())
+    if cache is not None:
+        for url in thumbnail_urls:
+            cached = cache.get_by_url(url)
+            if cached is not None:
+                verdicts[url] = verdict(url, cached)
+
+    to_fetch = [url for url in thumbnail_urls if url not in verdicts]
+    validators = {}
+    if cache is not None:
+        for url in to_fetch:
+            validators[url] = cache.get_validators(url)
+    with span("io"):
+        # Concurrent, over the pooled keep-alive session; stale entries are revalidated
+        fetched = thumbnail_fetch.fetch_many(to_fetch, validators) if to_fetch else {}
+
+    decoded = []
+    for url in to_fetch:
+        result = fetched[url]
+        if result.not_modified and cache is not None:
+            cached = cache.revalidated(url)
+            if cached is not None:
+                verdicts[url] = verdict(url, cached)
+                continue
+        with span("io"):
+            ctx = FrameContext.from_bytes(result.content) if result.ok else None
+        if ctx is None:
+            # Unreachable or undecodable - same as the single scan: no flags
+            verdicts[url] = {"url": url, "safe": True, "reasons": [], "error": "thumbnail unavailable"}
+            continue
+        # The identical image under another URL - reuse its verdict
+        digest = thumbnail_cache.content_digest(result.content)
+        cached = cache.get_by_digest(digest, url, result.validators) if cache is not None else None
+        if cached is not None:
+            verdicts[url] = verdict(url, cached)
+        else:
+            decoded.append((url, ctx, digest, result.validators))
+
+    cache_hits = sum(1 for v in verdicts.values() if "error" not in v)
+    if cache_hits:
+        print(f"✅ {cache_hits}/{len(thumbnail_urls)} thumbnail verdicts from cache", file=sys.stderr)
+
+    model = None
+    if decoded:
+        model = warm_models()
+        # Verdicts are only shared with the classifier that actually loaded
+        cache = thumbnail_cache.get_cache(model_version())
+    for start in range(0, len(decoded), BATCH_SIZE):
+        batch = decoded[start:start + BATCH_SIZE]
+        ctxs = [ctx for _, ctx, _, _ in batch]
+        try:
+            with span("inference"):
+                FrameContext.detect_objects_batch(model, ctxs, conf=0.6)
+                specialized = detect_content_safety_specialized_batch(ctxs)
+        except Exception as e:
+            print(f"⚠️ Batch detection error: {e}", file=sys.stderr)
+            for url, _, _, _ in batch:
+                verdicts[url] = {"url": url, "safe": True, "reasons": [], "error": "detection failed"}
+            continue
+
+        for (url, ctx, digest, url_validators), specialized_flags in zip(batch, specialized):
+            try:
+                with span("post"):
+                    reasons = flag_thumbnail(ctx, specialized_flags)
+            except Exception as e:
+                print(f"⚠️ Detection error for {url}: {e}", file=sys.stderr)
+                verdicts[url] = {"url": url, "safe": True, "reasons": [], "error": "detection failed"}
+                continue
+            verdicts[url] = verdict(url, reasons)
+            if cache is not None:
+                cache.put(digest, reasons, url, url_validators)
+
+    return [verdicts[url] for url in thumbnail_urls]
+
+# Handle graceful shutdown
+def signal_handler(sig, frame):
 	print("[]", file=sys.stdout)
 	sys.stdout.flush()
 	sys.exit(0)
 
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    if sys.argv[1:2] == ["--batch"]:
+        # Batch mode: every remaining argument is a thumbnail URL; prints one
+        # {"url", "safe", "reasons"} verdict per URL
+        flags = scan_batch(sys.argv[2:])
+    else:
+        # Get thumbnail URL from command line argument
+        thumbnail_url = sys.argv[1] if len(sys.argv) > 1 else None
+        # Optional second argument: the job's working directory (defaults to tmp/)
+        flags = scan(thumbnail_url, job_dir_arg(sys.argv, 2))
+
+    try:
+        print(json.dumps(flags))
+        sys.stdout.flush()
+    except (KeyboardInterrupt, BrokenPipeError):
+        # Graceful shutdown - output empty result
+        print("[]", file=sys.stdout)
+        sys.stdout.flush()
+        sys.exit(0)
@@ -0,0 +1,197 @@
+"""Per-stage timing spans and an optional profiler for the scanners.
+
+Each scanner's scan() runs inside timed_run(); code inside it marks stages
+with span("model_load"), span("io"), span("inference"), span("post"), ...
+Spans nest, and a span's reported time excludes the spans inside it, so a
+model loaded lazily during inference is counted as model_load, not inference.
+The first run in a process also reports "import" - the time from importing
+this module (done first thing by the scanners) to the start of the run - and
+the breakdown of any imports wrapped in timed_import("name").
+
+At the end of a run the totals go to stderr as one line (stdout stays
+reserved for the JSON result):
+
+    ⏱️ image timing: import=0.81s model_load=1.20s io=0.35s inference=2.10s post=0.04s other=0.02s total=4.52s
+
+SCAN_TIMING_FILE=<path> also appends one JSON object per run to that file,
+SCAN_TIMING=0 turns the spans off, and SCAN_PROFILE=1 runs every scan under
+cProfile, writing <scanner>-<pid>-<time>.prof to SCAN_PROFILE_DIR (default
+profiles/) and printing the top functions to stderr.
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+_IMPORTED_AT = time.perf_counter()
+
+ENABLED = os.environ.get("SCAN_TIMING", "1") != "0"
+TIMING_FILE = os.environ.get("SCAN_TIMING_FILE")
+PROFILE = os.environ.get("SCAN_PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("SCAN_PROFILE_DIR", "profiles")
+
+# Functions listed on stderr when profiling
+PROFILE_TOP = 15
+
+# Module-level imports timed with timed_import(), reported with the first run
+_import_times = {}
+
+_current = threading.local()
+# The scan worker turns this off: its imports happen long before any job
+_first_run = True
+_first_run_lock = threading.Lock()
+
+
+class Recorder:
+    """Self time per span name for one scanner run"""
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.totals = {}
+        self.counts = {}
+        self.imports = {}
+        # Child time of each open span, innermost last
+        self._stack = []
+
+    def add(self, name, seconds):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextlib.contextmanager
+    def span(self, name):
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            self.add(name, elapsed - children)
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def report(self, total):
+        spans = {name: round(seconds, 4) for name, seconds in self.totals.items()}
+        # import happened before the run started, so it isn't part of its wall time
+        other = total - sum(seconds for name, seconds in self.totals.items() if name != "import")
+        report = {
+            "scanner": self.scanner,
+            "pid": os.getpid(),
+            "started": round(time.time() - total, 3),
+            "total_s": round(total, 4),
+            "spans": spans,
+            "counts": dict(self.counts),
+            "other_s": round(max(0.0, other), 4),
+        }
+        if self.imports:
+            report["imports"] = {name: round(seconds, 4) for name, seconds in self.imports.items()}
+        return report
+
+
+@contextlib.contextmanager
+def span(name):
+    """Time a stage of the current run (a no-op outside timed_run or with SCAN_TIMING=0)"""
+    recorder = getattr(_current, "recorder", None)
+    if recorder is None:
+        yield
+        return
+    with recorder.span(name):
+        yield
+
+
+@contextlib.contextmanager
+def timed_import(name):
+    """Time a group of module-level imports for the import breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _import_times[name] = _import_times.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed_iter(iterable, name="io"):
+    """Yield from iterable, counting the time spent producing each item as a span"""
+    iterator = iter(iterable)
+    while True:
+        with span(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def _emit(report):
+    parts = [f"{name}={seconds:.2f}s" for name, seconds in report["spans"].items()]
+    parts.append(f"other={report['other_s']:.2f}s")
+    parts.append(f"total={report['total_s']:.2f}s")
+    if report.get("imports"):
+        breakdown = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in report["imports"].items())
+        parts.append(f"[imports: {breakdown}]")
+    print(f"⏱️ {report['scanner']} timing: {' '.join(parts)}", file=sys.stderr)
+    if TIMING_FILE:
+        try:
+            with open(TIMING_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(report) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write timing file: {e}", file=sys.stderr)
+
+
+def skip_import_span():
+    """Don't report an import span (for long-lived processes that import scanners up front)"""
+    global _first_run
+    _first_run = False
+
+
+@contextlib.contextmanager
+def _profiled(scanner):
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{scanner}-{os.getpid()}-{int(time.time())}.prof")
+            profiler.dump_stats(path)
+            print(f"📈 Profile written to {path}", file=sys.stderr)
+        except OSError as e:
+            print(f"⚠️ Could not write profile: {e}", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+
+@contextlib.contextmanager
+def timed_run(scanner):
+    """Record the spans of one scan (context manager or decorator)"""
+    global _first_run
+    if getattr(_current, "recorder", None) is not None:
+        # Nested inside another timed scan of this thread - its spans count there
+        yield
+        return
+
+    with contextlib.ExitStack() as stack:
+        if PROFILE:
+            stack.enter_context(_profiled(scanner))
+        if not ENABLED:
+            yield
+            return
+
+        recorder = Recorder(scanner)
+        with _first_run_lock:
+            if _first_run:
+                _first_run = False
+                recorder.add("import", time.perf_counter() - _IMPORTED_AT)
+                recorder.imports = dict(_import_times)
+        _current.recorder = recorder
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current.recorder = None
+            _emit(recorder.report(time.perf_counter() - start))
@@ -0,0 +1,166 @@
+"""Transcribe-once cache shared by the full-audio filter and the context analyzer.
+
+Phase 2 (whisper_scan_full.py) and Phase 3 (transcription_analyzer.py) run in
+parallel on the same tmp/audio.wav. Transcripts are keyed by a hash of the
+audio content plus the ASR engine (model, backend and compute type); the first consumer transcribes
+while holding a per-key file lock, and every later consumer blocks on that
+lock and then reads the stored text and segments.
+
+With the VAD pre-filter on (see vad.py) only speech regions are transcribed;
+segment timestamps are mapped back to the original audio and the entry records
+how much audio was skipped.
+
+Given the videoId, every full transcript is also kept in the long-term
+transcript store (transcript_store.py) for re-scoring.
+"""
+import hashlib
+import json
+import os
+import sys
+import wave
+
+import asr
+import transcript_store
+import vad
+from timing import span
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    # No cross-process locking on Windows - consumers may transcribe twice
+    HAS_FCNTL = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("TRANSCRIPT_CACHE_DIR", os.path.join(BASE_DIR, "cache", "transcripts"))
+
+# Oldest entries beyond this are pruned whenever a new transcript is stored
+MAX_ENTRIES = 200
+
+
+def audio_hash(audio_path, chunk_size=1 << 20):
+    """SHA-256 of the audio file contents"""
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_entry(entry_path):
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(entry_path, transcript):
+    # Write to a temp file and rename so readers never see a partial entry
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(transcript, f)
+    os.replace(tmp_path, entry_path)
+
+
+def _prune():
+    try:
+        entries = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR) if name.endswith(".json")]
+        if len(entries) <= MAX_ENTRIES:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:-MAX_ENTRIES]:
+            os.remove(path)
+            lock_path = path[:-len(".json")] + ".lock"
+            if os.path.exists(lock_path):
+                os.remove(lock_path)
+    except OSError:
+        pass
+
+
+def _entry_key(audio_path, model_name):
+    suffix = "-vad" if vad.ENABLED else ""
+    with span("io"):
+        digest = audio_hash(audio_path)
+    return f"{digest}-{asr.engine_tag(model_name)}{suffix}"
+
+
+def _run_asr(model, audio_path):
+    """Transcribe audio_path; returns (ASR result, VAD skip report or None)"""
+    if not vad.ENABLED:
+        with span("inference"):
+            return model.transcribe(audio_path), None
+
+    # OPTIMIZATION: only speech regions go to Whisper. The file is analysed and
+    # then read window by window, so only the speech is ever held in memory.
+    skip_report = vad.SkipReport()
+    try:
+        with span("vad"):
+            regions = vad.file_speech_regions(audio_path, report=skip_report)
+        with span("io"):
+            speech = vad.read_speech(audio_path, regions)
+    except (wave.Error, EOFError, ValueError) as e:
+        print(f"⚠️ VAD unavailable ({e}), transcribing whole file", file=sys.stderr)
+        with span("inference"):
+            return model.transcribe(audio_path), None
+    skip_report.log("Full transcription")
+    if len(speech) == 0:
+        return {"text": "", "segments": []}, skip_report.as_dict()
+
+    with span("inference"):
+        result = model.transcribe(speech)
+    for segment in result.get("segments", []):
+        segment["start"] = vad.to_original_time(segment["start"], regions)
+        segment["end"] = vad.to_original_time(segment["end"], regions)
+    return result, skip_report.as_dict()
+
+
+def lookup(audio_path="tmp/audio.wav", model_name="tiny"):
+    """Return the cached transcript for audio_path, or None without transcribing"""
+    return _read_entry(os.path.join(CACHE_DIR, f"{_entry_key(audio_path, model_name)}.json"))
+
+
+def transcribe(audio_path="tmp/audio.wav", model_name="tiny", video_id=None):
+    """Return {"text", "segments"} for audio_path, transcribing at most once per content.
+
+    With a video_id the transcript is also kept in the transcript store.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    key = _entry_key(audio_path, model_name)
+    entry_path = os.path.join(CACHE_DIR, f"{key}.json")
+
+    transcript = _read_entry(entry_path)
+    if transcript is not None:
+        transcript_store.save(video_id, key, transcript)
+        return transcript
+
+    with open(os.path.join(CACHE_DIR, f"{key}.lock"), "w") as lock_file:
+        if HAS_FCNTL:
+            # Blocks while another consumer is transcribing the same audio
+            with span("wait"):
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            transcript = _read_entry(entry_path)
+            if transcript is not None:
+                print(f"✅ Reusing cached transcript {key[:12]}", file=sys.stderr)
+                transcript_store.save(video_id, key, transcript)
+                return transcript
+
+            from scan_models import get_asr_engine
+            model = get_asr_engine(model_name)
+            result, skip_report = _run_asr(model, audio_path)
+
+            # Engines already return only the segment fields worth keeping
+            transcript = {
+                "text": result["text"],
+                "segments": result["segments"],
+                "vad": skip_report,
+            }
+            _write_entry(entry_path, transcript)
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    transcript_store.save(video_id, key, transcript)
+    _prune()
+    return transcript
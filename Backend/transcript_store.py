@@ -0,0 +1,145 @@
+"""Compressed per-video transcript store for re-scoring without Whisper.
+
+The transcript cache (transcript_cache.py) is keyed by audio content and
+pruned to the most recent entries; it exists to share one transcription
+between Phase 2 and Phase 3. This store keeps every completed full transcript
+for good, keyed by videoId and stored next to the verdicts in transcripts.db,
+so tuning the word lists or thresholds can be applied to already scanned
+videos by re-running only the text analyzers (see rescore.py).
+
+Transcripts are stored as zlib-compressed JSON of their segments as
+[start, end, text] triples (the text is the segments joined, as Whisper
+builds it), which is a fraction of the size of the cache entries. The
+acoustic scream events Phase 3 found (scream_detector.py) are kept with them.
+
+A video the quick scan flagged never gets a full transcript, so the quick
+scan stores its own (the first 2 minutes at most, less if it stopped early)
+under a QUICK_KEY_PREFIX source key, with its acoustic events. A full
+transcript replaces it; it never replaces a full one.
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_PATH = os.environ.get("TRANSCRIPT_STORE_PATH", os.path.join(BASE_DIR, "transcripts.db"))
+
+# TRANSCRIPT_STORE=0 stops storing transcripts (re-scoring then only sees older ones)
+ENABLED = os.environ.get("TRANSCRIPT_STORE", "1") != "0"
+
+# source_key prefix of a quick scan transcript
+QUICK_KEY_PREFIX = "quick:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    video_id TEXT PRIMARY KEY,
+    source_key TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    data BLOB NOT NULL,
+    screams TEXT
+);
+"""
+
+
+def connect(path=None):
+    # Phase 2 and Phase 3 (and pool processes) share the file; SQLite serialises the writers
+    conn = sqlite3.connect(path or STORE_PATH, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def pack(transcript):
+    """Compressed form of a {"text", "segments"} transcript"""
+    segments = [
+        [round(segment["start"], 2), round(segment["end"], 2), segment["text"]]
+        for segment in transcript.get("segments", [])
+    ]
+    if not segments and transcript.get("text"):
+        # No timestamps - keep the text as one untimed segment
+        segments = [[None, None, transcript["text"]]]
+    return zlib.compress(json.dumps(segments, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def unpack(data):
+    """{"text", "segments"} transcript from pack() output"""
+    segments = [
+        {"start": start, "end": end, "text": text}
+        for start, end, text in json.loads(zlib.decompress(data).decode("utf-8"))
+    ]
+    if len(segments) == 1 and segments[0]["start"] is None:
+        return {"text": segments[0]["text"], "segments": []}
+    return {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+
+def is_quick_key(source_key):
+    return source_key.startswith(QUICK_KEY_PREFIX)
+
+
+def save(video_id, source_key, transcript, screams=None):
+    """Store video_id's transcript (replacing an older one); failures are only logged.
+
+    source_key is the transcript cache key (audio hash + ASR engine), or
+    QUICK_KEY_PREFIX + the ASR engine for the quick scan's partial transcript.
+    """
+    if not ENABLED or not video_id:
+        return
+    try:
+        conn = connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT source_key FROM transcripts WHERE video_id = ?", (video_id,)
+                ).fetchone()
+                if row is not None and row[0] == source_key and not is_quick_key(source_key):
+                    # Phase 2 and Phase 3 both get here with the same transcript
+                    return
+                if row is not None and is_quick_key(source_key) and not is_quick_key(row[0]):
+                    # A rescan's quick pass: the full transcript is already here
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO transcripts (video_id, source_key, stored_at, data, screams) VALUES (?, ?, ?, ?, ?)",
+                    (video_id, source_key, time.time(), pack(transcript),
+                     json.dumps(screams, separators=(",", ":")) if screams is not None else None),
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not store transcript for {video_id}: {e}", file=sys.stderr)
+
+
+def save_screams(video_id, events):
+    """Attach Phase 3's acoustic scream events to video_id's stored transcript"""
+    if not ENABLED or not video_id:
+        return
+    try:
+        conn = connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE transcripts SET screams = ? WHERE video_id = ?",
+                    (json.dumps(events, separators=(",", ":")), video_id),
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not store scream events for {video_id}: {e}", file=sys.stderr)
+
+
+def iter_packed(path=STORE_PATH, batch_size=500):
+    """Yield lists of (video_id, source key, packed data, scream events JSON or None) rows, batch_size at a time"""
+    if not os.path.exists(path):
+        return
+    conn = connect(path)
+    try:
+        cursor = conn.execute("SELECT video_id, source_key, data, screams FROM transcripts ORDER BY video_id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        conn.close()
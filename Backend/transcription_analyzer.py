@@ -1,55 +1,41 @@
-import whisper
 import json
 import sys
+
+from scan_worker import forward_to_worker
+
+# Thin-client fast path: hand the job to the long-lived worker if it is running
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--ranges"]:
+        forward_to_worker("transcription_ranges", sys.argv[2:])
+    else:
+        forward_to_worker("transcription", sys.argv[1:])
+
+# Imported first so the "import" timing span covers everything below
+from timing import timed_run, span, timed_iter
+
 import re
-from collections import Counter
 import signal
+import wave
 
-# Handle graceful shutdown
-def signal_handler(sig, frame):
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
-
-# Use "tiny" model for faster processing
-model = whisper.load_model("tiny")
-
-try:
-	# Process ENTIRE audio file
-	# OPTIMIZATION: Use faster settings for speed
-	result = model.transcribe(
-		"tmp/audio.wav", 
-		condition_on_previous_text=False,
-		fp16=True,  # Use half precision for faster processing
-		beam_size=1,  # Greedy decoding (faster than beam search)
-		best_of=1  # Don't try multiple decodings
-	)
-except KeyboardInterrupt:
-	# Graceful shutdown - return empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-except Exception as e:
-	# Any other error - return empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-
-# Get full transcription text
-full_text = result["text"]
-full_text_lower = full_text.lower()
-
-flags = []
-
-# Split into sentences for context analysis
-sentences = re.split(r'[.!?]+', full_text)
-sentences = [s.strip() for s in sentences if s.strip()]
-
-# 1. SCREAM DETECTION WITH CONTEXT
-# Look for scream indicators in context (not just isolated words)
+import asr
+import audio_io
+import scream_detector
+import transcript_cache
+import transcript_store
+import vad
+from lexicon import Lexicon
+from scan_models import get_asr_engine
+from thread_governor import governed, rebalance
+from workspace import job_dir_arg, job_path, job_video_id
+
+# Streaming mode (AUDIO_STREAMING=all): transcribe in fixed windows and stop at
+# the first window that makes the video unsafe. Off by default for Phase 3
+# because it runs next to Phase 2, which needs the whole transcript anyway.
+STREAMING = audio_io.STREAMING is audio_io.Streaming.ALL
+STREAM_WINDOW_SECONDS = audio_io.STREAM_WINDOW_SECONDS
+
+
+# 1. Scream indicators (looked for in context, not just isolated words)
 scream_patterns = [
     r'\b(ah+|ahh+|ahhh+|ahhhh+|aah+|aaah+|aaaah+)\b',
     r'\b(no+|noo+|nooo+|noooo+)\b',
@@ -57,28 +43,7 @@ scream_patterns = [
     r'\b(scream|screaming|screamed|screams)\b',
 ]
 
-# Count screams in context - look for emotional distress indicators
-scream_count = 0
-scream_sentences = []
-
-for sentence in sentences:
-    sentence_lower = sentence.lower()
-    for pattern in scream_patterns:
-        if re.search(pattern, sentence_lower):
-            # Check if sentence has distress context
-            distress_indicators = ['fear', 'scared', 'afraid', 'terrified', 'panic', 'danger', 'hurt', 'pain']
-            if any(indicator in sentence_lower for indicator in distress_indicators):
-                scream_count += 2  # Weighted higher if in distress context
-                scream_sentences.append(sentence[:100])  # Store context
-            else:
-                scream_count += 1
-
-# If many screams detected (more than 5), flag it
-if scream_count > 5:
-    flags.append(f"excessive screams detected ({scream_count} instances) - context suggests distress")
-
-# 2. HORROR CONTENT DETECTION WITH CONTEXT
-# Analyze horror content in context, not just keyword counting
+# 2. Horror vocabulary (the first 10 also feed the escalation check)
 horror_keywords = [
     "horror", "horrifying", "terrifying", "scary", "frightening",
     "ghost", "ghosts", "demon", "demons", "monster", "monsters", "haunted", "haunting",
@@ -89,94 +54,397 @@ horror_keywords = [
     "nightmare", "nightmares", "terror", "terrorize", "fear"
 ]
 
-# Context-aware horror detection
-horror_sentences = []
-horror_score = 0
-
-for sentence in sentences:
-    sentence_lower = sentence.lower()
-    sentence_horror_count = 0
-    
-    for keyword in horror_keywords:
-        pattern = r'\b' + re.escape(keyword) + r'\b'
-        if re.search(pattern, sentence_lower):
-            sentence_horror_count += 1
-    
-    # If sentence has multiple horror keywords, it's more concerning
-    if sentence_horror_count > 0:
-        # Check for violent action verbs in same sentence
-        violent_verbs = ['kill', 'murder', 'torture', 'hurt', 'attack', 'stab', 'shoot', 'cut']
-        if any(verb in sentence_lower for verb in violent_verbs):
-            horror_score += sentence_horror_count * 2  # Weighted higher
-            horror_sentences.append(sentence[:150])
-        else:
-            horror_score += sentence_horror_count
-
-# If significant horror content (score > 10), flag it
-if horror_score > 10:
-    flags.append(f"horror content detected (severity score: {horror_score}) - context suggests violent/horror themes")
-
-# 3. WEAPON MENTIONS WITH CONTEXTUAL ANALYSIS
+# 3. Weapon mentions
 weapon_keywords = [
     "knife", "knives", "blade", "blades",
     "gun", "guns", "pistol", "pistols", "rifle", "rifles",
     "weapon", "weapons", "firearm", "firearms", "machete", "machetes", "scissors"
 ]
 
-weapon_count = 0
-dangerous_weapon_contexts = []
+# Context indicators are plain substring checks (e.g. 'hurt' also matches 'hurting')
+distress_indicators = ['fear', 'scared', 'afraid', 'terrified', 'panic', 'danger', 'hurt', 'pain']
+violent_verbs = ['kill', 'murder', 'torture', 'hurt', 'attack', 'stab', 'shoot', 'cut']
+dangerous_indicators = ['kill', 'murder', 'attack', 'stab', 'shoot', 'hurt', 'threat', 'danger', 'weapon', 'fight', 'violence']
+neutral_indicators = ['cooking', 'kitchen', 'tool', 'cutting', 'food', 'recipe', 'craft', 'art', 'museum', 'history', 'educational']
+
+# OPTIMIZATION: compile every keyword list and pattern once, then get all
+# category hits for a sentence from a single scan
+danger_lexicon = Lexicon(
+    terms={
+        "horror": horror_keywords,
+        "horror_core": horror_keywords[:10],
+        "weapon": weapon_keywords,
+    },
+    patterns={"scream": scream_patterns},
+)
+
+
+# Flagged ranges closer together than this are reported as one range
+RANGE_MERGE_GAP_SECONDS = 2.0
+# Scream count added per acoustic scream event - only once the transcript has
+# screams of its own. Without one, only a dense cluster of events flags
+# (scream_detector.confident_cluster)
+ACOUSTIC_SCREAM_WEIGHT = 1
+# Ranges spelled out in a flag's reason string (all of them are in scan_ranges())
+REASON_MAX_RANGES = 3
+
+SENTENCE_END = re.compile(r'[.!?]+')
+
+
+def format_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def merge_ranges(ranges, gap=RANGE_MERGE_GAP_SECONDS):
+    """Sorted, merged [start, end] ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [[round(float(start), 1), round(float(end), 1)] for start, end in merged]
+
+
+class TranscriptAnalyzer:
+    """Running context analysis - feed Whisper segments as they are transcribed.
+
+    Segments are split into sentences as they arrive (a sentence may span
+    segments, so its unfinished tail waits for the next segment), and every
+    sentence updates the running category scores in one pass. Each sentence
+    that adds to a category is remembered with its time range, so flags carry
+    the ranges that caused them.
+    """
+
+    def __init__(self):
+        self.scream_count = 0
+        self.acoustic_screams = 0
+        self.acoustic_events = []
+        self.horror_score = 0
+        self.weapon_count = 0
+        self.escalation_patterns = 0
+        # Time ranges of the sentences that added to each category
+        self.evidence = {"scream": [], "acoustic": [], "horror": [], "weapon": [], "escalation": []}
+        # Unfinished sentence carried over to the next segment, and where it started
+        self._pending = ""
+        self._pending_start = None
+
+    def feed_segment(self, segment):
+        """Add one transcript segment ({"text", "start", "end"}, times in seconds)"""
+        start, end = segment.get("start"), segment.get("end")
+        pieces = SENTENCE_END.split(segment.get("text", ""))
+        for i, piece in enumerate(pieces):
+            if not self._pending.strip():
+                # A new sentence starts in this segment
+                self._pending, self._pending_start = "", start
+            self._pending += piece
+            if i < len(pieces) - 1:
+                # Ended by punctuation inside this segment
+                self._flush(end)
+
+    def feed(self, text, start=None, end=None):
+        """Add transcript text without segment timestamps (or spanning start-end)"""
+        self.feed_segment({"text": text, "start": start, "end": end})
+
+    def finish(self, end=None):
+        """Analyze the last sentence if the transcript didn't end with punctuation"""
+        self._flush(end)
+
+    def _flush(self, end):
+        sentence = self._pending.strip()
+        start = self._pending_start
+        self._pending, self._pending_start = "", None
+        if sentence:
+            self.add_sentence(sentence, start, end)
+
+    def add_scream_events(self, events):
+        """Record screams found in the audio signal (see scream_detector.py)"""
+        for event in events:
+            self.acoustic_screams += 1
+            self.acoustic_events.append(event)
+            self._add_evidence("acoustic", (event["start"], event["end"]))
+
+    def scream_score(self):
+        """Transcript scream count, plus the acoustic events once the transcript has screams too"""
+        if self.scream_count == 0:
+            return 0
+        return self.scream_count + ACOUSTIC_SCREAM_WEIGHT * self.acoustic_screams
+
+    def _scream_categories(self):
+        return ("scream", "acoustic") if self.scream_count else ("scream",)
+
+    def add_sentence(self, sentence, start=None, end=None):
+        """Update the running scores with one sentence spoken between start and end"""
+        sentence_lower = sentence.lower()
+        hits = danger_lexicon.scan(sentence_lower)
+        time_range = (start, end) if start is not None and end is not None else None
+
+        # Each distinct scream pattern / keyword present counts once per sentence
+        scream_hits = len(hits.get("scream", ()))
+        horror_hits = len(hits.get("horror", ()))
+        weapon_hits = len(hits.get("weapon", ()))
+
+        # 1. SCREAM DETECTION WITH CONTEXT
+        if scream_hits:
+            # Check if sentence has distress context
+            if any(indicator in sentence_lower for indicator in distress_indicators):
+                self.scream_count += scream_hits * 2  # Weighted higher if in distress context
+            else:
+                self.scream_count += scream_hits
+            self._add_evidence("scream", time_range)
+
+        # 2. HORROR CONTENT DETECTION WITH CONTEXT
+        # If sentence has multiple horror keywords, it's more concerning
+        if horror_hits:
+            # Check for violent action verbs in same sentence
+            if any(verb in sentence_lower for verb in violent_verbs):
+                self.horror_score += horror_hits * 2  # Weighted higher
+            else:
+                self.horror_score += horror_hits
+            self._add_evidence("horror", time_range)
 
-for sentence in sentences:
-    sentence_lower = sentence.lower()
-    for weapon in weapon_keywords:
-        pattern = r'\b' + re.escape(weapon) + r'\b'
-        if re.search(pattern, sentence_lower):
+        # 3. WEAPON MENTIONS WITH CONTEXTUAL ANALYSIS
+        if weapon_hits:
             # Check context: is it dangerous or educational/neutral?
-            dangerous_indicators = ['kill', 'murder', 'attack', 'stab', 'shoot', 'hurt', 'threat', 'danger', 'weapon', 'fight', 'violence']
-            neutral_indicators = ['cooking', 'kitchen', 'tool', 'cutting', 'food', 'recipe', 'craft', 'art', 'museum', 'history', 'educational']
-            
             has_dangerous_context = any(indicator in sentence_lower for indicator in dangerous_indicators)
             has_neutral_context = any(indicator in sentence_lower for indicator in neutral_indicators)
-            
+
             # Only count as dangerous if context suggests threat, not educational use
             if has_dangerous_context and not has_neutral_context:
-                weapon_count += 2  # Weighted higher for dangerous context
-                dangerous_weapon_contexts.append(sentence[:150])
+                self.weapon_count += weapon_hits * 2  # Weighted higher for dangerous context
+                self._add_evidence("weapon", time_range)
             elif not has_neutral_context:
-                weapon_count += 1  # Neutral mention, lower weight
-
-# If weapons mentioned in dangerous contexts (count > 3), flag it
-if weapon_count > 3:
-    flags.append(f"weapons mentioned in dangerous contexts ({weapon_count} weighted mentions)")
-
-# 4. COMBINED THREAT ASSESSMENT WITH CONTEXT
-# Analyze overall video context
-danger_score = 0
-if scream_count > 5:
-    danger_score += 2
-if horror_score > 10:
-    danger_score += 2
-if weapon_count > 3:
-    danger_score += 2
-
-# Check for escalation patterns (screams + weapons + horror together)
-escalation_patterns = 0
-for sentence in sentences:
-    sentence_lower = sentence.lower()
-    has_scream = any(re.search(pattern, sentence_lower) for pattern in scream_patterns)
-    has_weapon = any(re.search(r'\b' + re.escape(w) + r'\b', sentence_lower) for w in weapon_keywords)
-    has_horror = any(re.search(r'\b' + re.escape(h) + r'\b', sentence_lower) for h in horror_keywords[:10])  # Check first 10 horror keywords
-    
-    if (has_scream and has_weapon) or (has_scream and has_horror) or (has_weapon and has_horror):
-        escalation_patterns += 1
-
-if escalation_patterns > 2:
-    flags.append(f"escalation patterns detected ({escalation_patterns} instances of combined danger elements)")
-
-# If high danger score, add a general warning
-if danger_score >= 4:
-    flags.append("high danger score: multiple concerning elements detected with dangerous context (screams, horror, weapons)")
-
-# Output flags as JSON
-print(json.dumps(flags))
-sys.stdout.flush()
+                self.weapon_count += weapon_hits  # Neutral mention, lower weight
+                self._add_evidence("weapon", time_range)
+
+        # 4. Escalation patterns (screams + weapons + horror together)
+        has_scream = scream_hits > 0
+        has_weapon = weapon_hits > 0
+        has_horror = "horror_core" in hits
+        if (has_scream and has_weapon) or (has_scream and has_horror) or (has_weapon and has_horror):
+            self.escalation_patterns += 1
+            self._add_evidence("escalation", time_range)
+
+    def _add_evidence(self, category, time_range):
+        if time_range is not None:
+            self.evidence[category].append(time_range)
+
+    def _flag(self, category, reason, categories=None):
+        ranges = merge_ranges(
+            time_range
+            for name in (categories or (category,))
+            for time_range in self.evidence[name]
+        )
+        if ranges:
+            shown = ", ".join(f"{format_time(start)}-{format_time(end)}" for start, end in ranges[:REASON_MAX_RANGES])
+            more = f" +{len(ranges) - REASON_MAX_RANGES} more" if len(ranges) > REASON_MAX_RANGES else ""
+            reason = f"{reason} at {shown}{more}"
+        return {"category": category, "reason": reason, "ranges": ranges}
+
+    def detailed_flags(self):
+        """Flags with their category and the merged [start, end] ranges behind them"""
+        flags = []
+
+        # If many screams detected (more than 5), flag it
+        scream_score = self.scream_score()
+        cluster = scream_detector.confident_cluster(self.acoustic_events)
+        screaming = scream_score > 5 or bool(cluster)
+        if scream_score > 5:
+            flags.append(self._flag(
+                "scream",
+                f"excessive screams detected ({scream_score} instances) - context suggests distress",
+                self._scream_categories(),
+            ))
+        elif cluster:
+            # Screams Whisper didn't write down, dense enough to stand on their own
+            flags.append(self._flag(
+                "scream",
+                f"excessive screams detected ({len(cluster)} acoustic events) - heard in the audio, not in the transcript",
+                ("acoustic",),
+            ))
+
+        # If significant horror content (score > 10), flag it
+        if self.horror_score > 10:
+            flags.append(self._flag("horror", f"horror content detected (severity score: {self.horror_score}) - context suggests violent/horror themes"))
+
+        # If weapons mentioned in dangerous contexts (count > 3), flag it
+        if self.weapon_count > 3:
+            flags.append(self._flag("weapon", f"weapons mentioned in dangerous contexts ({self.weapon_count} weighted mentions)"))
+
+        # COMBINED THREAT ASSESSMENT WITH CONTEXT
+        # Analyze overall video context
+        danger_score = 0
+        danger_categories = []
+        if screaming:
+            danger_score += 2
+            danger_categories.extend(self._scream_categories() if scream_score > 5 else ("acoustic",))
+        if self.horror_score > 10:
+            danger_score += 2
+            danger_categories.append("horror")
+        if self.weapon_count > 3:
+            danger_score += 2
+            danger_categories.append("weapon")
+
+        if self.escalation_patterns > 2:
+            flags.append(self._flag("escalation", f"escalation patterns detected ({self.escalation_patterns} instances of combined danger elements)"))
+
+        # If high danger score, add a general warning
+        if danger_score >= 4:
+            flags.append(self._flag("danger", "high danger score: multiple concerning elements detected with dangerous context (screams, horror, weapons)", danger_categories))
+
+        return flags
+
+    def flags(self):
+        """Reason strings for everything fed so far (scores only grow, so flags never go away)"""
+        return [flag["reason"] for flag in self.detailed_flags()]
+
+
+def analyze_segments(segments, text="", screams=()):
+    """Context-aware analysis of a transcript's segments (and acoustic scream events) in a single pass"""
+    analyzer = TranscriptAnalyzer()
+    analyzer.add_scream_events(screams)
+    if segments:
+        for segment in segments:
+            analyzer.feed_segment(segment)
+    else:
+        # No segment timestamps (e.g. an empty or text-only result)
+        analyzer.feed(text)
+    analyzer.finish(segments[-1]["end"] if segments else None)
+    return analyzer
+
+
+def analyze_transcript(full_text):
+    """Context-aware analysis of plain transcript text (screams, horror, weapons, escalation)"""
+    return analyze_segments([], full_text).flags()
+
+
+def scan_streaming(audio_path="tmp/audio.wav"):
+    """Transcribe window by window, analyzing segments as they arrive; stops as soon as the video is flagged"""
+    model = get_asr_engine("tiny")
+    analyzer = TranscriptAnalyzer()
+    skip_report = vad.SkipReport()
+    # Screams Whisper would drop, from the signal (the baseline runs on across windows)
+    screams = scream_detector.ScreamStream() if scream_detector.ENABLED else None
+    window_end = None
+    windows = audio_io.checked_windows(audio_io.iter_wav_windows(audio_path, STREAM_WINDOW_SECONDS))
+    for start, samples in timed_iter(windows, "io"):
+        window_end = start + len(samples) / float(audio_io.SAMPLE_RATE)
+        if screams is not None:
+            with span("acoustic"):
+                analyzer.add_scream_events(screams.feed(samples))
+        regions = None
+        if vad.ENABLED:
+            # OPTIMIZATION: only speech regions go to Whisper; silent windows are skipped
+            with span("vad"):
+                samples, regions = vad.keep_speech(samples, report=skip_report)
+            if len(samples) == 0:
+                continue
+        with span("inference"):
+            result = model.transcribe(samples)
+        # Follow other scans starting/finishing between windows
+        rebalance()
+        with span("post"):
+            for segment in result.get("segments", []):
+                segment_start, segment_end = segment["start"], segment["end"]
+                if regions is not None:
+                    segment_start = vad.to_original_time(segment_start, regions)
+                    segment_end = vad.to_original_time(segment_end, regions)
+                # Window-relative times -> position in the whole audio file
+                analyzer.feed_segment({"text": segment["text"], "start": start + segment_start, "end": start + segment_end})
+            flagged = bool(analyzer.detailed_flags())
+        if flagged:
+            print(f"⚡ Transcription analysis flagged at {window_end:.0f}s, stopping early", file=sys.stderr)
+            break
+    else:
+        if screams is not None:
+            analyzer.add_scream_events(screams.finish())
+    analyzer.finish(window_end)
+    skip_report.log("Transcription analysis")
+    return analyzer.detailed_flags()
+
+
+def analyze_job(job_dir=None):
+    """Detailed flags for the job's audio (see TranscriptAnalyzer.detailed_flags)"""
+    audio_path = job_path(job_dir, "audio.wav")
+    # Streaming only pays off when Phase 2 hasn't already produced the
+    # transcript - a cached transcript is always the cheapest option
+    transcribed = transcript_cache.lookup(audio_path, "tiny") is not None
+    if STREAMING and not transcribed:
+        try:
+            return scan_streaming(audio_path)
+        except audio_io.UnreadableWav as e:
+            print(f"⚠️ Streaming unavailable ({e}), transcribing whole file", file=sys.stderr)
+        except asr.TRANSCRIBE_ERRORS as e:
+            print(f"⚠️ Transcription failed: {e}", file=sys.stderr)
+            return []
+
+    screams = []
+    if scream_detector.ENABLED:
+        try:
+            with span("acoustic"):
+                screams = scream_detector.detect_file(audio_path)
+        except (OSError, wave.Error, EOFError, ValueError) as e:
+            print(f"⚠️ Acoustic scream check unavailable ({e})", file=sys.stderr)
+        # Kept with the transcript so rescore.py sees the same evidence
+        transcript_store.save_screams(job_video_id(job_dir), screams)
+
+    if not transcribed:
+        # OPTIMIZATION: a dense cluster of screams flags the video without transcribing it
+        flags = analyze_segments([], "", screams).detailed_flags()
+        if flags:
+            print("⚡ Transcription analysis flagged by acoustic screams, skipping transcription", file=sys.stderr)
+            return flags
+
+    try:
+        # Process ENTIRE audio file - shared with whisper_scan_full.py through
+        # the transcript cache, so the audio is only transcribed once
+        result = transcript_cache.transcribe(audio_path, "tiny", job_video_id(job_dir))
+    except asr.TRANSCRIBE_ERRORS as e:
+        print(f"⚠️ Transcription failed: {e}", file=sys.stderr)
+        return []
+
+    # Single pass over the timestamped segments
+    with span("post"):
+        return analyze_segments(result.get("segments", []), result.get("text", ""), screams).detailed_flags()
+
+
+@timed_run("transcription")
+@governed("transcription")
+def scan(job_dir=None):
+    """Transcribe the job's entire audio file and run the context analysis on it"""
+    return [flag["reason"] for flag in analyze_job(job_dir)]
+
+
+@timed_run("transcription")
+@governed("transcription")
+def scan_ranges(job_dir=None):
+    """Flags as {"category", "reason", "ranges": [[start, end], ...]} so callers can seek to them"""
+    return analyze_job(job_dir)
+
+
+# Handle graceful shutdown
+def signal_handler(sig, frame):
+    print("[]", file=sys.stdout)
+    sys.stdout.flush()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    try:
+        if sys.argv[1:2] == ["--ranges"]:
+            # Structured flags with the time ranges behind each one
+            flags = scan_ranges(job_dir_arg(sys.argv, 2))
+        else:
+            # Optional argument: the job's working directory (defaults to tmp/)
+            flags = scan(job_dir_arg(sys.argv))
+    except KeyboardInterrupt:
+        # Graceful shutdown - return empty result
+        flags = []
+
+    # Output flags as JSON
+    print(json.dumps(flags))
+    sys.stdout.flush()
@@ -4,9 +4,14 @@ const fs = require("fs-extra");
 const path = require("path");
 const { TMP_DIR } = require("./config");
 
-// Helper function to clean up temp files
-function cleanupTempFiles() {
+// Helper function to clean up temp files. With a job directory, only that
+// job's workspace is removed so other scans running in parallel are untouched.
+function cleanupTempFiles(jobDir) {
 	try {
+		if (jobDir) {
+			fs.removeSync(jobDir);
+			return;
+		}
 		if (fs.existsSync(TMP_DIR)) {
 			const files = fs.readdirSync(TMP_DIR);
 			for (const file of files) {
@@ -20,6 +25,13 @@ function cleanupTempFiles() {
 	}
 }
 
+// Create an empty workspace directory for a scan job (leftovers are removed)
+function prepareJobWorkspace(jobDir) {
+	cleanupTempFiles(jobDir);
+	fs.ensureDirSync(jobDir);
+	return jobDir;
+}
+
 // Helper function to parse JSON safely
 function safeJsonParse(str, defaultValue = []) {
 	try {
@@ -48,7 +60,7 @@ function isValidVideoId(videoId) {
 
 module.exports = {
 	cleanupTempFiles,
+	prepareJobWorkspace,
 	safeJsonParse,
 	isValidVideoId,
 };
-
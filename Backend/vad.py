@@ -0,0 +1,231 @@
+"""NumPy voice-activity detection to skip non-speech audio before Whisper.
+
+Kids' gaming and music videos are mostly music, silence and game noise, and
+Whisper spends as long on those stretches as on speech. This module finds
+speech-like regions from cheap per-frame features (energy above an adaptive
+noise floor, share of energy in the 250-4000 Hz speech band, spectral
+flatness) and cuts everything else out before transcription.
+
+Screams and shouting are loud and sit in the speech band, so they are kept.
+"""
+import os
+import sys
+
+import numpy as np
+
+import audio_io
+from audio_io import SAMPLE_RATE
+
+# AUDIO_VAD=0 disables the pre-filter and sends all audio to Whisper
+ENABLED = os.environ.get("AUDIO_VAD", "1") != "0"
+
+FRAME_SECONDS = 0.03
+# Frames per FFT batch - keeps the spectrum buffer small for hour-long audio
+CHUNK_FRAMES = 2048
+
+# A frame is speech-like if it is this far above the noise floor...
+MIN_SNR_DB = 10.0
+# ...and louder than this absolute level (dBFS)
+MIN_ENERGY_DB = -55.0
+# Frames louder than this always pass the energy test, so continuous speech
+# (where the "noise floor" is itself speech) is never thrown away. Missing
+# speech is worse than transcribing some music.
+MAX_THRESHOLD_DB = -35.0
+# ...with enough energy in the speech band, and a non-flat (non-noise) spectrum
+MIN_SPEECH_BAND_RATIO = 0.3
+MAX_FLATNESS = 0.4
+
+# Smoothing: pad speech by this much on each side, bridge shorter gaps, and
+# drop regions that are still shorter than the minimum
+PAD_SECONDS = 0.2
+MIN_GAP_SECONDS = 0.3
+MIN_REGION_SECONDS = 0.25
+
+# Silence inserted between kept regions so Whisper doesn't fuse words
+JOIN_GAP_SECONDS = 0.2
+
+# Whole files are analysed this many seconds at a time (noise floor per window)
+WINDOW_SECONDS = 60.0
+
+
+def frame_features(samples, sample_rate=SAMPLE_RATE):
+    """Per-frame (energy dB, speech band ratio, spectral flatness)"""
+    frame_len = int(sample_rate * FRAME_SECONDS)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return empty, empty, empty
+
+    frames = np.asarray(samples[: n_frames * frame_len], dtype=np.float32).reshape(n_frames, frame_len)
+    window = np.hanning(frame_len).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+    band = (freqs >= 250) & (freqs <= 4000)
+
+    energy_db = np.empty(n_frames)
+    band_ratio = np.empty(n_frames)
+    flatness = np.empty(n_frames)
+    for start in range(0, n_frames, CHUNK_FRAMES):
+        chunk = frames[start:start + CHUNK_FRAMES]
+        power = np.abs(np.fft.rfft(chunk * window, axis=1)) ** 2 + 1e-12
+        total = power.sum(axis=1)
+        end = start + len(chunk)
+        energy_db[start:end] = 10.0 * np.log10(np.mean(chunk.astype(np.float64) ** 2, axis=1) + 1e-12)
+        band_ratio[start:end] = power[:, band].sum(axis=1) / total
+        flatness[start:end] = np.exp(np.mean(np.log(power), axis=1)) / (total / power.shape[1])
+
+    return energy_db, band_ratio, flatness
+
+
+def speech_regions(samples, sample_rate=SAMPLE_RATE):
+    """List of (start_seconds, end_seconds) regions that look like speech"""
+    energy_db, band_ratio, flatness = frame_features(samples, sample_rate)
+    if len(energy_db) == 0:
+        return []
+
+    noise_floor = np.percentile(energy_db, 10)
+    speech = (
+        (energy_db > max(min(noise_floor + MIN_SNR_DB, MAX_THRESHOLD_DB), MIN_ENERGY_DB))
+        & (band_ratio > MIN_SPEECH_BAND_RATIO)
+        & (flatness < MAX_FLATNESS)
+    )
+
+    # Dilate by PAD + half the bridgeable gap, so short pauses merge into one region
+    pad = int(round((PAD_SECONDS + MIN_GAP_SECONDS / 2) / FRAME_SECONDS))
+    if pad > 0 and speech.any():
+        speech = np.convolve(speech.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode="same") > 0
+
+    edges = np.diff(np.concatenate([[0], speech.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    duration = len(samples) / float(sample_rate)
+    regions = []
+    for start, end in zip(starts, ends):
+        start_s = start * FRAME_SECONDS
+        end_s = min(end * FRAME_SECONDS, duration)
+        if end_s - start_s >= MIN_REGION_SECONDS:
+            regions.append((float(start_s), float(end_s)))
+    return regions
+
+
+def keep_speech(samples, sample_rate=SAMPLE_RATE, report=None):
+    """Return (speech-only samples, regions); regions are joined with short silences"""
+    regions = speech_regions(samples, sample_rate)
+    if report is not None:
+        report.add(len(samples) / float(sample_rate), regions)
+    if not regions:
+        return np.zeros(0, dtype=np.float32), regions
+
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=np.float32)
+    pieces = []
+    for i, (start_s, end_s) in enumerate(regions):
+        if i:
+            pieces.append(gap)
+        pieces.append(np.asarray(samples[int(start_s * sample_rate):int(end_s * sample_rate)], dtype=np.float32))
+    return np.concatenate(pieces), regions
+
+
+def file_speech_regions(path, report=None, window_seconds=WINDOW_SECONDS):
+    """Speech regions of a whole WAV file, found one window at a time.
+
+    Only one window of audio is in memory. A region running into the next
+    window is merged with that window's first region, so the split doesn't
+    add a gap in the middle of a word.
+    """
+    regions = []
+    offset = 0
+    for _, samples in audio_io.iter_wav_windows(path, window_seconds):
+        window_regions = speech_regions(samples)
+        if report is not None:
+            report.add(len(samples) / float(SAMPLE_RATE), window_regions)
+        base = offset / float(SAMPLE_RATE)
+        for start_s, end_s in window_regions:
+            start_s, end_s = base + start_s, base + end_s
+            if regions and start_s - regions[-1][1] < FRAME_SECONDS / 2:
+                regions[-1] = (regions[-1][0], end_s)
+            else:
+                regions.append((start_s, end_s))
+        offset += len(samples)
+    return regions
+
+
+def read_speech(path, regions, window_seconds=WINDOW_SECONDS):
+    """keep_speech() output for a whole WAV file, given file_speech_regions() regions.
+
+    The file is read again window by window and only the speech is copied
+    into one preallocated array, so the full audio is never held in memory.
+    """
+    bounds = [(int(round(start_s * SAMPLE_RATE)), int(round(end_s * SAMPLE_RATE))) for start_s, end_s in regions]
+    gap = int(JOIN_GAP_SECONDS * SAMPLE_RATE)
+    # Output position of every region, with a gap of silence before all but the first
+    positions = []
+    size = 0
+    for i, (start, end) in enumerate(bounds):
+        size += gap if i else 0
+        positions.append(size)
+        size += end - start
+    speech = np.zeros(size, dtype=np.float32)
+    if not bounds:
+        return speech
+
+    offset = 0
+    first = 0
+    for _, samples in audio_io.iter_wav_windows(path, window_seconds):
+        window_end = offset + len(samples)
+        for i in range(first, len(bounds)):
+            start, end = bounds[i]
+            if start >= window_end:
+                break
+            lo, hi = max(start, offset), min(end, window_end)
+            if hi > lo:
+                at = positions[i] + lo - start
+                speech[at:at + hi - lo] = samples[lo - offset:hi - offset]
+        # Regions that ended in this window are done
+        while first < len(bounds) and bounds[first][1] <= window_end:
+            first += 1
+        offset = window_end
+        if first == len(bounds):
+            break
+    return speech
+
+
+def to_original_time(t, regions):
+    """Map a timestamp in keep_speech() output back to the original audio"""
+    offset = 0.0
+    for start_s, end_s in regions:
+        length = end_s - start_s
+        if t <= offset + length + JOIN_GAP_SECONDS:
+            return start_s + min(max(t - offset, 0.0), length)
+        offset += length + JOIN_GAP_SECONDS
+    return regions[-1][1] if regions else t
+
+
+class SkipReport:
+    """Tracks how much audio the VAD kept out of Whisper"""
+
+    def __init__(self):
+        self.total_seconds = 0.0
+        self.speech_seconds = 0.0
+
+    def add(self, total_seconds, regions):
+        self.total_seconds += total_seconds
+        self.speech_seconds += sum(end - start for start, end in regions)
+
+    @property
+    def skipped_seconds(self):
+        return max(0.0, self.total_seconds - self.speech_seconds)
+
+    def as_dict(self):
+        return {
+            "total_seconds": round(self.total_seconds, 2),
+            "speech_seconds": round(self.speech_seconds, 2),
+            "skipped_seconds": round(self.skipped_seconds, 2),
+        }
+
+    def log(self, label):
+        if self.total_seconds > 0:
+            pct = 100.0 * self.skipped_seconds / self.total_seconds
+            print(
+                f"🔇 {label}: VAD skipped {self.skipped_seconds:.1f}s of {self.total_seconds:.1f}s ({pct:.0f}% non-speech)",
+                file=sys.stderr,
+            )
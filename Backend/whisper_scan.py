@@ -1,66 +1,40 @@
-import whisper
 import json
 import sys
-import subprocess
+
+from scan_worker import forward_to_worker
+
+# Thin-client fast path: hand the job to the long-lived worker if it is running
+if __name__ == "__main__":
+    forward_to_worker("whisper_quick", sys.argv[1:])
+
+# Imported first so the "import" timing span covers everything below
+from timing import timed_run, span, timed_iter
+
 import os
+import subprocess
+import wave
+
+import asr
+import audio_io
+import scream_detector
+import transcript_store
+import vad
+from scan_models import get_asr_engine
+from thread_governor import governed, rebalance
+from lexicon import Lexicon
+from workspace import job_dir_arg, job_path, job_video_id
+
+# Only the first 2 minutes are scanned - inappropriate content usually appears early
+QUICK_SCAN_SECONDS = 120
 
-# Use "tiny" model for 5x faster processing (slightly less accurate but much faster)
-model = whisper.load_model("tiny")
-
-# Extract only first 2 minutes (120 seconds) for quick scan
-# This catches most inappropriate content which usually appears early
-quick_audio_path = "tmp/audio_quick.wav"
-try:
-    subprocess.run([
-        "ffmpeg", "-i", "tmp/audio.wav", 
-        "-t", "120",  # First 120 seconds (2 minutes)
-        "-y",  # Overwrite if exists
-        quick_audio_path
-    ], check=True, capture_output=True)
-    
-    # Process only the first 2 minutes
-    audio_file = quick_audio_path
-except:
-    # Fallback to full audio if extraction fails
-    audio_file = "tmp/audio.wav"
-
-try:
-try:
-	# OPTIMIZATION: Use faster settings for speed
-	result = model.transcribe(
-		audio_file, 
-		condition_on_previous_text=False,
-		fp16=True,  # Use half precision for faster processing
-		beam_size=1,  # Greedy decoding (faster than beam search)
-		best_of=1  # Don't try multiple decodings
-	)
-except KeyboardInterrupt:
-	# Graceful shutdown - return empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-except Exception as e:
-	# Any other error - return empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-except KeyboardInterrupt:
-	# Graceful shutdown - return empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-except Exception as e:
-	# Any other error - return empty result
-	print("[]", file=sys.stdout)
-	sys.stdout.flush()
-	sys.exit(0)
-
-# Get transcription text
-text = result["text"].lower()
+# Streaming mode (default): transcribe in fixed windows and stop at the first
+# window that makes the video unsafe. AUDIO_STREAMING=0 transcribes all 120s first.
+STREAMING = audio_io.STREAMING is not audio_io.Streaming.OFF
+STREAM_WINDOW_SECONDS = audio_io.STREAM_WINDOW_SECONDS
 
 # Expanded list of inappropriate words/phrases (including suicide, self-harm, etc.)
 bad_words = [
-    "fuck", "fucking", "fucked", "shit", "shitting", "sex", "sexual", "cocaine", 
+    "fuck", "fucking", "fucked", "shit", "shitting", "sex", "sexual", "cocaine",
     "marijuana", "weed", "drug", "kill", "killing", "killed", "pedo", "pedophile",
     "ass", "bitch", "damn", "hell", "porn", "pornography", "nude", "naked",
     "violence", "violent", "gun", "shoot", "shooting", "murder", "death", "die",
@@ -77,26 +51,234 @@ scream_patterns = [
     r'\b(aa+|ee+|ii+|oo+|uu+)\b',  # Long vowel sounds (screams)
 ]
 
-import re
+# OPTIMIZATION: one compiled matcher finds bad words and screams in a single pass
+quick_lexicon = Lexicon(terms={"bad": bad_words}, patterns={"scream": scream_patterns})
+
+
+def build_flags(bad_hits, scream_count, events=()):
+    """Turn matched bad words, the scream count and acoustic scream events into flags"""
+    flags = []
+
+    # 1. Inappropriate words (word boundaries avoid false positives)
+    for w in bad_words:
+        if w in bad_hits:
+            flags.append(f"inappropriate language: {w}")
+
+    # 2. If multiple scream indicators found, flag it. Acoustic events count
+    #    once the transcript has a scream of its own; without one, only a
+    #    dense cluster of them does
+    acoustic = len(events) if scream_count else 0
+    cluster = scream_detector.confident_cluster(events)
+    if scream_count + acoustic >= 3:
+        if acoustic:
+            flags.append(
+                f"screams detected in audio ({scream_count} instances, with {acoustic} acoustic events "
+                f"at {scream_detector.format_events(events)})"
+            )
+        else:
+            flags.append(f"screams detected in audio ({scream_count} instances)")
+    elif cluster:
+        flags.append(
+            f"screams detected in audio ({len(cluster)} acoustic events "
+            f"at {scream_detector.format_events(cluster)})"
+        )
+
+    return flags
+
+
+def rescore_flags(transcript, events):
+    """Quick scan flags re-derived from a stored full transcript (rescore.py).
+
+    Uses the segments starting in the first QUICK_SCAN_SECONDS and the acoustic
+    events there. Returns None for a transcript without timestamps, whose first
+    2 minutes can't be told apart.
+    """
+    if transcript["text"].strip() and not transcript["segments"]:
+        return None
+    text = "".join(segment["text"] for segment in transcript["segments"] if segment["start"] < QUICK_SCAN_SECONDS)
+    hits = quick_lexicon.scan(text.lower())
+    events = [event for event in events if event["start"] < QUICK_SCAN_SECONDS]
+    return build_flags(hits.get("bad", {}), sum(hits.get("scream", {}).values()), events)
+
+
+def timed_segments(result, offset=0.0, regions=None):
+    """result's segments with times in the original audio (VAD regions undone, plus offset)"""
+    segments = []
+    for segment in result.get("segments", []):
+        start, end = segment["start"], segment["end"]
+        if regions is not None:
+            start, end = vad.to_original_time(start, regions), vad.to_original_time(end, regions)
+        segments.append({"start": offset + start, "end": offset + end, "text": segment["text"]})
+    return segments
+
+
+def save_transcript(video_id, segments, events):
+    """Keep what the quick scan transcribed, for rescore.py (see transcript_store.py)"""
+    transcript = {"text": "".join(segment["text"] for segment in segments), "segments": segments}
+    transcript_store.save(video_id, transcript_store.QUICK_KEY_PREFIX + asr.engine_tag("tiny"), transcript, events)
+
+
+def scan_streaming(model, audio_path="tmp/audio.wav", events=(), segments=None):
+    """Transcribe the first 2 minutes window by window, stopping once flagged.
+
+    The timed segments are appended to segments, if given.
+    """
+    bad_hits = set()
+    scream_count = 0
+    flags = []
+    skip_report = vad.SkipReport()
+
+    windows = audio_io.checked_windows(audio_io.iter_wav_windows(audio_path, STREAM_WINDOW_SECONDS, QUICK_SCAN_SECONDS))
+    for start, samples in timed_iter(windows, "io"):
+        regions = None
+        if vad.ENABLED:
+            # OPTIMIZATION: only speech regions go to Whisper; silent windows are skipped
+            with span("vad"):
+                samples, regions = vad.keep_speech(samples, report=skip_report)
+            if len(samples) == 0:
+                continue
+        with span("inference"):
+            result = model.transcribe(samples)
+        # Follow other scans starting/finishing between windows
+        rebalance()
+        with span("post"):
+            if segments is not None:
+                segments.extend(timed_segments(result, start, regions))
+            hits = quick_lexicon.scan(result["text"].lower())
+            bad_hits.update(hits.get("bad", {}))
+            scream_count += sum(hits.get("scream", {}).values())
+            flags = build_flags(bad_hits, scream_count, events)
+        if flags:
+            # Early exit: the video is already unsafe, skip the remaining windows
+            print(f"⚡ Quick audio scan flagged within {start + STREAM_WINDOW_SECONDS:.0f}s, stopping early", file=sys.stderr)
+            break
+
+    skip_report.log("Quick audio scan")
+    return flags
+
+
+def load_quick_audio(audio_path="tmp/audio.wav"):
+    """(first 2 minutes as the 16 kHz float32 array Whisper takes, VAD regions or None).
+
+    Read and sliced in-process (header-aware WAV reader, resampled once), so
+    neither our ffmpeg extraction nor Whisper's own ffmpeg decode runs. Falls
+    back to an ffmpeg-extracted file path if the WAV can't be read directly.
+    """
+    try:
+        with span("io"):
+            samples = audio_io.load_wav(audio_path, QUICK_SCAN_SECONDS)
+    except (wave.Error, EOFError, ValueError) as e:
+        print(f"⚠️ In-process audio read failed ({e}), using ffmpeg extraction", file=sys.stderr)
+        return extract_quick_audio_ffmpeg(audio_path), None
+
+    regions = None
+    if vad.ENABLED:
+        # OPTIMIZATION: only speech regions go to Whisper
+        skip_report = vad.SkipReport()
+        with span("vad"):
+            samples, regions = vad.keep_speech(samples, report=skip_report)
+        skip_report.log("Quick audio scan")
+    return samples, regions
+
+
+def extract_quick_audio_ffmpeg(audio_path="tmp/audio.wav"):
+    """Fallback: write the first 2 minutes to audio_quick.wav (next to the source) with ffmpeg"""
+    quick_audio_path = os.path.join(os.path.dirname(audio_path), "audio_quick.wav")
+    try:
+        with span("io"):
+            subprocess.run([
+                "ffmpeg", "-i", audio_path,
+                "-t", str(QUICK_SCAN_SECONDS),  # First 120 seconds (2 minutes)
+                "-y",  # Overwrite if exists
+                quick_audio_path
+            ], check=True, capture_output=True)
+
+        # Process only the first 2 minutes
+        return quick_audio_path
+    except (OSError, subprocess.CalledProcessError) as e:
+        # Fallback to full audio if extraction fails
+        print(f"⚠️ ffmpeg extraction failed ({e}), transcribing the whole file", file=sys.stderr)
+        return audio_path
+
+
+@timed_run("whisper_quick")
+@governed("whisper_quick")
+def scan(job_dir=None):
+    """Quick scan: transcribe the first 2 minutes of the job's audio and return flags.
+
+    What was transcribed is stored under the job's videoId: a video flagged
+    here never gets a full transcript for rescore.py to work from.
+    """
+    audio_path = job_path(job_dir, "audio.wav")
+    video_id = job_video_id(job_dir)
+
+    # Screams found in the signal back up the ones Whisper writes down (it
+    # drops most of them)
+    events = []
+    if scream_detector.ENABLED:
+        try:
+            with span("acoustic"):
+                events = scream_detector.detect_file(audio_path, QUICK_SCAN_SECONDS)
+        except (OSError, wave.Error, EOFError, ValueError) as e:
+            print(f"⚠️ Acoustic scream check unavailable ({e})", file=sys.stderr)
+
+    # OPTIMIZATION: a dense cluster of screams flags the video before Whisper loads
+    flags = build_flags((), 0, events)
+    if flags:
+        print("⚡ Quick audio scan flagged by acoustic screams, skipping transcription", file=sys.stderr)
+        save_transcript(video_id, [], events)
+        return flags
+
+    # Use "tiny" model for 5x faster processing (slightly less accurate but much faster)
+    model = get_asr_engine("tiny")
+
+    regions = None
+    if STREAMING:
+        segments = []
+        try:
+            flags = scan_streaming(model, audio_path, events, segments)
+            save_transcript(video_id, segments, events)
+            return flags
+        except audio_io.UnreadableWav as e:
+            # Not a PCM WAV we can read in-process - fall back to ffmpeg below
+            print(f"⚠️ Streaming unavailable ({e}), using ffmpeg extraction", file=sys.stderr)
+            audio = extract_quick_audio_ffmpeg(audio_path)
+        except asr.TRANSCRIBE_ERRORS as e:
+            print(f"⚠️ Quick audio transcription failed: {e}", file=sys.stderr)
+            return []
+    else:
+        # Extract only first 2 minutes (120 seconds) for quick scan
+        # This catches most inappropriate content which usually appears early
+        audio, regions = load_quick_audio(audio_path)
+
+    if not isinstance(audio, str) and len(audio) == 0:
+        # Nothing but silence/music in the first 2 minutes
+        save_transcript(video_id, [], events)
+        return []
 
-flags = []
+    try:
+        # OPTIMIZATION: greedy, single-pass decoding (see asr.DECODE_OPTIONS)
+        with span("inference"):
+            result = model.transcribe(audio)
+    except asr.TRANSCRIBE_ERRORS as e:
+        print(f"⚠️ Quick audio transcription failed: {e}", file=sys.stderr)
+        return []
 
-# 1. Check for inappropriate words
-for w in bad_words:
-    # Use word boundaries to avoid false positives
-    pattern = r'\b' + re.escape(w) + r'\b'
-    if re.search(pattern, text, re.IGNORECASE):
-        flags.append(f"inappropriate language: {w}")
+    # Get transcription text and match bad words + screams in one pass
+    with span("post"):
+        hits = quick_lexicon.scan(result["text"].lower())
+        flags = build_flags(hits.get("bad", {}), sum(hits.get("scream", {}).values()), events)
+    save_transcript(video_id, timed_segments(result, 0.0, regions), events)
+    return flags
 
-# 2. Scream detection (more thorough in 2-minute scan)
-scream_count = 0
-for pattern in scream_patterns:
-    matches = re.findall(pattern, text, re.IGNORECASE)
-    scream_count += len(matches)
 
-# If multiple scream indicators found, flag it
-if scream_count >= 3:
-    flags.append(f"screams detected in audio ({scream_count} instances)")
+if __name__ == "__main__":
+    try:
+        # Optional argument: the job's working directory (defaults to tmp/)
+        flags = scan(job_dir_arg(sys.argv))
+    except KeyboardInterrupt:
+        # Graceful shutdown - return empty result
+        flags = []
 
-print(json.dumps(flags))
-sys.stdout.flush()
+    print(json.dumps(flags))
+    sys.stdout.flush()
@@ -1,38 +1,56 @@
-import whisper
 import json
 import sys
 
-# Use "tiny" model for faster processing
-model = whisper.load_model("tiny")
+from scan_worker import forward_to_worker
 
-# Process ENTIRE audio file (no time limit)
-# OPTIMIZATION: Use faster settings for speed
-result = model.transcribe(
-    "tmp/audio.wav", 
-    condition_on_previous_text=False,
-    fp16=True,  # Use half precision for faster processing
-    beam_size=1,  # Greedy decoding (faster than beam search)
-    best_of=1  # Don't try multiple decodings
-)
+# Thin-client fast path: hand the job to the long-lived worker if it is running
+if __name__ == "__main__":
+    forward_to_worker("whisper_full", sys.argv[1:])
 
-# Get transcription text
-text = result["text"].lower()
+# Imported first so the "import" timing span covers everything below
+from timing import timed_run, span
+
+import transcript_cache
+from lexicon import Lexicon
+from thread_governor import governed
+from workspace import job_dir_arg, job_path, job_video_id
 
 # Expanded list of inappropriate words/phrases
 bad_words = [
-    "fuck", "fucking", "fucked", "shit", "shitting", "sex", "sexual", "cocaine", 
+    "fuck", "fucking", "fucked", "shit", "shitting", "sex", "sexual", "cocaine",
     "marijuana", "weed", "drug", "kill", "killing", "killed", "pedo", "pedophile",
     "ass", "bitch", "damn", "hell", "porn", "pornography", "nude", "naked",
     "violence", "violent", "gun", "shoot", "shooting", "murder", "death", "die"
 ]
 
-flags = []
-for w in bad_words:
-    # Use word boundaries to avoid false positives (e.g., "class" containing "ass")
-    pattern = r'\b' + re.escape(w) + r'\b'
-    if re.search(pattern, text):
-        flags.append(f"bad speech: {w}")
+# OPTIMIZATION: compiled once, matches every bad word in a single pass
+bad_word_lexicon = Lexicon(terms={"bad": bad_words}, ignore_case=False)
+
+
+def word_filter(text):
+    """Word-filter flags for a transcript's text (also used by rescore.py)"""
+    flags = []
+    # Word boundaries avoid false positives (e.g., "class" containing "ass")
+    bad_hits = bad_word_lexicon.scan(text.lower()).get("bad", {})
+    for w in bad_words:
+        if w in bad_hits:
+            flags.append(f"bad speech: {w}")
+    return flags
+
+
+@timed_run("whisper_full")
+@governed("whisper_full")
+def scan(job_dir=None):
+    """Full scan: transcribe the job's entire audio file and return word-filter flags"""
+    # Process ENTIRE audio file (no time limit). The transcript is shared with
+    # transcription_analyzer.py, so whichever runs first does the transcription.
+    result = transcript_cache.transcribe(job_path(job_dir, "audio.wav"), "tiny", job_video_id(job_dir))
+
+    with span("post"):
+        return word_filter(result["text"])
 
-print(json.dumps(flags))
-sys.stdout.flush()
 
+if __name__ == "__main__":
+    # Optional argument: the job's working directory (defaults to tmp/)
+    print(json.dumps(scan(job_dir_arg(sys.argv))))
+    sys.stdout.flush()
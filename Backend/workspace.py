@@ -0,0 +1,29 @@
+"""Per-job working directories for the scanner scripts.
+
+The Node server gives every scan job its own directory (tmp/<videoId>/) that
+holds audio.wav, preview.mp4 and frame_*.jpg, so several videos can be
+scanned at once without overwriting each other's files. Each scanner takes
+that directory as an optional argument; without one it uses the shared tmp/
+directory like before.
+"""
+import os
+
+DEFAULT_JOB_DIR = "tmp"
+
+
+def job_path(job_dir, name):
+    """Path of a file inside the job directory (tmp/ if none was given)"""
+    return os.path.join(job_dir or DEFAULT_JOB_DIR, name)
+
+
+def job_dir_arg(argv, index=1):
+    """Job directory from the command line, or None to use tmp/"""
+    return argv[index] if len(argv) > index and argv[index] else None
+
+
+def job_video_id(job_dir):
+    """videoId of a tmp/<videoId>/ job directory, or None for the shared tmp/"""
+    if not job_dir:
+        return None
+    name = os.path.basename(os.path.normpath(job_dir))
+    return None if name == DEFAULT_JOB_DIR else name